@@ -0,0 +1,55 @@
+"""
+Compara los transportes XML y JSON (con proyección "only=") de ChEMBL.
+
+Uso (desde la raíz del repositorio):
+    python -m benchmarks.bench_chembl_transport CHEMBL2365 CHEMBL5610
+
+Para cada target y transporte informa el tamaño descargado, el tiempo total 
+de descarga y el tiempo de parseo de las páginas recibidas.
+"""
+import json
+import sys
+import time
+import xml.etree.ElementTree as ET
+
+from src import http_client
+from src.pdb_handler import get_binding_activities_for_target_from_chembl
+
+
+def measure_transport(chembl_target_id, transport):
+    """
+    Descarga las actividades de un target con el transporte indicado, sin caché, 
+    y devuelve (actividades, bytes descargados, segundos totales, segundos de parseo).
+    """
+    bodies = []
+
+    def capture_body(response, *args, **kwargs):
+        bodies.append(response.content)
+
+    http_client.configure(1, use_cache=False)
+    http_client.get_session().hooks["response"].append(capture_body)
+    start = time.perf_counter()
+    activities = get_binding_activities_for_target_from_chembl(chembl_target_id, transport=transport)
+    total_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for body in bodies:
+        if transport == "json":
+            json.loads(body)
+        else:
+            ET.fromstring(body)
+    parse_time = time.perf_counter() - start
+    return len(activities), sum(len(body) for body in bodies), total_time, parse_time
+
+
+def main(chembl_target_ids):
+    print(f"{'target':<14}{'formato':<9}{'actividades':>12}{'KB':>10}{'total (s)':>11}{'parseo (ms)':>13}")
+    for chembl_target_id in chembl_target_ids:
+        for transport in ("xml", "json"):
+            activities, size, total_time, parse_time = measure_transport(chembl_target_id, transport)
+            print(f"{chembl_target_id:<14}{transport:<9}{activities:>12}{size / 1024:>10.1f}"
+                  f"{total_time:>11.2f}{parse_time * 1000:>13.1f}")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:] or ["CHEMBL2365"])
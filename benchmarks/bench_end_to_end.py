@@ -0,0 +1,133 @@
+"""
+Mide el rendimiento del programa completo (planificación + process_pdb /
+process_uniprot) contra el servidor de prueba de benchmarks/mock_api_server.py,
+sin acceder a la red.
+
+Uso (desde la raíz del repositorio):
+    python -m benchmarks.bench_end_to_end
+    python -m benchmarks.bench_end_to_end --sizes 10,100,1000 --workers 8 --latency 50 --rate-429 0.02
+    python -m benchmarks.bench_end_to_end --replay grabaciones/ --kind pdb
+
+Para cada tipo de ID y tamaño de lote informa IDs por segundo, la latencia por
+ID (p50 y p95) y el pico de memoria (RSS). Cada medición corre en un proceso
+aparte, para que el pico de memoria sea sólo el de esa medición. Se informan dos
+picos: el del proceso principal ("RSS") y el mayor de los procesos del pool de
+parseo de páginas de ChEMBL ("RSS pool"; ver config.CHEMBL_PARSE_PROCESSES), que
+no se cuentan en el primero. No es la suma: cada proceso del pool tiene su propio
+pico. Las respuestas de las APIs no se cachean y los archivos de salida se
+escriben en una carpeta temporal.
+"""
+import argparse
+import json
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from functools import partial
+
+from benchmarks.mock_api_server import add_server_arguments, start_server_from_arguments
+
+SIZES = [10, 50, 200]
+
+
+def build_ids(kind, size):
+    """IDs sintéticos válidos y distintos: PDB (4 caracteres) o UniProt (6 caracteres)."""
+    if kind == "pdb":
+        return [f"{index // 1000 + 1}{index % 1000:03d}" for index in range(size)]
+    return [f"P{index:05d}" for index in range(size)]
+
+
+def percentile(values, fraction):
+    """Percentil (fraction entre 0 y 1) por el método del rango más cercano."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, round(fraction * len(ordered)) - 1))]
+
+
+def run_batch(kind, size, workers, mirror_url):
+    """Procesa un lote de IDs con el pipeline completo y devuelve sus métricas."""
+    from src import config, http_client
+    from src.main import process_ids
+    from src.pdb_handler import process_pdb, process_uniprot, shutdown_parse_pool
+    from src.query_plan import build_query_plan
+
+    config.API_MIRROR_URL = mirror_url
+    config.ENABLE_TARGET_STORE = False
+    config.OUTPUT_DIR = tempfile.mkdtemp(prefix="bench_output_")
+    http_client.configure(workers, use_cache=False)
+
+    ids = build_ids(kind, size)
+    latencies = []
+
+    def timed(process_function, id_, affinity_types, ligands_ids):
+        start = time.perf_counter()
+        try:
+            return process_function(id_, affinity_types, ligands_ids)
+        finally:
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    if kind == "pdb":
+        plan = build_query_plan(ids, [], None, None, workers)
+        process_ids(ids, partial(timed, partial(process_pdb, plan=plan)), "PDB", None, None, workers)
+    else:
+        plan = build_query_plan([], ids, None, None, workers)
+        process_ids(ids, partial(timed, partial(process_uniprot, plan=plan)), "UniProt", None, None, workers)
+    elapsed = time.perf_counter() - start
+    # RUSAGE_CHILDREN sólo incluye los procesos ya terminados: se cierra el pool de parseo antes de medir
+    shutdown_parse_pool()
+    return {
+        "kind": kind,
+        "size": size,
+        "seconds": elapsed,
+        "ids_per_second": size / elapsed if elapsed > 0 else 0.0,
+        "p50": percentile(latencies, 0.50),
+        "p95": percentile(latencies, 0.95),
+        "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        "peak_pool_rss_mb": resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / 1024,
+    }
+
+
+def measure_in_subprocess(kind, size, workers, mirror_url):
+    """Corre run_batch en un proceso nuevo y devuelve sus métricas (la última línea de su salida)."""
+    command = [sys.executable, "-m", "benchmarks.bench_end_to_end", "--child", kind, str(size),
+               "--workers", str(workers), "--mirror", mirror_url]
+    output = subprocess.run(command, capture_output=True, text=True, check=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark del programa completo contra el servidor de prueba")
+    parser.add_argument("--sizes", default=",".join(str(size) for size in SIZES), help="Tamaños de lote separados por coma")
+    parser.add_argument("--kind", choices=["pdb", "uniprot", "both"], default="both")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--child", nargs=2, metavar=("KIND", "SIZE"), help=argparse.SUPPRESS)
+    parser.add_argument("--mirror", help=argparse.SUPPRESS)
+    add_server_arguments(parser)
+    args = parser.parse_args()
+
+    if args.child:
+        kind, size = args.child
+        metrics = run_batch(kind, int(size), args.workers, args.mirror)
+        print(json.dumps(metrics))
+        return
+
+    server = start_server_from_arguments(args)
+    kinds = ["pdb", "uniprot"] if args.kind == "both" else [args.kind]
+    print(f"{'tipo':<9}{'IDs':>7}{'total (s)':>11}{'IDs/s':>9}{'p50 (s)':>9}{'p95 (s)':>9}{'RSS (MB)':>10}{'RSS pool (MB)':>15}")
+    try:
+        for kind in kinds:
+            for size in (int(size) for size in args.sizes.split(",")):
+                metrics = measure_in_subprocess(kind, size, args.workers, server.url)
+                print(f"{kind:<9}{size:>7}{metrics['seconds']:>11.2f}{metrics['ids_per_second']:>9.2f}"
+                      f"{metrics['p50']:>9.3f}{metrics['p95']:>9.3f}{metrics['peak_rss_mb']:>10.1f}"
+                      f"{metrics['peak_pool_rss_mb']:>15.1f}")
+    finally:
+        server.shutdown()
+    print("Requests por host: " + ", ".join(f"{host}={count}" for host, count in sorted(server.requests_by_host.items())))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+"""
+Mide cómo escala el agrupamiento de ensayos por ligando con la cantidad de actividades.
+
+Uso (desde la raíz del repositorio):
+    python -m benchmarks.bench_ligand_grouping
+
+Compara el agrupamiento indexado (group_ligand_assays) con la búsqueda lineal 
+anterior sobre actividades sintéticas, sin acceder a la red.
+"""
+import random
+import time
+
+from src.pdb_handler import group_ligand_assays, get_ligand_assay_data
+
+SIZES = [1000, 5000, 10000, 20000]
+
+
+def group_ligand_assays_linear(ligand_assays):
+    """Agrupamiento anterior: búsqueda lineal del ligando para cada actividad."""
+    ligands = []
+    for ligand_id, canonical_smiles, ligand_assay_data in ligand_assays:
+        ligand = next((lig for lig in ligands if lig["chembl_id"] == ligand_id), None)
+        if ligand is None:
+            ligand = {"chembl_id": ligand_id, "canonical_smiles": canonical_smiles, "assays": [ligand_assay_data]}
+            ligands.append(ligand)
+        else:
+            ligand["assays"].append(ligand_assay_data)
+    return ligands
+
+
+def build_ligand_assays(activities, seed=0):
+    """Genera actividades sintéticas con, en promedio, dos ensayos por ligando."""
+    rng = random.Random(seed)
+    ligands = max(1, activities // 2)
+    return [(f"CHEMBL{rng.randrange(ligands)}", "CCO",
+             get_ligand_assay_data(f"CHEMBL{i}", "Ki", str(rng.random() * 100), "nM", "2020"))
+            for i in range(activities)]
+
+
+def measure(function, ligand_assays):
+    start = time.perf_counter()
+    result = function(ligand_assays)
+    return time.perf_counter() - start, result
+
+
+def main():
+    print(f"{'actividades':>12}{'lineal (s)':>12}{'indexado (s)':>14}{'aceleración':>13}")
+    for size in SIZES:
+        ligand_assays = build_ligand_assays(size)
+        linear_time, linear_result = measure(group_ligand_assays_linear, ligand_assays)
+        indexed_time, indexed_result = measure(group_ligand_assays, ligand_assays)
+        assert linear_result == indexed_result
+        print(f"{size:>12}{linear_time:>12.3f}{indexed_time:>14.4f}{linear_time / indexed_time:>12.0f}x")
+
+
+if __name__ == "__main__":
+    main()
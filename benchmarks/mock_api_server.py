@@ -0,0 +1,348 @@
+"""
+Servidor HTTP local que reemplaza a las APIs de RCSB PDB, UniProt (IdMapping y
+entradas) y ChEMBL, para correr el programa completo sin acceder a la red.
+
+Uso (desde la raíz del repositorio):
+    python -m benchmarks.mock_api_server --port 8765
+    PDBINDPRED_API_MIRROR_URL=http://127.0.0.1:8765 python -m src.main --pdb 1MQ8
+
+El programa envía cada request a https://<host>/<ruta> a <servidor>/<host>/<ruta>
+(ver config.API_MIRROR_URL). Las respuestas se obtienen de:
+- Una grabación (--replay <carpeta>) hecha antes con --record <carpeta>, que
+  reenvía cada request a la API real y guarda su respuesta.
+- Respuestas sintéticas generadas de forma determinística para cualquier ID
+  (por defecto, o para los requests que no están en la grabación).
+
+Además se puede agregar una latencia por request (--latency, --jitter) y
+devolver una fracción de respuestas 429 (--rate-429, con Retry-After) o 503
+(--error-rate), para medir el comportamiento ante APIs lentas o saturadas.
+"""
+import argparse
+import base64
+import hashlib
+import json
+import os
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlencode, urlsplit
+from xml.sax.saxutils import escape
+
+import requests
+
+# Encabezados de las respuestas que se graban y se devuelven
+REPLAYED_HEADERS = ("Content-Type", "Link", "Location", "Retry-After")
+AFFINITY_TYPES = ["Ki", "Kd", "IC50", "EC50"]
+
+
+class Recordings:
+    """Respuestas grabadas, una por archivo JSON, indexadas por método, host, ruta, parámetros y cuerpo del request."""
+
+    def __init__(self, directory):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def get_path(self, method, path, body):
+        parts = urlsplit(path)
+        query = urlencode(sorted(parse_qs(parts.query, keep_blank_values=True).items()), doseq=True)
+        key = f"{method} {parts.path}?{query} {hashlib.sha256(body or b'').hexdigest()}"
+        return os.path.join(self.directory, hashlib.sha256(key.encode()).hexdigest() + ".json")
+
+    def get(self, method, path, body):
+        """Devuelve (status, encabezados, cuerpo) de la respuesta grabada, o None."""
+        record_path = self.get_path(method, path, body)
+        if not os.path.isfile(record_path):
+            return None
+        with open(record_path, "r") as f:
+            record = json.load(f)
+        return record["status"], record["headers"], base64.b64decode(record["body"])
+
+    def save(self, method, path, body, status, headers, content):
+        record = {"method": method, "path": path, "status": status, "headers": headers,
+                  "body": base64.b64encode(content).decode()}
+        with open(self.get_path(method, path, body), "w") as f:
+            json.dump(record, f)
+
+
+class SyntheticApis:
+    """
+    Genera respuestas con el mismo formato que las APIs reales para cualquier ID.
+    Los IDs PDB y UniProt se reparten entre `targets` targets ChEMBL distintos,
+    cada uno con `activities` actividades de unión.
+    """
+
+    def __init__(self, targets=50, activities=500):
+        self.targets = targets
+        self.activities = activities
+        self.jobs = {}
+        self.lock = threading.Lock()
+
+    def respond(self, method, host, path, query, body):
+        """Devuelve (status, encabezados, cuerpo) para un request, o None si no corresponde a ninguna API conocida."""
+        if host == "data.rcsb.org":
+            if method == "POST" and path == "/graphql":
+                ids = json.loads(body)["variables"]["ids"]
+                return self.json_response({"data": {"entries": [self.pdb_entry(pdb_id) for pdb_id in ids]}})
+            if path.startswith("/rest/v1/core/entry/"):
+                return self.json_response(self.pdb_entry(path.rsplit("/", 1)[-1]))
+        elif host == "rest.uniprot.org":
+            if method == "POST" and path == "/idmapping/run":
+                ids = parse_qs(body.decode())["ids"][0].split(",")
+                job_id = hashlib.sha1(",".join(ids).encode()).hexdigest()[:16]
+                with self.lock:
+                    self.jobs[job_id] = ids
+                return self.json_response({"jobId": job_id})
+            if path.startswith("/idmapping/status/"):
+                job_id = path.rsplit("/", 1)[-1]
+                return 303, {"Location": f"https://rest.uniprot.org/idmapping/results/{job_id}"}, b""
+            if path.startswith("/idmapping/results/"):
+                return self.idmapping_results(path.rsplit("/", 1)[-1], query)
+            if path.startswith("/uniprotkb/"):
+                return self.json_response(self.uniprot_entry(path.rsplit("/", 1)[-1]))
+        elif host == "www.ebi.ac.uk" and path.startswith("/chembl/api/data/activity"):
+            return self.chembl_page(path.endswith(".json"), query)
+        return None
+
+    def json_response(self, data, headers=None):
+        return 200, {"Content-Type": "application/json", **(headers or {})}, json.dumps(data).encode()
+
+    def target_number(self, id_):
+        digits = "".join(c for c in id_ if c.isdigit())
+        number = int(digits) if id_[:1] in "OPQ" and digits else int(hashlib.sha1(id_.upper().encode()).hexdigest(), 16)
+        return number % self.targets
+
+    def uniprot_id_for_pdb(self, pdb_id):
+        return f"P{self.target_number(pdb_id):05d}"
+
+    def pdb_entry(self, pdb_id):
+        seed = self.target_number(pdb_id)
+        return {
+            "rcsb_id": pdb_id.upper(),
+            "rcsb_entry_info": {"resolution_combined": [1.5 + seed % 20 / 10]},
+            "rcsb_accession_info": {"initial_release_date": f"{1995 + seed % 30}-01-01T00:00:00Z"},
+            "rcsb_primary_citation": {"pdbx_database_id_doi": f"10.1000/pdb.{pdb_id.lower()}"},
+        }
+
+    def uniprot_entry(self, uniprot_id):
+        number = self.target_number(uniprot_id)
+        return {
+            "primaryAccession": uniprot_id,
+            "entryAudit": {"firstPublicDate": f"{1990 + number % 30}-01-01"},
+            "references": [{"citation": {"citationCrossReferences": [{"database": "DOI", "id": f"10.1000/up.{uniprot_id}"}]}}],
+            "uniProtKBCrossReferences": [
+                {"database": "ChEMBL", "id": f"CHEMBL{100000 + number}"},
+                {"database": "PDB", "id": f"{number % 9 + 1}X{number % 100:02d}",
+                 "properties": [{"key": "Resolution", "value": "2.00 A"}]},
+            ],
+        }
+
+    def idmapping_results(self, job_id, query):
+        with self.lock:
+            ids = self.jobs.get(job_id)
+        if ids is None:
+            return 404, {"Content-Type": "application/json"}, b'{"messages": ["Job no encontrado"]}'
+        size = int(query.get("size", ["500"])[0])
+        cursor = int(query.get("cursor", ["0"])[0])
+        results = [{"from": pdb_id, "to": self.uniprot_id_for_pdb(pdb_id)} for pdb_id in ids[cursor:cursor + size]]
+        headers = {}
+        if cursor + size < len(ids):
+            next_url = f"https://rest.uniprot.org/idmapping/results/{job_id}?cursor={cursor + size}&size={size}"
+            headers["Link"] = f'<{next_url}>; rel="next"'
+        return self.json_response({"results": results}, headers)
+
+    def target_activities(self, chembl_target_id):
+        number = int(chembl_target_id.replace("CHEMBL", "")) % 100000
+        for index in range(self.activities):
+            yield {
+                "activity_id": number * 1000000 + index,
+                "molecule_chembl_id": f"CHEMBL{(number * 7919 + index % max(1, self.activities // 3)) % 2000000 + 1}",
+                "canonical_smiles": "C" * (index % 12 + 1) + "O",
+                "standard_value": f"{(index * 37 % 10000) / 10:.1f}",
+                "standard_type": AFFINITY_TYPES[index % len(AFFINITY_TYPES)],
+                "standard_units": "nM",
+                "document_year": 1990 + index % 30,
+                "assay_chembl_id": f"CHEMBL{3000000 + number * 10000 + index}",
+                "assay_description": "Binding affinity to the target (synthetic)",
+                "target_pref_name": f"Synthetic target {number}",
+            }
+
+    def chembl_page(self, as_json, query):
+        def values(name):
+            return set(query[name][0].split(",")) if name in query else None
+
+        types, ligands = values("standard_type__in"), values("molecule_chembl_id__in")
+        min_activity_id = int(query["activity_id__gt"][0]) if "activity_id__gt" in query else None
+        activities = [activity for activity in self.target_activities(query["target_chembl_id"][0])
+                      if (types is None or activity["standard_type"] in types)
+                      and (ligands is None or activity["molecule_chembl_id"] in ligands)
+                      and (min_activity_id is None or activity["activity_id"] > min_activity_id)]
+        limit = int(query.get("limit", ["20"])[0])
+        offset = int(query.get("offset", ["0"])[0])
+        page = activities[offset:offset + limit]
+        next_query = None
+        if offset + limit < len(activities):
+            next_params = {name: value[0] for name, value in query.items()}
+            next_params["offset"] = offset + limit
+            next_query = "/chembl/api/data/activity" + (".json" if as_json else "") + "?" + urlencode(next_params)
+        page_meta = {"limit": limit, "offset": offset, "total_count": len(activities), "next": next_query}
+        if as_json:
+            if "only" in query:
+                fields = query["only"][0].split(",")
+                page = [{field: activity.get(field) for field in fields} for activity in page]
+            return self.json_response({"activities": page, "page_meta": page_meta})
+        items = "".join("<activity>" + "".join(f"<{name}>{escape(str(value))}</{name}>" for name, value in activity.items())
+                        + "</activity>" for activity in page)
+        meta = "".join(f"<{name}>{escape(str(value))}</{name}>" if value is not None else f"<{name} />"
+                       for name, value in page_meta.items())
+        content = f'<?xml version="1.0" encoding="utf-8"?><response><activities>{items}</activities><page_meta>{meta}</page_meta></response>'
+        return 200, {"Content-Type": "application/xml"}, content.encode()
+
+
+class MockApiHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        self.handle_request("GET")
+
+    def do_POST(self):
+        self.handle_request("POST")
+
+    def handle_request(self, method):
+        server = self.server
+        length = int(self.headers.get("Content-Length") or 0)
+        body = self.rfile.read(length) if length else b""
+        parts = urlsplit(self.path)
+        host, _, path = parts.path.lstrip("/").partition("/")
+        path = "/" + path
+        query = parse_qs(parts.query)
+        server.count_request(host)
+
+        if server.latency or server.jitter:
+            time.sleep(max(0.0, server.latency + server.random_uniform(-server.jitter, server.jitter)))
+        roll = server.random_uniform(0, 1)
+        if roll < server.rate_429:
+            return self.send(429, {"Retry-After": str(server.retry_after), "Content-Type": "text/plain"}, b"Too Many Requests")
+        if roll < server.rate_429 + server.error_rate:
+            return self.send(503, {"Content-Type": "text/plain"}, b"Service Unavailable")
+
+        response = server.recordings.get(method, self.path, body) if server.recordings is not None else None
+        if response is None and server.record:
+            response = self.forward(method, host, path, parts.query, body)
+        if response is None and server.synthetic is not None:
+            response = server.synthetic.respond(method, host, path, query, body)
+        if response is None:
+            response = (404, {"Content-Type": "text/plain"}, f"Sin respuesta grabada para {method} {self.path}".encode())
+        self.send(*response)
+
+    def forward(self, method, host, path, query, body):
+        """Reenvía el request a la API real y graba su respuesta."""
+        url = f"https://{host}{path}" + (f"?{query}" if query else "")
+        headers = {name: self.headers[name] for name in ("Accept", "Content-Type") if self.headers.get(name)}
+        upstream = requests.request(method, url, data=body or None, headers=headers, allow_redirects=False, timeout=60)
+        response_headers = {name: upstream.headers[name] for name in REPLAYED_HEADERS if name in upstream.headers}
+        self.server.recordings.save(method, self.path, body, upstream.status_code, response_headers, upstream.content)
+        return upstream.status_code, response_headers, upstream.content
+
+    def send(self, status, headers, content):
+        # Como las APIs reales, los GET exitosos llevan un ETag y se pueden revalidar con If-None-Match
+        if status == 200 and self.command == "GET":
+            headers = {**headers, "ETag": headers.get("ETag") or f'"{hashlib.sha1(content).hexdigest()[:16]}"'}
+            if self.headers.get("If-None-Match") == headers["ETag"]:
+                status, content = 304, b""
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.send_header("Content-Length", str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class MockApiServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, recordings=None, record=False, synthetic=None, latency=0.0, jitter=0.0,
+                 rate_429=0.0, error_rate=0.0, retry_after=1, seed=0):
+        super().__init__(address, MockApiHandler)
+        self.recordings = recordings
+        self.record = record
+        self.synthetic = synthetic
+        self.latency = latency
+        self.jitter = jitter
+        self.rate_429 = rate_429
+        self.error_rate = error_rate
+        self.retry_after = retry_after
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.requests_by_host = {}
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def random_uniform(self, low, high):
+        with self.lock:
+            return self.random.uniform(low, high)
+
+    def count_request(self, host):
+        with self.lock:
+            self.requests_by_host[host] = self.requests_by_host.get(host, 0) + 1
+
+
+def start_server(port=0, replay_dir=None, record_dir=None, synthetic=True, targets=50, activities=500,
+                 latency=0.0, jitter=0.0, rate_429=0.0, error_rate=0.0, retry_after=1, seed=0):
+    """
+    Inicia el servidor en un hilo de fondo y lo devuelve (server.url es su dirección).
+    Las latencias se indican en segundos; rate_429 y error_rate son fracciones de los requests.
+    Para detenerlo: server.shutdown().
+    """
+    directory = record_dir or replay_dir
+    server = MockApiServer(("127.0.0.1", port), recordings=Recordings(directory) if directory else None,
+                           record=record_dir is not None,
+                           synthetic=SyntheticApis(targets, activities) if synthetic else None,
+                           latency=latency, jitter=jitter, rate_429=rate_429, error_rate=error_rate,
+                           retry_after=retry_after, seed=seed)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def add_server_arguments(parser):
+    parser.add_argument("--replay", help="Carpeta con respuestas grabadas para devolver")
+    parser.add_argument("--record", help="Carpeta donde grabar las respuestas de las APIs reales (requiere red)")
+    parser.add_argument("--no-synthetic", action="store_true", help="No generar respuestas sintéticas para los requests no grabados")
+    parser.add_argument("--targets", type=int, default=50, help="Cantidad de targets ChEMBL distintos de las respuestas sintéticas")
+    parser.add_argument("--activities", type=int, default=500, help="Actividades por target de las respuestas sintéticas")
+    parser.add_argument("--latency", type=float, default=0.0, help="Latencia agregada a cada request, en milisegundos")
+    parser.add_argument("--jitter", type=float, default=0.0, help="Variación aleatoria de la latencia, en milisegundos")
+    parser.add_argument("--rate-429", type=float, default=0.0, help="Fracción de requests respondidos con 429")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fracción de requests respondidos con 503")
+    parser.add_argument("--seed", type=int, default=0, help="Semilla de las fallas y latencias aleatorias")
+
+
+def start_server_from_arguments(args, port=0):
+    return start_server(port=port, replay_dir=args.replay, record_dir=args.record, synthetic=not args.no_synthetic,
+                        targets=args.targets, activities=args.activities, latency=args.latency / 1000,
+                        jitter=args.jitter / 1000, rate_429=args.rate_429, error_rate=args.error_rate, seed=args.seed)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Servidor local que reemplaza a las APIs de RCSB PDB, UniProt y ChEMBL")
+    parser.add_argument("--port", type=int, default=8765)
+    add_server_arguments(parser)
+    args = parser.parse_args()
+    server = start_server_from_arguments(args, args.port)
+    print(f"🧪 Servidor de prueba escuchando en {server.url}")
+    print(f"   Usar con: PDBINDPRED_API_MIRROR_URL={server.url} python -m src.main ...")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,175 @@
+import copy
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from src import config, metrics
+from src.get_ids_from_input import es_id_valido, chunked
+from src.pdb_handler import get_pdb_result, get_uniprot_result, get_ligands_for_result
+from src.query_plan import build_query_plan
+from src.run_journal import DONE, EMPTY, FAILED
+
+
+class Annotation:
+    """
+    Resultado de anotar un ID: kind ("PDB" o "UniProt"), id, state ("done",
+    "empty" si no hay target ChEMBL o la estructura no existe, o "failed"),
+    result (el mismo contenido que el archivo JSON de salida del programa) y
+    error (si falló o no se encontró el ID).
+    """
+
+    def __init__(self, kind, id_, state, result=None, error=None):
+        self.kind = kind
+        self.id = id_
+        self.state = state
+        self.result = result
+        self.error = error
+
+    def to_dict(self):
+        return {"kind": self.kind, "id": self.id, "state": self.state, "result": self.result, "error": self.error}
+
+    def __repr__(self):
+        return f"Annotation({self.kind} {self.id}: {self.state})"
+
+
+class ResultCache:
+    """
+    Caché en memoria de las últimas anotaciones (LRU, con vencimiento), para
+    que un proceso de larga duración (ver src/service.py) responda al instante
+    los IDs que ya anotó. Guarda y devuelve copias, así quien las recibe puede
+    modificarlas sin alterar la caché.
+    """
+
+    def __init__(self, max_items, ttl):
+        self.max_items = max_items
+        self.ttl = ttl
+        self.items = OrderedDict()  # clave -> (vencimiento, anotación)
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            item = self.items.get(key)
+            if item is None:
+                return None
+            expires, annotation = item
+            if expires < time.monotonic():
+                del self.items[key]
+                return None
+            self.items.move_to_end(key)
+        return copy.deepcopy(annotation)
+
+    def put(self, key, annotation):
+        if self.max_items <= 0:
+            return
+        annotation = copy.deepcopy(annotation)
+        with self.lock:
+            self.items[key] = (time.monotonic() + self.ttl, annotation)
+            self.items.move_to_end(key)
+            while len(self.items) > self.max_items:
+                self.items.popitem(last=False)
+
+    def clear(self):
+        with self.lock:
+            self.items.clear()
+
+
+_cache = ResultCache(config.API_CACHE_SIZE, config.API_CACHE_TTL)
+
+
+def annotate_pdb(pdb_ids, affinity_types=None, ligands=None, workers=None):
+    """
+    Anota IDs de PDB sin escribir archivos de salida: genera un Annotation por
+    cada ID recibido, en el mismo orden, a medida que cada bloque se procesa.
+    affinity_types y ligands filtran las actividades igual que --aff / --lig.
+    """
+    return annotate(pdb_ids=pdb_ids, affinity_types=affinity_types, ligands=ligands, workers=workers)
+
+
+def annotate_uniprot(uniprot_ids, affinity_types=None, ligands=None, workers=None):
+    """Igual que annotate_pdb, para IDs de UniProt."""
+    return annotate(uniprot_ids=uniprot_ids, affinity_types=affinity_types, ligands=ligands, workers=workers)
+
+
+def annotate(pdb_ids=(), uniprot_ids=(), affinity_types=None, ligands=None, workers=None):
+    """
+    Genera las anotaciones de los IDs de PDB y luego de los de UniProt. Los IDs
+    se procesan en bloques (como en src/main.py), planificando las consultas
+    de cada bloque; las anotaciones recientes se toman de la caché en memoria.
+    La caché de respuestas en disco y los snapshots de targets se usan según
+    http_client.configure y config.ENABLE_TARGET_STORE.
+    """
+    if workers is None:
+        workers = config.DEFAULT_WORKERS
+    workers = max(1, min(workers, config.MAX_WORKERS))
+    for chunk in chunked(pdb_ids, config.MAX_PDB_IDS_PER_QUERY):
+        yield from iter_chunk_annotations("PDB", chunk, affinity_types, ligands, workers)
+    for chunk in chunked(uniprot_ids, config.MAX_UNIPROT_IDS_PER_QUERY):
+        yield from iter_chunk_annotations("UniProt", chunk, affinity_types, ligands, workers)
+
+
+def iter_chunk_annotations(kind, ids, affinity_types, ligands, workers):
+    """Anota un bloque de IDs: resuelve en lote los que no están en la caché y los genera en el orden de entrada."""
+    ids = [id_.strip().upper() for id_ in ids]
+    annotations = {}
+    for id_ in ids:
+        if not is_valid_id(kind, id_):
+            annotations[id_] = Annotation(kind, id_, FAILED, error=f"ID {kind} inválido")
+        elif id_ not in annotations:
+            annotations[id_] = _cache.get(cache_key(kind, id_, affinity_types, ligands))
+            if annotations[id_] is not None:
+                metrics.increment("annotation_cache_hits")
+    missing = [id_ for id_, annotation in annotations.items() if annotation is None]
+    if not missing:
+        for id_ in ids:
+            yield annotations[id_]
+        return
+
+    pdb_ids, uniprot_ids = (missing, []) if kind == "PDB" else ([], missing)
+    plan = build_query_plan(pdb_ids, uniprot_ids, affinity_types, ligands, workers, save_results=False)
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = {id_: executor.submit(annotate_id, kind, id_, affinity_types, ligands, plan) for id_ in missing}
+        for id_ in ids:
+            if annotations[id_] is None:
+                annotations[id_] = futures[id_].result()
+            yield annotations[id_]
+
+
+def annotate_id(kind, id_, affinity_types, ligands, plan=None):
+    """Anota un ID (con los datos del plan de consultas, si los tiene) y guarda en la caché las anotaciones que no fallaron."""
+    get_result = get_pdb_result if kind == "PDB" else get_uniprot_result
+    try:
+        result = get_result(id_, plan)
+        if result is None:
+            annotation = Annotation(kind, id_, FAILED, error="No se pudieron obtener los IDs UniProt/ChEMBL")
+        elif not result.get("chembl_id"):
+            annotation = Annotation(kind, id_, EMPTY, result)
+        else:
+            result["ligands"] = get_ligands_for_result(result, affinity_types, ligands, plan)
+            annotation = Annotation(kind, id_, DONE, result)
+    except LookupError as e:
+        annotation = Annotation(kind, id_, EMPTY, error=str(e))
+    except Exception as e:
+        annotation = Annotation(kind, id_, FAILED, error=str(e))
+    if annotation.state != FAILED:
+        _cache.put(cache_key(kind, id_, affinity_types, ligands), annotation)
+    metrics.increment("annotations", kind=kind, state=annotation.state)
+    return annotation
+
+
+def is_valid_id(kind, id_):
+    """Valida un ID con los mismos criterios que los IDs de entrada del programa."""
+    if kind == "PDB":
+        return es_id_valido(id_, "PDB", 4, 4)
+    return es_id_valido(id_, "UniProt", 6, 10)
+
+
+def cache_key(kind, id_, affinity_types, ligands):
+    """Clave de la caché: los filtros se ordenan para que consultas equivalentes compartan la anotación."""
+    return (kind, id_, tuple(sorted(affinity_types)) if affinity_types is not None else None,
+            tuple(sorted(ligands)) if ligands is not None else None)
+
+
+def clear_cache():
+    """Descarta las anotaciones guardadas en memoria."""
+    _cache.clear()
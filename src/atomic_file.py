@@ -0,0 +1,37 @@
+import os
+import threading
+from contextlib import contextmanager
+
+
+def temp_path_for(path, suffix=".part"):
+    """
+    Ruta del archivo temporal con el que el proceso e hilo actuales escriben 
+    path: path.<pid>-<id del hilo>.part. Es única para cada escritor en curso y 
+    se puede conocer de antemano (ej: para leer en paralelo un archivo .jsonl 
+    mientras se escribe; también es el atributo name del archivo abierto).
+    """
+    return f"{path}.{os.getpid()}-{threading.get_native_id()}{suffix}"
+
+
+@contextmanager
+def atomic_open(path, mode="w", suffix=".part"):
+    """
+    Abre un archivo temporal propio de quien escribe (ver temp_path_for, en la 
+    misma carpeta) y, si la escritura termina sin errores, lo renombra a path 
+    de forma atómica. Así nunca queda un archivo de salida a medio escribir: 
+    ante cualquier error el temporal se elimina y la excepción se propaga. 
+    Como cada proceso e hilo usa su propio temporal, dos escrituras 
+    simultáneas del mismo archivo no se pisan: el resultado es el de la 
+    última en terminar.
+    """
+    temp_path = temp_path_for(path, suffix)
+    try:
+        with open(temp_path, mode) as f:
+            yield f
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
@@ -0,0 +1,236 @@
+import glob
+import gzip
+import json
+import os
+import sqlite3
+import threading
+
+from src import config, get_ids_from_apis, pdb_handler
+
+# Actividades de unión de un target en una release SQLite de ChEMBL, con los mismos
+# campos (CHEMBL_ACTIVITY_FIELDS) y el mismo orden que la API REST
+CHEMBL_ACTIVITIES_QUERY = """
+SELECT md.chembl_id AS molecule_chembl_id, cs.canonical_smiles, act.standard_value, act.standard_type,
+       act.standard_units, d.year AS document_year, a.chembl_id AS assay_chembl_id, act.activity_id
+FROM activities act
+JOIN assays a ON act.assay_id = a.assay_id
+JOIN target_dictionary td ON a.tid = td.tid
+JOIN molecule_dictionary md ON act.molregno = md.molregno
+LEFT JOIN compound_structures cs ON act.molregno = cs.molregno
+LEFT JOIN docs d ON act.doc_id = d.doc_id
+WHERE td.chembl_id = ? AND a.assay_type = 'B'
+"""
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+class RestBackend:
+    """
+    Fuente de datos por defecto: las APIs REST de RCSB PDB, UniProt y ChEMBL
+    (ver src/pdb_handler.py y src/get_ids_from_apis.py).
+    """
+    name = "rest"
+    remote = True
+
+    def fetch_pdb_info(self, pdb_id):
+        return pdb_handler.fetch_pdb_info(pdb_id)
+
+    def fetch_pdb_info_batch(self, pdb_ids):
+        return pdb_handler.fetch_pdb_info_batch(pdb_ids)
+
+    def get_uniprot_id_from_pdb_id(self, pdb_id):
+        return get_ids_from_apis.get_uniprot_id_from_pdb_id(pdb_id)
+
+    def get_uniprot_ids_from_pdb_ids(self, pdb_ids):
+        return get_ids_from_apis.get_uniprot_ids_from_pdb_ids(pdb_ids)
+
+    def get_data_from_uniprot_id(self, uniprot_id):
+        return get_ids_from_apis.get_data_from_uniprot_id(uniprot_id)
+
+    def iter_binding_activities(self, chembl_target_id, affinity_types=None, ligands=None, transport=None, min_activity_id=None):
+        return pdb_handler.iter_binding_activities_for_target_from_chembl(chembl_target_id, affinity_types, ligands, transport,
+                                                                         min_activity_id=min_activity_id)
+
+
+class LocalBackend:
+    """
+    Fuente de datos offline a partir de archivos locales en data_dir:
+    - La release SQLite de ChEMBL (config.LOCAL_CHEMBL_DB, ej: chembl_34.db).
+    - La tabla de SIFTS de mapeos PDB -> UniProt (config.LOCAL_SIFTS_FILE).
+    - Un extracto de entradas UniProt en JSON Lines, con los mismos campos que
+      pide get_data_from_uniprot_id (config.LOCAL_UNIPROT_FILE).
+    - Un extracto de entradas de RCSB PDB en JSON Lines, con los mismos campos que
+      la consulta GraphQL de fetch_pdb_info_batch (config.LOCAL_PDB_FILE).
+    Devuelve los datos con el mismo formato que RestBackend, por lo que los
+    resultados son los mismos con ambos backends.
+    """
+    name = "local"
+    remote = False
+
+    def __init__(self, data_dir):
+        self.data_dir = data_dir
+        self.chembl_db = find_data_file(data_dir, config.LOCAL_CHEMBL_DB)
+        self.sifts_file = os.path.join(data_dir, config.LOCAL_SIFTS_FILE)
+        self.pdb_entries = JsonLinesIndex(os.path.join(data_dir, config.LOCAL_PDB_FILE), "rcsb_id")
+        self.uniprot_entries = JsonLinesIndex(os.path.join(data_dir, config.LOCAL_UNIPROT_FILE), "primaryAccession")
+        self.uniprot_ids = None
+        self.lock = threading.Lock()
+        self.connections = threading.local()
+
+    def fetch_pdb_info(self, pdb_id):
+        entry = self.pdb_entries.get(pdb_id.upper())
+        if entry is None:
+            raise LookupError(f"PDB ID '{pdb_id}' no encontrado en {self.pdb_entries.path}")
+        print(f"✅ Datos básicos obtenidos para PDB ID '{pdb_id}'")
+        return pdb_handler.build_pdb_info_result(pdb_id, entry)
+
+    def fetch_pdb_info_batch(self, pdb_ids):
+        results = {}
+        for pdb_id in pdb_ids:
+            entry = self.pdb_entries.get(pdb_id.upper())
+            if entry is not None:
+                results[pdb_id] = pdb_handler.build_pdb_info_result(pdb_id, entry)
+        print(f"✅ Datos básicos obtenidos para {len(results)} de {len(pdb_ids)} PDB ID(s)")
+        return results
+
+    def get_uniprot_id_from_pdb_id(self, pdb_id):
+        uniprot_id = self.load_uniprot_ids().get(pdb_id.upper())
+        if uniprot_id is None:
+            raise LookupError(f"PDB ID '{pdb_id}' sin mapeo a UniProt en {self.sifts_file}")
+        print(f"✅ UniProt ID obtenido para PDB ID '{pdb_id}': {uniprot_id}")
+        return uniprot_id
+
+    def get_uniprot_ids_from_pdb_ids(self, pdb_ids):
+        mapping = self.load_uniprot_ids()
+        uniprot_ids = {pdb_id: mapping[pdb_id.upper()] for pdb_id in pdb_ids if pdb_id.upper() in mapping}
+        print(f"✅ UniProt IDs obtenidos para {len(uniprot_ids)} de {len(pdb_ids)} PDB ID(s)")
+        return uniprot_ids
+
+    def get_data_from_uniprot_id(self, uniprot_id):
+        # Igual que la API, un accession inexistente devuelve una entrada sin referencias cruzadas
+        return self.uniprot_entries.get(uniprot_id.upper()) or {}
+
+    def iter_binding_activities(self, chembl_target_id, affinity_types=None, ligands=None, transport=None, min_activity_id=None):
+        query = CHEMBL_ACTIVITIES_QUERY
+        params = [chembl_target_id]
+        if ligands is not None:
+            query += f" AND md.chembl_id IN ({','.join('?' * len(ligands))})"
+            params += list(ligands)
+        if affinity_types is not None:
+            query += f" AND act.standard_type IN ({','.join('?' * len(affinity_types))})"
+            params += list(affinity_types)
+        if min_activity_id is not None:
+            query += " AND act.activity_id > ?"
+            params.append(min_activity_id)
+        query += " ORDER BY act.activity_id"
+        print(f"📂 Consultando la base local de ChEMBL para obtener ligandos asociados a ChEMBL ID '{chembl_target_id}'...")
+        cursor = self.get_connection().execute(query, params)
+        columns = [column[0] for column in cursor.description]
+        for row in cursor:
+            yield dict(zip(columns, row))
+
+    def get_connection(self):
+        """Conexión de sólo lectura a la base de ChEMBL, una por hilo."""
+        connection = getattr(self.connections, "connection", None)
+        if connection is None:
+            if self.chembl_db is None:
+                raise FileNotFoundError(f"No se encontró la base SQLite de ChEMBL ({config.LOCAL_CHEMBL_DB}) en {self.data_dir}")
+            connection = sqlite3.connect(f"file:{self.chembl_db}?mode=ro", uri=True)
+            self.connections.connection = connection
+        return connection
+
+    def load_uniprot_ids(self):
+        """
+        Carga (una sola vez) la tabla de SIFTS como {id PDB: id UniProt}. Como en
+        la API de IdMapping, se toma el primer accession de cada estructura.
+        """
+        with self.lock:
+            if self.uniprot_ids is None:
+                uniprot_ids = {}
+                with open_text(self.sifts_file) as f:
+                    header = None
+                    for line in f:
+                        if line.startswith("#") or not line.strip():
+                            continue
+                        fields = line.rstrip("\n").split("\t" if "\t" in line else ",")
+                        if header is None:
+                            header = {name.strip().upper(): index for index, name in enumerate(fields)}
+                            continue
+                        uniprot_ids.setdefault(fields[header["PDB"]].upper(), fields[header["SP_PRIMARY"]])
+                self.uniprot_ids = uniprot_ids
+        return self.uniprot_ids
+
+
+class JsonLinesIndex:
+    """
+    Acceso por clave a un archivo JSON Lines sin cargarlo en memoria: la primera
+    consulta recorre el archivo y guarda la posición de cada línea por su clave.
+    """
+
+    def __init__(self, path, key):
+        self.path = path
+        self.key = key
+        self.offsets = None
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        offset = self.load_offsets().get(key)
+        if offset is None:
+            return None
+        with open(self.path, "rb") as f:
+            f.seek(offset)
+            return json.loads(f.readline())
+
+    def load_offsets(self):
+        with self.lock:
+            if self.offsets is None:
+                offsets = {}
+                with open(self.path, "rb") as f:
+                    offset = f.tell()
+                    for line in iter(f.readline, b""):
+                        if line.strip():
+                            offsets.setdefault(str(json.loads(line)[self.key]).upper(), offset)
+                        offset = f.tell()
+                self.offsets = offsets
+        return self.offsets
+
+
+def find_data_file(data_dir, pattern):
+    """Devuelve el primer archivo de data_dir que coincide con pattern (ej: chembl_*.db), o None."""
+    matches = sorted(glob.glob(os.path.join(data_dir, pattern)))
+    return matches[-1] if matches else None
+
+
+def open_text(path):
+    """Abre un archivo de texto, comprimido con gzip o no."""
+    if path.endswith(".gz"):
+        return gzip.open(path, "rt")
+    return open(path, "r")
+
+
+def configure(name, data_dir=None):
+    """
+    Selecciona el backend de datos de la ejecución: "rest" (por defecto) o
+    "local" (requiere data_dir con los archivos descriptos en LocalBackend).
+    """
+    global _backend
+    with _backend_lock:
+        config.BACKEND = name
+        if data_dir is not None:
+            config.LOCAL_DATA_DIR = data_dir
+        _backend = None
+
+
+def get_backend():
+    """Devuelve el backend de datos configurado, creándolo la primera vez."""
+    global _backend
+    with _backend_lock:
+        if _backend is None:
+            if config.BACKEND == "local":
+                if not config.LOCAL_DATA_DIR:
+                    raise ValueError("El backend local requiere una carpeta de datos (--data-dir)")
+                _backend = LocalBackend(config.LOCAL_DATA_DIR)
+            else:
+                _backend = RestBackend()
+        return _backend
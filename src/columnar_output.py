@@ -0,0 +1,156 @@
+import glob
+import os
+
+# Columnas de la tabla de ligandos/ensayos, en orden
+COLUMNS = ["target", "ligand_id", "smiles", "assay_id", "type", "value", "unit", "year"]
+
+# Extensión de archivo de cada formato de salida
+EXTENSIONS = {"json": ".json", "jsonl": ".jsonl", "parquet": ".parquet", "arrow": ".arrow", "npz": ".npz"}
+
+# Dependencia opcional que requiere cada formato de salida
+FORMAT_DEPENDENCIES = {"parquet": "pyarrow", "arrow": "pyarrow", "npz": "numpy"}
+
+# En .npz no hay enteros nulos: los años desconocidos se guardan con este valor
+NPZ_MISSING_YEAR = -1
+
+
+def split_affinity_key(key):
+    """
+    Separa la clave dinámica de afinidad de un ensayo (ej. "IC50 (nM)") en 
+    tipo y unidad. Devuelve (tipo, unidad), con unidad None si no la tiene.
+    """
+    if key.endswith(")") and " (" in key:
+        type_, unit = key[:-1].rsplit(" (", 1)
+        return type_, unit
+    return key, None
+
+
+def ligands_to_columns(target, ligands):
+    """
+    Convierte la lista de ligandos de un resultado (con sus ensayos) en una 
+    tabla columnar: un diccionario {columna: lista de valores} con una fila 
+    por ensayo. Los valores no numéricos quedan como None en la columna value.
+    """
+    columns = {column: [] for column in COLUMNS}
+    for ligand in ligands:
+        for assay in ligand["assays"]:
+            affinity_key = next(key for key in assay if key not in ("assay id", "publication_year"))
+            type_, unit = split_affinity_key(affinity_key)
+            value = assay[affinity_key]
+            year = assay.get("publication_year")
+            columns["target"].append(target)
+            columns["ligand_id"].append(ligand["chembl_id"])
+            columns["smiles"].append(ligand.get("canonical_smiles"))
+            columns["assay_id"].append(assay["assay id"])
+            columns["type"].append(type_)
+            columns["value"].append(value if isinstance(value, float) else None)
+            columns["unit"].append(unit)
+            columns["year"].append(int(year) if year else None)
+    return columns
+
+
+def write_columnar(output, columns, output_format):
+    """
+    Guarda una tabla columnar en output (una ruta o un archivo binario abierto) 
+    en el formato indicado: "parquet" o "arrow" (Arrow IPC, requieren pyarrow) 
+    o "npz" (requiere numpy).
+    """
+    if output_format == "npz":
+        np = import_optional("numpy", output_format)
+        np.savez_compressed(output, **columns_to_numpy(columns))
+        return
+    pa = import_optional("pyarrow", output_format)
+    table = columns_to_arrow(columns)
+    if output_format == "parquet":
+        import pyarrow.parquet as pq
+        pq.write_table(table, output)
+    elif output_format == "arrow":
+        with pa.ipc.new_file(output, table.schema) as writer:
+            writer.write_table(table)
+    else:
+        raise ValueError(f"Formato de salida desconocido: {output_format}")
+
+
+def read_targets(paths):
+    """
+    Carga en una única tabla los resultados columnares de muchos targets, sin 
+    pasar por JSON. Recibe una lista de archivos o una carpeta (se leen todos 
+    los archivos del formato de los que contenga). El formato se deduce de la 
+    extensión: .parquet y .arrow devuelven un pyarrow.Table; .npz devuelve un 
+    diccionario {columna: numpy.ndarray}.
+    """
+    if isinstance(paths, str) and os.path.isdir(paths):
+        directory = paths
+        paths = []
+        for extension in (".parquet", ".arrow", ".npz"):
+            paths += sorted(glob.glob(os.path.join(directory, f"*{extension}")))
+    if not paths:
+        raise FileNotFoundError("No se encontraron archivos columnares para leer")
+    extensions = {os.path.splitext(path)[1] for path in paths}
+    if len(extensions) > 1:
+        raise ValueError(f"Los archivos a leer deben tener un único formato, se encontraron: {sorted(extensions)}")
+
+    if extensions == {".npz"}:
+        np = import_optional("numpy", "npz")
+        arrays = []
+        for path in paths:
+            with np.load(path) as data:
+                arrays.append({column: data[column] for column in COLUMNS})
+        return {column: np.concatenate([array[column] for array in arrays]) for column in COLUMNS}
+
+    pa = import_optional("pyarrow", extensions.pop().lstrip("."))
+    tables = []
+    for path in paths:
+        if path.endswith(".parquet"):
+            import pyarrow.parquet as pq
+            tables.append(pq.read_table(path))
+        else:
+            with pa.memory_map(path, "r") as source:
+                tables.append(pa.ipc.open_file(source).read_all())
+    return pa.concat_tables(tables)
+
+
+def columns_to_arrow(columns):
+    """Convierte una tabla columnar en un pyarrow.Table con tipos explícitos."""
+    import pyarrow as pa
+    schema = pa.schema([
+        ("target", pa.string()), ("ligand_id", pa.string()), ("smiles", pa.string()),
+        ("assay_id", pa.string()), ("type", pa.string()), ("value", pa.float64()),
+        ("unit", pa.string()), ("year", pa.int32()),
+    ])
+    return pa.Table.from_pydict(columns, schema=schema)
+
+
+def columns_to_numpy(columns):
+    """Convierte una tabla columnar en arrays de numpy tipados (texto, float64 e int32)."""
+    import numpy as np
+    arrays = {}
+    for column in COLUMNS:
+        if column == "value":
+            arrays[column] = np.array([np.nan if value is None else value for value in columns[column]], dtype=np.float64)
+        elif column == "year":
+            arrays[column] = np.array([NPZ_MISSING_YEAR if year is None else year for year in columns[column]], dtype=np.int32)
+        else:
+            arrays[column] = np.array(["" if text is None else text for text in columns[column]], dtype=np.str_)
+    return arrays
+
+
+def check_format_dependency(output_format):
+    """
+    Verifica que esté instalada la dependencia opcional del formato de salida 
+    (si la tiene). Lanza ImportError, indicando cómo instalarla, si no lo está.
+    """
+    module_name = FORMAT_DEPENDENCIES.get(output_format)
+    if module_name is not None:
+        import_optional(module_name, output_format)
+
+
+def import_optional(module_name, output_format):
+    """
+    Importa una dependencia opcional, indicando cómo instalarla si no está disponible.
+    """
+    try:
+        return __import__(module_name)
+    except ImportError:
+        raise ImportError(f"El formato '{output_format}' requiere el paquete {module_name}. "
+                          f"Instálelo con: pip install {module_name}")
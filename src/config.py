@@ -1,15 +1,110 @@
 # src/config.py
+import os
 
-# Límite de IDs permitidos por consulta
+# Límite de IDs por consulta: las entradas más grandes se procesan en bloques de este tamaño
 MAX_UNIPROT_IDS_PER_QUERY = 1000  # Límite de UniProt (documentado)
 MAX_PDB_IDS_PER_QUERY = MAX_UNIPROT_IDS_PER_QUERY  # Usamos el mismo límite por simplicidad
 
+# Cantidad de resultados por página al recuperar un job de UniProt IdMapping
+UNIPROT_IDMAPPING_PAGE_SIZE = 500  # Máximo documentado por UniProt
+
+# Consulta del estado de los jobs de UniProt IdMapping (en segundos)
+UNIPROT_IDMAPPING_POLL_INITIAL_DELAY = 0.5  # Primera espera; luego se duplica (con jitter)
+UNIPROT_IDMAPPING_POLL_MAX_DELAY = 10  # Espera máxima entre consultas de estado
+UNIPROT_IDMAPPING_TIMEOUT = 300  # Plazo máximo para que terminen los jobs
+
+# Cantidad de estructuras por request a la API GraphQL de RCSB PDB
+RCSB_GRAPHQL_BATCH_SIZE = 200
+
+# Formato de las respuestas de ChEMBL: "xml" (todos los campos) o "json" (sólo los campos usados)
+CHEMBL_TRANSPORT = "xml"  # Modificable con --chembl-format
+
+# Paginación de actividades de ChEMBL
+CHEMBL_PAGE_SIZE = 1000  # Máximo "limit" aceptado por la API de ChEMBL
+CHEMBL_MAX_CONCURRENT_PAGES = 4  # Requests simultáneos a ChEMBL, sumando todos los workers
+# Procesos que parsean las páginas de ChEMBL mientras se descargan las siguientes (0 = parsear en el mismo hilo)
+CHEMBL_PARSE_PROCESSES = os.cpu_count() or 1
+
 # Máximo de afinidades por request a ChEMBL (aunque limitadas por diseño)
 MAX_CHEMBL_AFFINITY_TYPES = 1000  # No suele ser un problema en tu caso
 
-# Tiempo de espera entre requests para evitar rate limits (en segundos)
-UNIPROT_REQUEST_DELAY = 0.5  # Medio segundo
-CHEMBL_REQUEST_DELAY = 0.5  # Opcional, si querés regular
+# Límite de requests por host (src/rate_limiter.py), para evitar rate limits: 
+# (requests por segundo, ráfaga máxima, requests en curso a la vez)
+RATE_LIMITS = {
+    "rest.uniprot.org": (10, 10, 8),
+    "www.ebi.ac.uk": (10, 10, 8),
+    "data.rcsb.org": (10, 10, 8),
+}
+RATE_LIMIT_DEFAULT = (5, 5, 4)  # Para cualquier otro host
+RATE_LIMIT_STATUS_CODES = (429, 503)  # Respuestas que indican que hay que bajar el ritmo
+RATE_LIMIT_MIN_RATE = 0.2  # Nunca menos de un request cada 5 segundos
+RATE_LIMIT_INCREASE = 1.0  # Crecimiento del ritmo tras cada respuesta exitosa (requests por segundo, por segundo)
+RATE_LIMIT_MAX_RETRIES = 5  # Reintentos de un request respondido con 429
+RATE_LIMIT_MAX_RETRY_AFTER = 60  # Espera máxima aceptada de un Retry-After (en segundos)
+
+# Formato de los archivos de salida: "json", "jsonl" (una línea por ensayo, escrita a medida que llegan), o sólo la tabla de ligandos/ensayos en
+# formato columnar "parquet" / "arrow" (requieren pyarrow) o "npz" (requiere numpy)
+OUTPUT_FORMAT = "json"  # Modificable con --format
+
+# Fuente de datos (src/backends.py): "rest" consulta las APIs; "local" usa archivos en LOCAL_DATA_DIR
+BACKEND = "rest"  # Modificable con --backend
+LOCAL_DATA_DIR = None  # Modificable con --data-dir
+LOCAL_CHEMBL_DB = "chembl_*.db"  # Release SQLite de ChEMBL (se usa la más reciente)
+LOCAL_SIFTS_FILE = "pdb_chain_uniprot.tsv.gz"  # Tabla de SIFTS de mapeos PDB -> UniProt
+LOCAL_UNIPROT_FILE = "uniprot_entries.jsonl"  # Una entrada UniProt (JSON de la API) por línea
+LOCAL_PDB_FILE = "pdb_entries.jsonl"  # Una entrada de RCSB PDB (JSON de la API GraphQL) por línea
+
+# Actualización incremental de resultados ya guardados (modificable con --refresh): de cada target se descargan sólo las
+# actividades con activity_id mayor al último guardado en su snapshot, y las respuestas cacheadas de estos hosts se revalidan
+# con requests condicionales (If-None-Match / If-Modified-Since)
+REFRESH = False
+CONDITIONAL_REQUEST_SOURCES = ("data.rcsb.org", "rest.uniprot.org")
+
+# Carpeta de los archivos de salida
+OUTPUT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "output")
+
+# Diario de ejecución: estado de cada ID procesado, para poder retomar una ejecución interrumpida con --resume
+JOURNAL_DIR = os.path.join(OUTPUT_DIR, "journals")
 
 # ¿Habilitar cacheo local? Si es True, se usa el JSON local si ya existe
-ENABLE_LOCAL_CACHE = True
\ No newline at end of file
+ENABLE_LOCAL_CACHE = True
+
+# Caché en disco de respuestas de las APIs (modificable con --cache-dir / --no-cache)
+ENABLE_RESPONSE_CACHE = True
+CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "cache")
+CACHE_MAX_BYTES = 1024 * 1024 * 1024  # 1 GB; al superarlo se eliminan las respuestas menos usadas
+CACHE_DEFAULT_TTL = 24 * 60 * 60  # Un día (en segundos)
+CACHE_TTLS = {  # TTL por fuente (host), en segundos
+    "data.rcsb.org": 7 * 24 * 60 * 60,
+    "rest.uniprot.org": 7 * 24 * 60 * 60,
+    "www.ebi.ac.uk": 24 * 60 * 60,  # ChEMBL
+}
+
+# Snapshots sin filtros de las actividades de cada target ChEMBL: las consultas con --aff / --lig
+# se responden filtrando localmente mientras haya un snapshot vigente
+ENABLE_TARGET_STORE = True  # Se deshabilita junto con la caché de respuestas (--no-cache)
+TARGET_STORE_DIR = os.path.join(CACHE_DIR, "targets")
+TARGET_SNAPSHOT_TTL = 7 * 24 * 60 * 60  # Una semana (en segundos)
+
+# API para usar el programa como biblioteca (src/api.py) y servicio HTTP local de anotación (src/service.py)
+API_CACHE_SIZE = 10000  # Anotaciones recientes que se guardan en memoria (0 = ninguna)
+API_CACHE_TTL = 24 * 60 * 60  # Vigencia de cada anotación en memoria (en segundos)
+SERVICE_HOST = "127.0.0.1"
+SERVICE_PORT = 8780
+
+# Cada cuántos segundos se informa el progreso de la ejecución (src/progress.py)
+PROGRESS_INTERVAL = 10
+
+# Cantidad de IDs que se procesan en simultáneo (modificable con --workers)
+DEFAULT_WORKERS = 1  # 1 = ejecución secuencial, como antes
+MAX_WORKERS = 32  # Tope para no saturar las APIs externas
+
+# Cliente HTTP compartido (src/http_client.py)
+HTTP_TIMEOUT = 10  # Timeout por request (en segundos)
+HTTP_MAX_RETRIES = 3  # Reintentos ante errores 5xx o conexiones cortadas
+HTTP_RETRY_BACKOFF = 0.5  # Espera base entre reintentos (se duplica en cada intento)
+HTTP_RETRY_STATUS_CODES = (500, 502, 503, 504)
+HTTP_POOL_HOSTS = 4  # Cantidad de hosts distintos (RCSB, UniProt, ChEMBL) con pool propio
+# Si se indica (ej: http://127.0.0.1:8765), los requests a https://<host>/<ruta> se envían a <API_MIRROR_URL>/<host>/<ruta>.
+# Lo usa el servidor de prueba de benchmarks/mock_api_server.py para correr el programa completo sin acceder a las APIs.
+API_MIRROR_URL = os.environ.get("PDBINDPRED_API_MIRROR_URL")
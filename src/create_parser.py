@@ -1,5 +1,6 @@
 import argparse
 from argparse import RawTextHelpFormatter
+from src import config
 
 
 class CustomArgumentParser(argparse.ArgumentParser):
@@ -12,13 +13,19 @@ class CustomArgumentParser(argparse.ArgumentParser):
         Redefine el título por defecto del grupo de argumentos opcionales.
         """
         return 'Opciones'
-    def error(self, message):
+    def error(self, message=None):
         """
-        Lanza una excepción con un mensaje personalizado cuando hay un error de argumentos.
+        Lanza una excepción con un mensaje personalizado cuando hay un error de argumentos,
+        precedido por el motivo del error si se indica.
         """
-        raise Exception("Los argumentos posibles son: --pdb, "
+        raise Exception((f"{message}. " if message else "") +
+                        "Los argumentos posibles son: --pdb, "
                         "--pdb-file, --uniprot, --uniprot-file, --aff "
-                        "--lig, --lig-file. Para más "
+                        "--lig, --lig-file, --workers, --cache-dir, "
+                        "--no-cache, --chembl-format, --format, --resume, "
+                        "--backend, --data-dir, --profile, --prometheus, "
+                        "--refresh. "
+                        "Para más "
                         "información revise el archivo README o consulte "
                         "la ayuda de este programa escribiendo: python -m "
                         "src.main --help")
@@ -41,6 +48,13 @@ def create_parser():
     python -m src.main --pdb-file ids_pdb.txt
     python -m src.main --uniprot P12345,Q8N163
     python -m src.main --uniprot-file ids_uniprot.txt
+    python -m src.main --pdb-file ids_pdb.txt --workers 8
+    python -m src.main --pdb 1MQ8 --no-cache
+    python -m src.main --uniprot-file ids_uniprot.txt --format parquet
+    python -m src.main --pdb-file ids_pdb.txt --backend local --data-dir /datos/mirror
+    python -m src.main --pdb-file ids_pdb.txt --profile perfil.json
+    python -m src.main --pdb-file ids_pdb.txt --resume src/output/journals/run_20240101-120000.jsonl
+    python -m src.main --pdb-file ids_pdb.txt --refresh
     
     El archivo ingresado debe tener una ID por línea, sin ningún otro 
     separador, y debe encontrarse ubicado en la misma carpeta que el 
@@ -55,4 +69,24 @@ def create_parser():
     parser.add_argument("--aff", help="Tipos de afinidad a incluir, separados por coma (ej: Ki,Kd,IC50)")
     parser.add_argument("--lig", help="IDs Uniprot de ligandos sobre los cuales se quiere conocer la afinidad, separados por coma")
     parser.add_argument("--lig-file", help="Archivo con una lista de IDs Uniprot de ligandos sobre los cuales se quiere conocer la afinidad, uno por línea")
+    parser.add_argument("--workers", type=int, default=config.DEFAULT_WORKERS,
+                        help=f"Cantidad de IDs a procesar en simultáneo (por defecto {config.DEFAULT_WORKERS}, máximo {config.MAX_WORKERS})")
+    parser.add_argument("--cache-dir", help="Carpeta donde se guarda la caché de respuestas de las APIs (por defecto src/cache)")
+    parser.add_argument("--no-cache", action="store_true", help="No usar ni guardar respuestas en la caché de las APIs")
+    parser.add_argument("--chembl-format", choices=["xml", "json"], default=config.CHEMBL_TRANSPORT,
+                        help="Formato de las consultas a ChEMBL: xml, o json pidiendo sólo los campos usados (más liviano)")
+    parser.add_argument("--format", choices=["json", "jsonl", "parquet", "arrow", "npz"], default=config.OUTPUT_FORMAT,
+                        help="Formato de los archivos de salida: json (por defecto), jsonl (una línea por ensayo, escrita a medida que se procesa), o tabla columnar de ligandos/ensayos en parquet, arrow o npz")
+    parser.add_argument("--resume", metavar="JOURNAL",
+                        help="Diario de una ejecución anterior: se omiten los IDs ya terminados y se reintentan los pendientes o fallidos")
+    parser.add_argument("--backend", choices=["rest", "local"], default=config.BACKEND,
+                        help="Fuente de datos: rest (APIs de RCSB PDB, UniProt y ChEMBL, por defecto) o local (copia offline en --data-dir)")
+    parser.add_argument("--data-dir", help="Carpeta con la copia local de ChEMBL (SQLite), SIFTS y los extractos de UniProt y RCSB PDB (para --backend local)")
+    parser.add_argument("--profile", nargs="?", const="", metavar="ARCHIVO",
+                        help="Al terminar, guarda en ARCHIVO (por defecto src/output/profile_<fecha>.json) el tiempo de cada etapa, "
+                             "los bytes descargados por host, los reintentos y los aciertos de caché")
+    parser.add_argument("--prometheus", metavar="ARCHIVO", help="Al terminar, guarda las mismas mediciones en formato de texto de Prometheus")
+    parser.add_argument("--refresh", action="store_true",
+                        help="Actualiza los resultados ya guardados: de cada target ChEMBL se descargan sólo las actividades nuevas "
+                             "y los datos de RCSB PDB / UniProt se revalidan con requests condicionales")
     return parser
@@ -1,31 +1,115 @@
-import sys
+import random
+import time
 import requests
 import json
+from src import config, http_client, metrics, single_flight
+from src.response_cache import normalize_request_key
 
+UNIPROT_IDMAPPING_RUN_URL = "https://rest.uniprot.org/idmapping/run"
+
+@single_flight.coalesce("uniprot_idmapping", key=lambda pdb_id: pdb_id.upper())
+@metrics.timed("uniprot_idmapping")
 def get_uniprot_id_from_pdb_id(pdb_id: str):
     """
     Recibe una id PDB como string. Realiza un request para mapear la id 
     en UniProt y devuelve la id UniProt como string para el mismo elemento.
     """
-    params_pdb_to_uniprot = {
-        "from": "PDB",
-        "to": "UniProtKB",
-        "ids": pdb_id
-    }
-    result = post_request_in_uniprot_idmapping(params_pdb_to_uniprot)
-    data = get_result_from_uniprot_idmapping_job(result)
-    id_uniprot = data.get("results")[0].get("to")
+    id_uniprot = get_cached_uniprot_id_from_pdb_id(pdb_id)
+    if id_uniprot is None:
+        params_pdb_to_uniprot = {
+            "from": "PDB",
+            "to": "UniProtKB",
+            "ids": pdb_id
+        }
+        result = post_request_in_uniprot_idmapping(params_pdb_to_uniprot)
+        data = get_result_from_uniprot_idmapping_job(result)
+        id_uniprot = data.get("results")[0].get("to")
+        store_uniprot_id_from_pdb_id(pdb_id, id_uniprot)
 
     print(f"✅ UniProt ID obtenido para PDB ID '{pdb_id}': {id_uniprot}")
     return id_uniprot
 
+@single_flight.coalesce("uniprot_idmapping_batch", key=lambda pdb_ids: tuple(sorted(pdb_ids)))
+@metrics.timed("uniprot_idmapping")
+def get_uniprot_ids_from_pdb_ids(pdb_ids):
+    """
+    Recibe una lista de ids PDB. Mapea los ids en UniProt usando un único job 
+    de IdMapping por cada bloque de hasta config.MAX_PDB_IDS_PER_QUERY ids, 
+    recorriendo todas las páginas de resultados.
+    Devuelve un diccionario {id PDB: id UniProt}. Los ids sin mapeo no se incluyen.
+    """
+    uniprot_ids = {}
+    for pdb_id in pdb_ids:
+        cached_uniprot_id = get_cached_uniprot_id_from_pdb_id(pdb_id)
+        if cached_uniprot_id is not None:
+            uniprot_ids[pdb_id] = cached_uniprot_id
+    missing_pdb_ids = [pdb_id for pdb_id in pdb_ids if pdb_id not in uniprot_ids]
+
+    jobs = {}
+    for start in range(0, len(missing_pdb_ids), config.MAX_PDB_IDS_PER_QUERY):
+        chunk = missing_pdb_ids[start:start + config.MAX_PDB_IDS_PER_QUERY]
+        params_pdb_to_uniprot = {
+            "from": "PDB",
+            "to": "UniProtKB",
+            "ids": ",".join(chunk)
+        }
+        result = post_request_in_uniprot_idmapping(params_pdb_to_uniprot)
+        jobs[result.json().get('jobId')] = chunk
+
+    # Todos los jobs quedan en curso a la vez; se espera por ellos en conjunto
+    statuses = wait_for_uniprot_idmapping_jobs(list(jobs))
+
+    for job_id, chunk in jobs.items():
+        if statuses[job_id] != "FINISHED":
+            print(f"⚠️ El job de mapeo {job_id} terminó con estado {statuses[job_id]}; sus {len(chunk)} ID(s) no se mapearon.")
+            continue
+        requested_ids = {pdb_id.upper(): pdb_id for pdb_id in chunk}
+        for mapping in get_all_results_from_uniprot_idmapping_job(job_id):
+            pdb_id = requested_ids.get(str(mapping.get("from")).upper())
+            # Nos quedamos con el primer resultado, igual que en la consulta individual
+            if pdb_id is not None and pdb_id not in uniprot_ids:
+                uniprot_ids[pdb_id] = mapping.get("to")
+                store_uniprot_id_from_pdb_id(pdb_id, uniprot_ids[pdb_id])
+
+    print(f"✅ UniProt IDs obtenidos para {len(uniprot_ids)} de {len(pdb_ids)} PDB ID(s)")
+    return uniprot_ids
+
+def uniprot_mapping_cache_key(pdb_id):
+    """
+    Clave de caché de un mapeo PDB -> UniProt. Los jobs de IdMapping son 
+    efímeros, por lo que se cachea el mapeo de cada id y no las respuestas del job.
+    """
+    params = {"from": "PDB", "to": "UniProtKB", "ids": pdb_id.upper()}
+    return normalize_request_key("POST", UNIPROT_IDMAPPING_RUN_URL, data=params)
+
+def get_cached_uniprot_id_from_pdb_id(pdb_id):
+    """
+    Devuelve el id UniProt cacheado para un id PDB, o None si no está en caché 
+    o si se pidió actualizar los datos (--refresh, config.REFRESH).
+    """
+    response_cache = http_client.get_cache()
+    if response_cache is None or config.REFRESH:
+        return None
+    cached = response_cache.get(uniprot_mapping_cache_key(pdb_id), "rest.uniprot.org")
+    return cached[0].decode() if cached is not None else None
+
+def store_uniprot_id_from_pdb_id(pdb_id, uniprot_id):
+    """
+    Guarda en caché el id UniProt obtenido para un id PDB.
+    """
+    response_cache = http_client.get_cache()
+    if response_cache is not None and uniprot_id:
+        response_cache.set(uniprot_mapping_cache_key(pdb_id), "rest.uniprot.org", uniprot_id.encode())
+
+@single_flight.coalesce("uniprot_entry", key=lambda uniprot_id: uniprot_id.upper())
+@metrics.timed("uniprot_entry")
 def get_data_from_uniprot_id(uniprot_id: str):
     """
     Recibe una id UniProt como string. Realiza un request para mapear la id 
     en ChEMBL y devuelve la id ChEMBL como string para el mismo elemento.
     """
     url = f"https://rest.uniprot.org/uniprotkb/{uniprot_id}?fields=xref_pdb%2Cxref_chembl%2Cdate_created%2Clit_doi_id"
-    response = requests.get(url, timeout=10)
+    response = http_client.get(url)
     data = response.json()
     return data
 
@@ -36,33 +120,120 @@ def post_request_in_uniprot_idmapping(params):
     sitio para convertir la id indicada en los parámetros de un formato (from) 
     hacia otro formato (to).
     Devuelve un response con el id del job del post request.
+    El envío sólo se reintenta si no se llegó a conectar (ver 
+    http_client.create_session): ante un timeout o un error 5xx el job 
+    podría haberse creado igual y reenviarlo lo duplicaría, así que la 
+    consulta falla y los IDs se reintentan en otra ejecución (--resume).
     """
-    uniprot_id_mapping_url = "https://rest.uniprot.org/idmapping/run"
-    print(f"📡 Enviando consulta para mapear ID " + params["ids"] + " a UniProt...")
+    ids = params["ids"].split(",")
+    if len(ids) == 1:
+        print(f"📡 Enviando consulta para mapear ID " + params["ids"] + " a UniProt...")
+    else:
+        print(f"📡 Enviando consulta para mapear {len(ids)} IDs a UniProt...")
     try:
-        result = requests.post(uniprot_id_mapping_url, data=params, timeout=10)
+        result = http_client.post(UNIPROT_IDMAPPING_RUN_URL, data=params, cache=False)
         result.raise_for_status()
     except requests.RequestException as e:
-        print(f"❌ Error al solicitar el mapeo " + params["from"] + " -> " + params["to"] + ": {e}")
-        sys.exit()
+        raise ValueError(f"❌ Error al solicitar el mapeo " + params["from"] + " -> " + params["to"] + f": {e}")
     return result
 
 def get_result_from_uniprot_idmapping_job(result):
     """
-    Dado una consulta (un job) a UniProt IdMapping, hace un request en 
-    dicha API con el id del job para recuperar los datos de la consulta. 
+    Dado una consulta (un job) a UniProt IdMapping, espera a que el job 
+    termine y hace un request en dicha API con el id del job para recuperar 
+    los datos de la consulta. 
     Devuelve un json con los resultados. 
     """
     job_id = result.json().get('jobId')
+    status = wait_for_uniprot_idmapping_jobs([job_id])[job_id]
+    if status != "FINISHED":
+        raise ValueError(f"❌ El job de mapeo {job_id} terminó con estado {status}")
     job_url = f"https://rest.uniprot.org/idmapping/results/{job_id}"
     print(f"⏳ Recuperando resultados de mapeo (Job ID: {job_id})...")
     try:
-        job_result = requests.get(job_url, timeout=10)
+        job_result = http_client.get(job_url, cache=False)
         job_result.raise_for_status()
     except requests.RequestException as e:
-        print(f"❌ Error al recuperar resultados del mapeo: {e}")
-        sys.exit()
+        raise ValueError(f"❌ Error al recuperar resultados del mapeo: {e}")
     data = job_result.json()
     return data
 
+def get_all_results_from_uniprot_idmapping_job(job_id):
+    """
+    Dado el id de un job terminado de UniProt IdMapping, recupera todas las 
+    páginas de resultados siguiendo el encabezado "Link" de paginación.
+    Devuelve una lista con todos los mapeos ({"from": ..., "to": ...}).
+    """
+    page_url = f"https://rest.uniprot.org/idmapping/results/{job_id}?size={config.UNIPROT_IDMAPPING_PAGE_SIZE}"
+    print(f"⏳ Recuperando resultados de mapeo (Job ID: {job_id})...")
+    mappings = []
+    while page_url is not None:
+        try:
+            job_result = http_client.get(page_url, cache=False)
+            job_result.raise_for_status()
+        except requests.RequestException as e:
+            raise ValueError(f"❌ Error al recuperar resultados del mapeo: {e}")
+        mappings += job_result.json().get("results", [])
+        page_url = job_result.links.get("next", {}).get("url")
+    return mappings
 
+def get_uniprot_idmapping_job_status(job_id):
+    """
+    Consulta el estado de un job de UniProt IdMapping.
+    Devuelve "FINISHED" cuando los resultados están disponibles, "RUNNING" 
+    mientras el job sigue en curso y "ERROR" si UniProt informa una falla.
+    """
+    status_url = f"https://rest.uniprot.org/idmapping/status/{job_id}"
+    response = http_client.get(status_url, allow_redirects=False, cache=False)
+    # Cuando el job termina, UniProt redirige a la URL de resultados
+    if response.status_code in (301, 302, 303):
+        return "FINISHED"
+    response.raise_for_status()
+    data = response.json()
+    if "results" in data or "failedIds" in data:
+        return "FINISHED"
+    job_status = data.get("jobStatus")
+    if job_status in ("NEW", "RUNNING", "QUEUED"):
+        return "RUNNING"
+    if job_status == "FINISHED":
+        return "FINISHED"
+    print(f"⚠️ UniProt informó un error para el job de mapeo {job_id}: {data.get('errors', job_status)}")
+    return "ERROR"
+
+def wait_for_uniprot_idmapping_jobs(job_ids, timeout=None):
+    """
+    Espera a que terminen todos los jobs de UniProt IdMapping indicados, 
+    consultando su estado con backoff exponencial y jitter hasta un plazo 
+    máximo de timeout segundos (por defecto config.UNIPROT_IDMAPPING_TIMEOUT).
+    Devuelve un diccionario {job_id: estado} donde el estado es "FINISHED", 
+    "ERROR" o "TIMEOUT". Un job fallido no interrumpe la espera de los demás.
+    """
+    if timeout is None:
+        timeout = config.UNIPROT_IDMAPPING_TIMEOUT
+    deadline = time.monotonic() + timeout
+    delay = config.UNIPROT_IDMAPPING_POLL_INITIAL_DELAY
+    statuses = {job_id: "RUNNING" for job_id in job_ids}
+    pending = list(job_ids)
+    while pending:
+        still_pending = []
+        for job_id in pending:
+            try:
+                statuses[job_id] = get_uniprot_idmapping_job_status(job_id)
+            except requests.RequestException as e:
+                # Un error transitorio al consultar el estado no invalida el job
+                print(f"⚠️ No se pudo consultar el estado del job de mapeo {job_id}: {e}")
+            if statuses[job_id] == "RUNNING":
+                still_pending.append(job_id)
+        pending = still_pending
+        if not pending:
+            break
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            for job_id in pending:
+                statuses[job_id] = "TIMEOUT"
+            print(f"⚠️ Se agotó el plazo de espera para {len(pending)} job(s) de mapeo.")
+            break
+        print(f"⏳ Esperando {len(pending)} job(s) de mapeo en curso...")
+        time.sleep(min(remaining, delay + random.uniform(0, delay)))
+        delay = min(delay * 2, config.UNIPROT_IDMAPPING_POLL_MAX_DELAY)
+    return statuses
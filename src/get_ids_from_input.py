@@ -1,15 +1,21 @@
 import os
+from itertools import chain
 
 
 def get_pdb_ids_from_arguments(args):
     "Extrae las PDB id introducidas en una consulta y devuelve una lista con las mismas."
-    pdb_ids = []
-    if args.pdb:
-        pdb_ids += [p.strip() for p in args.pdb.split(",") if p.strip()]
+    return list(iter_pdb_ids_from_arguments(args))
+
+
+def iter_pdb_ids_from_arguments(args):
+    """
+    Genera los IDs PDB válidos de los argumentos (línea de comandos y archivo), en mayúsculas, 
+    sin repeticiones y en el orden de entrada. El archivo se lee de a una línea a medida que se consumen los IDs.
+    """
+    pdb_ids = iter_ids_from_argument(args.pdb)
     if args.pdb_file:
-        pdb_ids += cargar_ids_desde_archivo(args.pdb_file, "PDB")
-    pdb_ids = validar_pdb_ids(pdb_ids)
-    return pdb_ids
+        pdb_ids = chain(pdb_ids, iter_ids_desde_archivo(args.pdb_file, "PDB"))
+    return iter_pdb_ids_validos(pdb_ids)
 
 
 def get_uniprot_ids_from_arguments(args):
@@ -17,13 +23,25 @@ def get_uniprot_ids_from_arguments(args):
     Extrae y valida los IDs UniProt desde los argumentos proporcionados (por línea de comandos o archivo).
     Devuelve una lista de IDs UniProt válidos, en mayúsculas y sin repeticiones.
     """
-    uniprot_ids = []
-    if args.uniprot:
-        uniprot_ids += [u.strip() for u in args.uniprot.split(",") if u.strip()]
+    return list(iter_uniprot_ids_from_arguments(args))
+
+
+def iter_uniprot_ids_from_arguments(args):
+    """
+    Genera los IDs UniProt válidos de los argumentos (línea de comandos y archivo), en mayúsculas, 
+    sin repeticiones y en el orden de entrada. El archivo se lee de a una línea a medida que se consumen los IDs.
+    """
+    uniprot_ids = iter_ids_from_argument(args.uniprot)
     if args.uniprot_file:
-        uniprot_ids += cargar_ids_desde_archivo(args.uniprot_file, "UniProt")
-    uniprot_ids = validar_uniprot_ids(uniprot_ids)
-    return uniprot_ids
+        uniprot_ids = chain(uniprot_ids, iter_ids_desde_archivo(args.uniprot_file, "UniProt"))
+    return iter_uniprot_ids_validos(uniprot_ids)
+
+
+def iter_ids_from_argument(value):
+    """Genera los IDs de un argumento con IDs separados por coma."""
+    if not value:
+        return iter(())
+    return (id_.strip() for id_ in value.split(",") if id_.strip())
 
 def get_ligands_from_arguments(args):
     """
@@ -43,37 +61,82 @@ def cargar_ids_desde_archivo(filepath, descripcion):
     Lanza FileNotFoundError si el archivo no existe.
     Devuelve una lista de strings sin líneas vacías.
     """
+    return list(iter_ids_desde_archivo(filepath, descripcion))
+
+
+def iter_ids_desde_archivo(filepath, descripcion):
+    """
+    Igual que cargar_ids_desde_archivo, pero lee el archivo de a una línea a medida que se 
+    consumen los IDs, sin cargarlo completo en memoria. La existencia del archivo se verifica al llamarla.
+    """
     if not os.path.isfile(filepath):
         raise FileNotFoundError(f"El archivo {filepath} no existe ({descripcion})")
+    return leer_ids(filepath)
+
+
+def leer_ids(filepath):
     with open(filepath, "r") as f:
-        return [line.strip() for line in f if line.strip()]
+        for line in f:
+            line = line.strip()
+            if line:
+                yield line
 
 
 def validar_pdb_ids(ids):
     """
     Filtra y normaliza una lista de posibles IDs PDB, descartando los que no cumplen
     con el formato (4 caracteres alfanuméricos).
-    Devuelve una lista única en mayúsculas con los IDs válidos.
+    Devuelve una lista única en mayúsculas con los IDs válidos, en el orden de entrada.
     """
-    valid = []
-    for pdb_id in ids:
-        if len(pdb_id) == 4 and pdb_id.isalnum():
-            valid.append(pdb_id.upper())
-        else:
-            print(f"⚠️ ID PDB inválido: {pdb_id} (se ignorará)")
-    return list(set(valid))
+    return list(iter_pdb_ids_validos(ids))
+
+
+def iter_pdb_ids_validos(ids):
+    """Versión perezosa de validar_pdb_ids: genera cada ID válido la primera vez que aparece."""
+    return sin_repetidos(pdb_id.upper() for pdb_id in ids if es_id_valido(pdb_id, "PDB", 4, 4))
 
 
 def validar_uniprot_ids(ids):
     """
     Filtra y normaliza una lista de posibles IDs UniProt, descartando los que no cumplen
     con el formato esperado (6 a 10 caracteres alfanuméricos).
-    Devuelve una lista única en mayúsculas con los IDs válidos.
-    """
-    valid = []
-    for uniprot_id in ids:
-        if (6 <= len(uniprot_id) <= 10) and all(c.isalnum() for c in uniprot_id):
-            valid.append(uniprot_id.upper())
-        else:
-            print(f"⚠️ ID UniProt inválido: {uniprot_id} (se ignorará)")
-    return list(set(valid))
+    Devuelve una lista única en mayúsculas con los IDs válidos, en el orden de entrada.
+    """
+    return list(iter_uniprot_ids_validos(ids))
+
+
+def iter_uniprot_ids_validos(ids):
+    """Versión perezosa de validar_uniprot_ids: genera cada ID válido la primera vez que aparece."""
+    return sin_repetidos(uniprot_id.upper() for uniprot_id in ids if es_id_valido(uniprot_id, "UniProt", 6, 10))
+
+
+def es_id_valido(id_, descripcion, min_length, max_length):
+    """Indica si un ID es alfanumérico y tiene entre min_length y max_length caracteres; si no, lo informa."""
+    if min_length <= len(id_) <= max_length and id_.isalnum():
+        return True
+    print(f"⚠️ ID {descripcion} inválido: {id_} (se ignorará)")
+    return False
+
+
+def sin_repetidos(ids):
+    """
+    Genera los IDs sin repeticiones, conservando el orden de la primera aparición. 
+    La memoria usada depende de la cantidad de IDs distintos, no de la cantidad de líneas de entrada.
+    """
+    vistos = set()
+    for id_ in ids:
+        if id_ not in vistos:
+            vistos.add(id_)
+            yield id_
+
+
+def chunked(ids, size):
+    """Agrupa un iterable de IDs en listas de a lo sumo size elementos, consumiéndolo de a un bloque por vez."""
+    chunk = []
+    for id_ in ids:
+        chunk.append(id_)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
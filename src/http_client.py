@@ -0,0 +1,213 @@
+import threading
+from urllib.parse import urlsplit
+import requests
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+from urllib3.util.retry import Retry
+from src import config, metrics, rate_limiter
+from src.response_cache import ResponseCache, normalize_request_key
+
+_session = None
+_session_lock = threading.Lock()
+_pool_size = max(config.DEFAULT_WORKERS, config.CHEMBL_MAX_CONCURRENT_PAGES)
+_cache = None
+_cache_dir = config.CACHE_DIR
+_cache_enabled = config.ENABLE_RESPONSE_CACHE
+
+# Encabezados que se guardan junto con las respuestas cacheadas
+CACHED_HEADERS = ("Content-Type", "Link", "ETag", "Last-Modified")
+
+
+def configure(workers, cache_dir=None, use_cache=None):
+    """
+    Ajusta el tamaño de los pools de conexiones a la cantidad de workers 
+    (o de páginas de ChEMBL) que van a hacer requests en simultáneo y, opcionalmente, la carpeta y 
+    el uso de la caché de respuestas. La sesión se vuelve a crear en el 
+    próximo request.
+    """
+    global _session, _pool_size, _cache, _cache_dir, _cache_enabled
+    with _session_lock:
+        _pool_size = max(1, workers, config.CHEMBL_MAX_CONCURRENT_PAGES)
+        if _session is not None:
+            _session.close()
+        _session = None
+        if cache_dir is not None or use_cache is not None:
+            if _cache is not None:
+                _cache.close()
+            _cache = None
+            _cache_dir = cache_dir if cache_dir is not None else _cache_dir
+            _cache_enabled = use_cache if use_cache is not None else _cache_enabled
+
+
+def create_session(pool_size):
+    """
+    Crea una sesión HTTP con un pool de conexiones persistentes (keep-alive) 
+    por host, compresión gzip y reintentos ante errores 5xx y conexiones 
+    cortadas, según la política configurada en config. Los POST sólo se 
+    reintentan si no se llegó a conectar: una respuesta 5xx o un timeout de 
+    lectura pueden llegar después de que el servidor procesó el request (ej: 
+    un job de UniProt IdMapping ya creado) y reintentarlos lo duplicaría.
+    """
+    retry = Retry(
+        total=config.HTTP_MAX_RETRIES,
+        backoff_factor=config.HTTP_RETRY_BACKOFF,
+        status_forcelist=config.HTTP_RETRY_STATUS_CODES,
+        raise_on_status=False
+    )
+    adapter = HTTPAdapter(pool_connections=config.HTTP_POOL_HOSTS, pool_maxsize=pool_size,
+                          max_retries=retry)
+    session = requests.Session()
+    session.headers.update({"Accept-Encoding": "gzip, deflate"})
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+def get_session():
+    """
+    Devuelve la sesión HTTP compartida por todo el programa, creándola si no existe.
+    """
+    global _session
+    with _session_lock:
+        if _session is None:
+            _session = create_session(_pool_size)
+        return _session
+
+
+def get_cache():
+    """
+    Devuelve la caché de respuestas compartida, o None si está deshabilitada.
+    """
+    global _cache
+    with _session_lock:
+        if _cache is None and _cache_enabled:
+            _cache = ResponseCache(_cache_dir, config.CACHE_MAX_BYTES, config.CACHE_TTLS, config.CACHE_DEFAULT_TTL)
+        return _cache
+
+
+def request(method, url, cache=True, **kwargs):
+    """
+    Realiza un request HTTP a través de la sesión compartida, usando 
+    config.HTTP_TIMEOUT como timeout si no se indica otro.
+    Si cache es True y la caché está habilitada, las respuestas exitosas se 
+    guardan y se reutilizan mientras no venza el TTL de su fuente (host).
+    Los GET cuya respuesta guardada venció (o, con config.REFRESH, de los hosts 
+    de config.CONDITIONAL_REQUEST_SOURCES) se revalidan con un request 
+    condicional: si la API responde 304 se reutiliza la respuesta guardada.
+    """
+    kwargs.setdefault("timeout", config.HTTP_TIMEOUT)
+    source = urlsplit(url).netloc.lower()
+    response_cache = get_cache() if cache else None
+    if response_cache is None:
+        return send(method, url, source, **kwargs)
+
+    key = normalize_request_key(method, url, kwargs.get("params"), kwargs.get("data"), kwargs.get("json"))
+    if kwargs.get("headers", {}).get("Accept"):
+        key += " accept=" + kwargs["headers"]["Accept"]
+    cached = response_cache.get(key, source)
+    revalidate = method == "GET" and config.REFRESH and source in config.CONDITIONAL_REQUEST_SOURCES
+    if cached is not None and not revalidate:
+        metrics.increment("cache_hits", host=source)
+        body, headers = cached
+        return build_cached_response(url, body, headers)
+    metrics.increment("cache_misses", host=source)
+
+    if cached is None and method == "GET":
+        cached = response_cache.get(key, source, allow_stale=True)
+    validators = conditional_headers(cached[1]) if cached is not None and method == "GET" else {}
+    if validators:
+        kwargs["headers"] = {**(kwargs.get("headers") or {}), **validators}
+
+    response = send(method, url, source, **kwargs)
+    if response.status_code == 304 and validators:
+        metrics.increment("cache_revalidations", host=source)
+        body, headers = cached
+        response_cache.set(key, source, body, headers)  # Vuelve a estar vigente
+        return build_cached_response(url, body, headers)
+    if response.status_code == 200:
+        headers = {name: response.headers[name] for name in CACHED_HEADERS if name in response.headers}
+        response_cache.set(key, source, response.content, headers)
+    return response
+
+
+def send(method, url, source, **kwargs):
+    """
+    Envía un request por la sesión compartida respetando el limitador de su 
+    host (src/rate_limiter.py): una respuesta 429 pausa el host durante su 
+    Retry-After y el request se reintenta hasta config.RATE_LIMIT_MAX_RETRIES veces.
+    Registra las métricas del request: requests por host y código de estado, 
+    bytes descargados y reintentos.
+    """
+    limiter = rate_limiter.get_limiter(source)
+    for attempt in range(config.RATE_LIMIT_MAX_RETRIES + 1):
+        limiter.acquire()
+        try:
+            with metrics.timer("http_" + source):
+                response = get_session().request(method, resolve_url(url), **kwargs)
+                content = response.content
+        except BaseException:
+            limiter.release()
+            raise
+        raw = response.raw
+        retries = getattr(raw, "retries", None)
+        history = retries.history if retries is not None else ()
+        throttled = sum(1 for entry in history if entry.status in config.RATE_LIMIT_STATUS_CODES)
+        limiter.release(response.status_code, rate_limiter.parse_retry_after(response.headers.get("Retry-After")), throttled)
+
+        metrics.increment("http_requests", host=source, status=str(response.status_code))
+        # Bytes recibidos por la red (comprimidos), o el tamaño del contenido si no se conocen
+        received = raw.tell() if hasattr(raw, "tell") else 0
+        metrics.increment("http_bytes", received or len(content), host=source)
+        if history:
+            metrics.increment("http_retries", len(history), host=source)
+        if response.status_code != 429:
+            break
+        metrics.increment("http_throttled", host=source)
+        if attempt < config.RATE_LIMIT_MAX_RETRIES:
+            print(f"⏳ {source} pidió bajar el ritmo de consultas (429); se reintentará el request...")
+    return response
+
+
+def conditional_headers(headers):
+    """Encabezados de un request condicional a partir de los validadores de una respuesta guardada."""
+    validators = {}
+    if "ETag" in headers:
+        validators["If-None-Match"] = headers["ETag"]
+    if "Last-Modified" in headers:
+        validators["If-Modified-Since"] = headers["Last-Modified"]
+    return validators
+
+
+def resolve_url(url):
+    """
+    Devuelve la URL a la que se envía un request: la misma, o su equivalente en 
+    config.API_MIRROR_URL (<mirror>/<host>/<ruta>) si hay un servidor espejo configurado.
+    """
+    if not config.API_MIRROR_URL:
+        return url
+    parts = urlsplit(url)
+    mirrored = f"{config.API_MIRROR_URL.rstrip('/')}/{parts.netloc}{parts.path}"
+    return mirrored + (f"?{parts.query}" if parts.query else "")
+
+
+def build_cached_response(url, body, headers):
+    """
+    Reconstruye un requests.Response a partir de una respuesta guardada en caché.
+    """
+    response = requests.Response()
+    response.status_code = 200
+    response.url = url
+    response.headers = CaseInsensitiveDict(headers)
+    response._content = body
+    response.encoding = requests.utils.get_encoding_from_headers(response.headers)
+    return response
+
+
+def get(url, **kwargs):
+    """Realiza un GET a través de la sesión compartida."""
+    return request("GET", url, **kwargs)
+
+
+def post(url, **kwargs):
+    """Realiza un POST a través de la sesión compartida."""
+    return request("POST", url, **kwargs)
@@ -1,9 +1,15 @@
 from src.create_parser import create_parser
-from src.get_ids_from_input import get_pdb_ids_from_arguments, get_uniprot_ids_from_arguments, \
-    get_ligands_from_arguments
-from src.pdb_handler import process_pdb, process_uniprot
-from src import config
+from src.get_ids_from_input import iter_pdb_ids_from_arguments, iter_uniprot_ids_from_arguments, \
+    get_ligands_from_arguments, chunked
+from src.pdb_handler import process_pdb, process_uniprot, shutdown_parse_pool
+from src.query_plan import build_query_plan
+from src.columnar_output import check_format_dependency
+from src.run_journal import RunJournal, FAILED, STATES
+from src import config, http_client, backends, metrics, progress
+import os
 import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
 
 
 def main():
@@ -11,20 +17,25 @@ def main():
     Función principal del programa.
     Se encarga de:
     - Parsear los argumentos de entrada.
-    - Validar los IDs ingresados.
+    - Leer y validar los IDs ingresados a medida que se procesan, en bloques 
+      del tamaño máximo aceptado por las APIs.
+    - Planificar las consultas de cada bloque: resolver sus IDs a sus targets 
+      ChEMBL y descargar una sola vez las actividades de cada target distinto.
     - Procesar cada ID de PDB o UniProt, consultando fuentes externas.
+    - Informar periódicamente el progreso (IDs terminados, páginas de ChEMBL, 
+      actividades por segundo y tiempo restante estimado).
     - Guardar los resultados en archivos JSON.
+    - Registrar el estado de cada ID en un diario de ejecución, para poder 
+      retomar una ejecución interrumpida con --resume.
     """
     print("\n🚀 Inicio de ejecución de src\n")
     parser = create_parser()
 
     args = validate_input(parser)
 
-    # Leer IDs PDB
-    pdb_ids = get_pdb_ids_from_arguments(args)
-
-    # Leer IDs UniProt
-    uniprot_ids = get_uniprot_ids_from_arguments(args)
+    # Leer IDs PDB y UniProt (de forma perezosa: los archivos se leen a medida que se procesan)
+    pdb_ids = iter_pdb_ids_from_arguments(args)
+    uniprot_ids = iter_uniprot_ids_from_arguments(args)
 
     # Toma la afinidad
     affinity_types = args.aff.split(",") if args.aff else None
@@ -32,46 +43,214 @@ def main():
     # Leer los ligandos
     ligands_ids = get_ligands_from_arguments(args) if (args.lig or args.lig_file) else None
 
-    # Validar límite de IDs permitidos (configurable)
-    if len(uniprot_ids) > config.MAX_UNIPROT_IDS_PER_QUERY:
-        print(f"⚠️ Límite excedido: Máximo permitido de IDs UniProt por consulta: {config.MAX_UNIPROT_IDS_PER_QUERY}.")
-        print("🔗 Por favor, divida sus consultas en partes más pequeñas.")
-        return
+    workers = validate_workers(args.workers)
+    http_client.configure(workers, cache_dir=args.cache_dir, use_cache=not args.no_cache)
+    backends.configure(args.backend, args.data_dir)
+    config.CHEMBL_TRANSPORT = args.chembl_format
+    config.OUTPUT_FORMAT = args.format
+    config.ENABLE_TARGET_STORE = not args.no_cache
+    config.REFRESH = args.refresh
+    if args.refresh and args.no_cache:
+        print("⚠️ Con --no-cache no hay snapshots de targets: --refresh volverá a descargar todas las actividades.")
+    if args.cache_dir:
+        config.TARGET_STORE_DIR = os.path.join(args.cache_dir, "targets")
+    journal = open_journal(args.resume, journal_settings(affinity_types, ligands_ids, args.format))
+    metrics.reset()
+    progress.start()
+    start_time = time.perf_counter()
+    processed = 0
+
+    # Los IDs se procesan en bloques del tamaño máximo aceptado por las APIs
+    for chunk in chunked(pdb_ids, config.MAX_PDB_IDS_PER_QUERY):
+        processed += process_chunk(chunk, [], affinity_types, ligands_ids, workers, journal)
+
+    for chunk in chunked(uniprot_ids, config.MAX_UNIPROT_IDS_PER_QUERY):
+        processed += process_chunk([], chunk, affinity_types, ligands_ids, workers, journal)
+
+    progress.stop()
+    shutdown_parse_pool()
+    report_throughput(processed, time.perf_counter() - start_time)
+    report_cache_stats()
+    report_journal(journal)
+    journal.close()
+    save_profile(args.profile, args.prometheus)
+    print("\n🏁 Ejecución completada\n")
+
 
-    if len(pdb_ids) > config.MAX_PDB_IDS_PER_QUERY:
-        print(f"⚠️ Límite excedido: Máximo permitido de IDs PDB por consulta: {config.MAX_PDB_IDS_PER_QUERY}.")
-        print("🔗 Por favor, divida sus consultas en partes más pequeñas.")
-        return
+def process_chunk(pdb_ids, uniprot_ids, affinity_types, ligands_ids, workers, journal):
+    """
+    Procesa un bloque de IDs: omite los que el diario de ejecución ya marca como 
+    terminados, planifica las consultas del resto y procesa cada ID. 
+    Devuelve la cantidad de IDs procesados.
+    """
+    pdb_ids = journal.pending_ids("PDB", pdb_ids)
+    uniprot_ids = journal.pending_ids("UniProt", uniprot_ids)
+    progress.add_total(len(pdb_ids) + len(uniprot_ids))
+    processed = 0
+
+    plan = build_query_plan(pdb_ids, uniprot_ids, affinity_types, ligands_ids, workers)
 
     if pdb_ids:
-        print(f"🔍 Procesando {len(pdb_ids)} ID(s) de PDB...")
-        for pdb_id in pdb_ids:
-            try:
-                process_pdb(pdb_id, affinity_types, ligands_ids)
-                time.sleep(config.CHEMBL_REQUEST_DELAY)
-            except Exception as e:
-                print(f"❌ Error procesando PDB {pdb_id}: {e}")
+        print(f"🔍 Procesando {len(pdb_ids)} ID(s) de PDB con {workers} worker(s)...")
+        processed += process_ids(pdb_ids, partial(process_pdb, plan=plan), "PDB", affinity_types, ligands_ids,
+                                 workers, journal=journal)
 
     if uniprot_ids:
-        print(f"🔍 Procesando {len(uniprot_ids)} ID(s) de UniProt...")
-        for uniprot_id in uniprot_ids:
+        print(f"🔍 Procesando {len(uniprot_ids)} ID(s) de UniProt con {workers} worker(s)...")
+        processed += process_ids(uniprot_ids, partial(process_uniprot, plan=plan), "UniProt", affinity_types, ligands_ids,
+                                 workers, journal=journal)
+    return processed
+
+
+def process_ids(ids, process_function, description, affinity_types, ligands_ids, workers, delay=0, journal=None):
+    """
+    Procesa una lista de IDs con process_function usando un pool acotado de
+    workers. Cada ID se procesa de forma aislada: un error en uno de ellos no
+    interrumpe al resto. Los errores se informan en el orden de entrada.
+    Si se recibe un diario de ejecución, se registra el estado con el que 
+    termina cada ID (el que devuelve process_function, o "failed" ante un error).
+    El ritmo de los requests a cada API lo regula src/rate_limiter.py; delay 
+    agrega, opcionalmente, una espera fija (en segundos) después de cada ID.
+    Devuelve la cantidad de IDs procesados.
+    """
+    def process_one(id_):
+        try:
+            state = process_function(id_, affinity_types, ligands_ids)
+        except Exception as e:
+            if journal is not None:
+                journal.record(description, id_, FAILED, e)
+            metrics.increment("ids", kind=description, state=FAILED)
+            raise
+        if journal is not None and state in STATES:
+            journal.record(description, id_, state)
+        metrics.increment("ids", kind=description, state=str(state))
+        if delay:
+            time.sleep(delay)
+
+    errors = {}
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = {id_: executor.submit(process_one, id_) for id_ in ids}
+        for id_, future in futures.items():
             try:
-                process_uniprot(uniprot_id, affinity_types, ligands_ids)
-                time.sleep(config.UNIPROT_REQUEST_DELAY)
+                future.result()
             except Exception as e:
-                print(f"❌ Error procesando UniProt {uniprot_id}: {e}")
-    
-    print("\n🏁 Ejecución completada\n")
+                errors[id_] = e
+                print(f"❌ Error procesando {description} {id_}: {e}")
+
+    if errors:
+        print(f"⚠️ {len(errors)} de {len(ids)} ID(s) de {description} terminaron con error.")
+    return len(ids)
+
+
+def validate_workers(workers):
+    """
+    Valida la cantidad de workers pedida, acotándola al rango [1, config.MAX_WORKERS].
+    """
+    if workers is None or workers < 1:
+        print(f"⚠️ Cantidad de workers inválida: {workers}. Se usará 1.")
+        return 1
+    if workers > config.MAX_WORKERS:
+        print(f"⚠️ Cantidad de workers excedida: se usará el máximo permitido ({config.MAX_WORKERS}).")
+        return config.MAX_WORKERS
+    return workers
+
+
+def journal_settings(affinity_types, ligands_ids, output_format):
+    """
+    Parámetros de la ejecución que definen el contenido de los archivos de salida 
+    (filtros de afinidad y ligandos, y formato). Se guardan en el diario para 
+    que --resume no omita IDs terminados con otros parámetros.
+    """
+    return {
+        "affinity_types": sorted(affinity_types) if affinity_types is not None else None,
+        "ligands": sorted(ligands_ids) if ligands_ids is not None else None,
+        "format": output_format,
+    }
+
+
+def open_journal(resume_path=None, settings=None):
+    """
+    Abre el diario de la ejecución. Con --resume se continúa el diario indicado 
+    (omitiendo los IDs ya terminados), siempre que se haya creado con los mismos 
+    parámetros (settings, ver journal_settings); si no, se crea uno nuevo en config.JOURNAL_DIR.
+    """
+    if resume_path:
+        try:
+            journal = RunJournal(resume_path, settings)
+        except ValueError as e:
+            print(f"{e}. Repita la ejecución con los mismos --aff, --lig/--lig-file y --format, "
+                  f"o ejecútela sin --resume para crear un diario nuevo.")
+            raise SystemExit(1)
+        finished = sum(1 for entry in journal.entries.values() if journal.is_finished(entry["kind"], entry["id"]))
+        print(f"🔁 Retomando la ejecución desde {resume_path}: {finished} ID(s) ya terminados se omitirán.")
+        return journal
+    path = os.path.join(config.JOURNAL_DIR, time.strftime("run_%Y%m%d-%H%M%S.jsonl"))
+    print(f"📝 Diario de ejecución: {path} (use --resume {path} para retomarla)")
+    return RunJournal(path, settings)
+
+
+def report_journal(journal):
+    """
+    Informa cuántos IDs del diario de ejecución quedaron en cada estado.
+    """
+    summary = journal.summary()
+    print("📝 Diario de ejecución: " + ", ".join(f"{count} {state}" for state, count in summary.items())
+          + f" ({journal.path})")
+
+
+def save_profile(profile_path, prometheus_path):
+    """
+    Guarda las mediciones de la ejecución (ver src/metrics.py): en JSON si se 
+    indicó --profile (sin archivo, en config.OUTPUT_DIR) y en formato de 
+    Prometheus si se indicó --prometheus.
+    """
+    if profile_path is not None:
+        if not profile_path:
+            os.makedirs(config.OUTPUT_DIR, exist_ok=True)
+            profile_path = os.path.join(config.OUTPUT_DIR, time.strftime("profile_%Y%m%d-%H%M%S.json"))
+        metrics.report_stages()
+        metrics.write_json(profile_path)
+        print(f"📊 Perfil de la ejecución guardado en {profile_path}")
+    if prometheus_path:
+        metrics.write_prometheus(prometheus_path)
+        print(f"📊 Métricas en formato Prometheus guardadas en {prometheus_path}")
+
+
+def report_throughput(processed, elapsed):
+    """
+    Informa la cantidad total de IDs procesados, el tiempo total y la tasa de IDs por segundo.
+    """
+    rate = processed / elapsed if elapsed > 0 else 0.0
+    print(f"\n⏱️ {processed} ID(s) procesados en {elapsed:.1f} s ({rate:.2f} IDs/s)")
+
+
+def report_cache_stats():
+    """
+    Informa los aciertos y fallos de la caché de respuestas de las APIs, si está habilitada.
+    """
+    response_cache = http_client.get_cache()
+    if response_cache is not None:
+        stats = response_cache.stats()
+        print(f"📦 Caché de respuestas: {stats['hits']} acierto(s), {stats['misses']} fallo(s), "
+              f"{stats['bytes'] / (1024 * 1024):.1f} MB en {response_cache.path}")
 
 
 def validate_input(parser):
     """
     Valida que al menos uno de los argumentos requeridos haya sido ingresado. 
-    Lanza un error si no se proporciona ningún ID de PDB o UniProt.
+    Lanza un error si no se proporciona ningún ID de PDB o UniProt, si se 
+    pide el backend local sin indicar la carpeta de datos, o si falta la 
+    dependencia del formato de salida elegido (antes de descargar nada).
     """
     args = parser.parse_args()
     if not any([args.pdb, args.pdb_file, args.uniprot, args.uniprot_file]):
         parser.error()
+    if args.backend == "local" and not args.data_dir:
+        parser.error("--backend local requiere --data-dir")
+    try:
+        check_format_dependency(args.format)
+    except ImportError as e:
+        parser.error(str(e))
     return args
 
 if __name__ == "__main__":
@@ -0,0 +1,150 @@
+import functools
+import json
+import threading
+import time
+from contextlib import contextmanager
+
+from src.atomic_file import atomic_open
+
+PROMETHEUS_PREFIX = "pdbindpred"
+
+_lock = threading.Lock()
+_stages = {}  # etapa -> {"calls", "seconds", "max_seconds"}
+_counters = {}  # (nombre, (("etiqueta", "valor"), ...)) -> valor
+_started = time.time()
+
+
+def reset():
+    """Descarta todas las mediciones (al comenzar una ejecución)."""
+    global _started
+    with _lock:
+        _stages.clear()
+        _counters.clear()
+        _started = time.time()
+
+
+def record(stage, seconds, calls=1):
+    """Suma a una etapa el tiempo (en segundos) de una o más llamadas."""
+    with _lock:
+        data = _stages.setdefault(stage, {"calls": 0, "seconds": 0.0, "max_seconds": 0.0})
+        data["calls"] += calls
+        data["seconds"] += seconds
+        data["max_seconds"] = max(data["max_seconds"], seconds)
+
+
+@contextmanager
+def timer(stage):
+    """Mide el tiempo del bloque y lo suma a la etapa indicada (aunque el bloque falle)."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(stage, time.perf_counter() - start)
+
+
+def timed(stage):
+    """Decorador que suma a stage el tiempo de cada llamada a la función."""
+    def decorator(function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            with timer(stage):
+                return function(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def increment(name, value=1, **labels):
+    """Suma value al contador name con las etiquetas indicadas (ej: host="rest.uniprot.org")."""
+    key = (name, tuple(sorted(labels.items())))
+    with _lock:
+        _counters[key] = _counters.get(key, 0) + value
+
+
+def total(name):
+    """Devuelve la suma del contador name, sumando todas sus etiquetas."""
+    with _lock:
+        return sum(value for (counter, _), value in _counters.items() if counter == name)
+
+
+class TimedIterator:
+    """
+    Recorre un iterador midiendo sólo el tiempo que tarda en producir cada
+    elemento (no el de quien los consume). Al agotarse o cerrarse suma ese
+    tiempo a stage, si se indicó; el total queda en seconds y la cantidad de
+    elementos en count. Como yield from, devuelve el valor de retorno del
+    generador recorrido.
+    """
+
+    def __init__(self, iterator, stage=None):
+        self.iterator = iter(iterator)
+        self.stage = stage
+        self.seconds = 0.0
+        self.count = 0
+
+    def __iter__(self):
+        return self.run()
+
+    def run(self):
+        try:
+            while True:
+                start = time.perf_counter()
+                try:
+                    item = next(self.iterator)
+                except StopIteration as stop:
+                    return stop.value
+                finally:
+                    self.seconds += time.perf_counter() - start
+                self.count += 1
+                yield item
+        finally:
+            if self.stage is not None:
+                record(self.stage, self.seconds)
+
+
+def summary():
+    """Devuelve un diccionario con el tiempo de cada etapa y el valor de cada contador."""
+    with _lock:
+        stages = {stage: dict(data) for stage, data in sorted(_stages.items())}
+        counters = {}
+        for (name, labels), value in sorted(_counters.items()):
+            counters.setdefault(name, []).append({**dict(labels), "value": value})
+        return {"started": _started, "elapsed_seconds": time.time() - _started, "stages": stages, "counters": counters}
+
+
+def write_json(path):
+    """Guarda el resumen de las mediciones en formato JSON."""
+    with atomic_open(path) as f:
+        json.dump(summary(), f, indent=4)
+
+
+def write_prometheus(path):
+    """Guarda las mediciones en el formato de texto de Prometheus (para el textfile collector de node_exporter)."""
+    with atomic_open(path) as f:
+        f.write(format_prometheus())
+
+
+def format_prometheus():
+    """Devuelve las mediciones en el formato de texto de Prometheus."""
+    data = summary()
+    lines = []
+    for metric, field in (("stage_seconds_total", "seconds"), ("stage_calls_total", "calls")):
+        lines.append(f"# TYPE {PROMETHEUS_PREFIX}_{metric} counter")
+        for stage, values in data["stages"].items():
+            lines.append(f'{PROMETHEUS_PREFIX}_{metric}{{stage="{stage}"}} {values[field]}')
+    for name, series in data["counters"].items():
+        lines.append(f"# TYPE {PROMETHEUS_PREFIX}_{name}_total counter")
+        for values in series:
+            labels = ",".join(f'{label}="{value}"' for label, value in values.items() if label != "value")
+            labels = f"{{{labels}}}" if labels else ""
+            lines.append(f"{PROMETHEUS_PREFIX}_{name}_total{labels} {values['value']}")
+    return "\n".join(lines) + "\n"
+
+
+def report_stages():
+    """Imprime una tabla con el tiempo acumulado de cada etapa."""
+    stages = summary()["stages"]
+    if not stages:
+        return
+    print(f"\n{'etapa':<22}{'llamadas':>10}{'total (s)':>11}{'máx (s)':>10}")
+    for stage, data in stages.items():
+        print(f"{stage:<22}{data['calls']:>10}{data['seconds']:>11.2f}{data['max_seconds']:>10.2f}")
@@ -1,28 +1,77 @@
+import io
 import os
 import json
-from time import sleep
-from xml.etree.ElementTree import Element
+import time
 
-import requests
 import threading
+import multiprocessing
+import requests
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from functools import partial
 import xml.etree.ElementTree as ET
-from src.get_ids_from_apis import get_uniprot_id_from_pdb_id, get_data_from_uniprot_id
-from src import config
-
+from src import config, http_client, backends, metrics, single_flight
+from src.atomic_file import atomic_open
+from src.columnar_output import EXTENSIONS, ligands_to_columns, write_columnar
+from src.target_store import has_fresh_snapshot, has_snapshot, iter_snapshot, iter_and_save_snapshot, filter_activities, \
+    read_watermark, append_to_snapshot
+
+RCSB_GRAPHQL_URL = "https://data.rcsb.org/graphql"
+RCSB_GRAPHQL_ENTRIES_QUERY = """
+query ($ids: [String!]!) {
+  entries(entry_ids: $ids) {
+    rcsb_id
+    rcsb_entry_info { resolution_combined }
+    rcsb_accession_info { initial_release_date }
+    rcsb_primary_citation { pdbx_database_id_doi }
+  }
+}
+"""
+
+@metrics.timed("rcsb_pdb")
 def fetch_pdb_info(pdb_id):
     """Consulta a la API de RCSB PDB para obtener información básica de una estructura, incluyendo resolución, año de publicación y DOI."""
     url = f"https://data.rcsb.org/rest/v1/core/entry/{pdb_id}"
     print(f"📡 Enviando consulta a RCSB PDB para obtener datos de PDB ID '{pdb_id}'...")
-    response = requests.get(url, timeout=10)
+    response = http_client.get(url)
+    if response.status_code == 404:
+        raise LookupError(f"PDB ID '{pdb_id}' no encontrado en RCSB PDB")
     if response.status_code != 200:
         raise ValueError(f"❌ Error al obtener datos para PDB ID '{pdb_id}': código {response.status_code}")
 
-    data = response.json()
-    resolution = data.get("rcsb_entry_info", {}).get("resolution_combined", [None])[0]
-    year = data.get("rcsb_accession_info", {}).get("initial_release_date", "")[:4]
-    doi = data.get("rcsb_primary_citation", {}).get("pdbx_database_id_doi")
-
     print(f"✅ Datos básicos obtenidos para PDB ID '{pdb_id}'")
+    return build_pdb_info_result(pdb_id, response.json())
+
+@metrics.timed("rcsb_pdb")
+def fetch_pdb_info_batch(pdb_ids):
+    """Consulta la API GraphQL de RCSB PDB para obtener, en bloques de hasta config.RCSB_GRAPHQL_BATCH_SIZE estructuras por request, 
+    sólo la resolución, el año de publicación y el DOI de cada una. Devuelve un diccionario {id PDB: resultado} con el mismo formato 
+    que fetch_pdb_info. Las estructuras que RCSB no encuentra no se incluyen."""
+    results = {}
+    for start in range(0, len(pdb_ids), config.RCSB_GRAPHQL_BATCH_SIZE):
+        chunk = pdb_ids[start:start + config.RCSB_GRAPHQL_BATCH_SIZE]
+        print(f"📡 Enviando consulta a RCSB PDB para obtener datos de {len(chunk)} PDB ID(s)...")
+        # Los POST no se revalidan con requests condicionales: con --refresh se consulta sin la caché
+        response = http_client.post(RCSB_GRAPHQL_URL, json={"query": RCSB_GRAPHQL_ENTRIES_QUERY, "variables": {"ids": chunk}},
+                                    cache=not config.REFRESH)
+        if response.status_code != 200:
+            raise ValueError(f"❌ Error al obtener datos de RCSB PDB en lote: código {response.status_code}")
+        requested_ids = {pdb_id.upper(): pdb_id for pdb_id in chunk}
+        entries = (response.json().get("data") or {}).get("entries") or []
+        for entry in entries:
+            if entry is None:
+                continue
+            pdb_id = requested_ids.get(entry.get("rcsb_id", "").upper())
+            if pdb_id is not None:
+                results[pdb_id] = build_pdb_info_result(pdb_id, entry)
+    print(f"✅ Datos básicos obtenidos para {len(results)} de {len(pdb_ids)} PDB ID(s)")
+    return results
+
+def build_pdb_info_result(pdb_id, data):
+    """Arma el resultado inicial de una estructura a partir de los datos de una entrada de RCSB PDB (REST o GraphQL)."""
+    resolution = ((data.get("rcsb_entry_info") or {}).get("resolution_combined") or [None])[0]
+    year = ((data.get("rcsb_accession_info") or {}).get("initial_release_date") or "")[:4]
+    doi = (data.get("rcsb_primary_citation") or {}).get("pdbx_database_id_doi")
     return {
         "pdb_ids": [{'pdb_id': pdb_id, 'resolution': resolution}],
         "publication_year": year,
@@ -33,49 +82,320 @@ def fetch_pdb_info(pdb_id):
         "ligands": []
     }
 
-def print_function(stop_event):
-    while not stop_event.is_set():
-        print("Recuperando los resultados...")
-        sleep(10)
+CHEMBL_URL = "https://www.ebi.ac.uk"
+
+# Limita los requests simultáneos a ChEMBL de todo el programa (todos los workers y targets)
+chembl_requests_semaphore = threading.BoundedSemaphore(config.CHEMBL_MAX_CONCURRENT_PAGES)
+
+# Campos de cada actividad que usa el programa (proyección "only=" del transporte JSON de ChEMBL).
+# activity_id no se incluye en los resultados: es la marca de agua de las actualizaciones incrementales (--refresh)
+CHEMBL_ACTIVITY_FIELDS = ["molecule_chembl_id", "canonical_smiles", "standard_value", "standard_type",
+                          "standard_units", "document_year", "assay_chembl_id", "activity_id"]
+
+# Pool de procesos que parsea las páginas de ChEMBL, compartido por todos los workers y targets
+_parse_pool = None
+_parse_pool_lock = threading.Lock()
+
+def get_parse_pool():
+    """Devuelve el pool de procesos de parseo (creándolo la primera vez), o None si config.CHEMBL_PARSE_PROCESSES es 0.
+    Los procesos se crean con "spawn", que es seguro aunque el programa ya tenga hilos de descarga corriendo."""
+    global _parse_pool
+    if config.CHEMBL_PARSE_PROCESSES <= 0:
+        return None
+    with _parse_pool_lock:
+        if _parse_pool is None:
+            _parse_pool = ProcessPoolExecutor(max_workers=config.CHEMBL_PARSE_PROCESSES,
+                                              mp_context=multiprocessing.get_context("spawn"))
+        return _parse_pool
+
+def shutdown_parse_pool():
+    """Termina los procesos de parseo (se vuelven a crear si se necesitan)."""
+    global _parse_pool
+    with _parse_pool_lock:
+        if _parse_pool is not None:
+            _parse_pool.shutdown()
+            _parse_pool = None
+
+def get_binding_activities_for_target_from_chembl(chembl_target_id: str, affinity_types=None, ligands=None, transport=None):
+    """Consulta la API de ChEMBL para obtener las actividades de unión (binding) de un target dado, filtrando opcionalmente por tipos de afinidad y ligandos.
+    El transporte puede ser "xml" (devuelve Elements con todos los campos) o "json" (devuelve diccionarios sólo con CHEMBL_ACTIVITY_FIELDS);
+    por defecto se usa config.CHEMBL_TRANSPORT. Devuelve una lista con todas las actividades (o una lista vacía si alguna página falla); 
+    para procesar targets grandes sin acumularlas en memoria usar iter_binding_activities_for_target_from_chembl."""
+    try:
+        return list(iter_binding_activities_for_target_from_chembl(chembl_target_id, affinity_types, ligands, transport,
+                                                                   keep_elements=True))
+    except ValueError as e:
+        print(e)
+        return []
+
+def iter_binding_activities_for_target_from_chembl(chembl_target_id: str, affinity_types=None, ligands=None, transport=None,
+                                                   keep_elements=False, min_activity_id=None):
+    """Generador de las actividades de unión (binding) de un target de ChEMBL, página por página. Cada página se parsea de forma 
+    incremental y, salvo que keep_elements sea True, cada Element XML se libera una vez consumido, por lo que la memoria usada no 
+    depende de la cantidad total de actividades del target. Lanza ValueError si alguna página no se puede obtener o parsear.
+    Se piden páginas de config.CHEMBL_PAGE_SIZE actividades: con el total informado en page_meta de la primera página, el resto 
+    se descarga en paralelo (hasta config.CHEMBL_MAX_CONCURRENT_PAGES requests simultáneos) y se generan en orden de offset.
+    Si se indica min_activity_id, sólo se piden las actividades con activity_id mayor (activity_id__gt)."""
+    if transport is None:
+        transport = config.CHEMBL_TRANSPORT
+    query, headers = build_chembl_activity_query(chembl_target_id, affinity_types, ligands, transport, min_activity_id)
+    query += f'&limit={config.CHEMBL_PAGE_SIZE}'
+    print(f"📡 Enviando consulta a ChEMBL para obtener ligandos asociados a ChEMBL ID '{chembl_target_id}'...")
+
+    # Salvo que se pidan los Elements completos, cada página se parsea en el pool de procesos apenas se descarga, 
+    # mientras los hilos de descarga siguen con las páginas siguientes
+    parse_pool = None if keep_elements else get_parse_pool()
+    if parse_pool is not None:
+        download = partial(fetch_and_parse_chembl_page, transport=transport, pool=parse_pool)
+    else:
+        download = fetch_chembl_page
+
+    page = download(CHEMBL_URL + query, headers, chembl_target_id)
+    page_meta = yield from iter_activities_from_page(page, transport, keep_elements)
+    total_count = page_meta.get("total_count")
+    if total_count is None:
+        # Sin total informado, se sigue el enlace a la página siguiente de a una
+        next_query = page_meta.get("next")
+        while next_query is not None:
+            page = download(CHEMBL_URL + next_query, headers, chembl_target_id)
+            page_meta = yield from iter_activities_from_page(page, transport, keep_elements)
+            next_query = page_meta.get("next")
+        return
 
-def get_binding_activities_for_target_from_chembl(chembl_target_id: str, affinity_types=None, ligands=None):
-    """Consulta la API de ChEMBL para obtener las actividades de unión (binding) de un target dado, filtrando opcionalmente por tipos de afinidad y ligandos."""
-    url = "https://www.ebi.ac.uk"
-    query = f'/chembl/api/data/activity?target_chembl_id={chembl_target_id}&assay_type__exact=B'
+    limit = int(page_meta.get("limit") or config.CHEMBL_PAGE_SIZE)
+    page_urls = [f'{CHEMBL_URL}{query}&offset={offset}' for offset in range(limit, int(total_count), limit)]
+    if page_urls:
+        print(f"📡 Descargando {len(page_urls)} página(s) adicionales de ChEMBL para ChEMBL ID '{chembl_target_id}'...")
+    for page in iter_chembl_pages_concurrently(page_urls, headers, chembl_target_id, download):
+        yield from iter_activities_from_page(page, transport, keep_elements)
+
+@metrics.timed("chembl_page")
+def fetch_chembl_page(url_query, headers, chembl_target_id):
+    """Descarga una página de actividades de ChEMBL respetando el límite de requests simultáneos a ChEMBL. 
+    Con --refresh (config.REFRESH) la página no se toma de la caché de respuestas: las consultas de actividades 
+    nuevas de un target repiten la misma URL mientras no cambie su marca de agua, y la respuesta guardada estaría vieja.
+    Devuelve el contenido de la respuesta o lanza ValueError si no se pudo obtener."""
+    with chembl_requests_semaphore:
+        response = http_client.get(url_query, headers=headers, cache=not config.REFRESH)
+    if response.status_code != 200:
+        raise ValueError(f"⚠️ No se pudo obtener datos desde ChEMBL para {chembl_target_id}")
+    metrics.increment("chembl_pages")
+    return response.content
+
+def fetch_and_parse_chembl_page(url_query, headers, chembl_target_id, transport, pool):
+    """Descarga una página de actividades de ChEMBL y la parsea en el pool de procesos. 
+    El lugar en el límite de requests a ChEMBL se libera antes de parsear. Devuelve una tupla (registros, page_meta)."""
+    content = fetch_chembl_page(url_query, headers, chembl_target_id)
+    records, page_meta, seconds = pool.submit(parse_chembl_page, content, transport).result()
+    metrics.record("chembl_parse", seconds)
+    return records, page_meta
+
+def parse_chembl_page(content, transport):
+    """Parsea una página de actividades de ChEMBL (se ejecuta en un proceso del pool de parseo) y devuelve una tupla 
+    (registros, page_meta, segundos de parseo), donde cada registro es el diccionario compacto de activity_to_record: 
+    al proceso principal sólo vuelven los campos usados, no el XML o JSON completo."""
+    start = time.perf_counter()
+    if transport == "json":
+        activities = iter_activities_from_json_page(content)
+    else:
+        activities = iter_activities_from_xml_page(content)
+    records = []
+    while True:
+        try:
+            records.append(activity_to_record(next(activities)))
+        except StopIteration as stop:
+            return records, stop.value, time.perf_counter() - start
+
+def iter_chembl_pages_concurrently(page_urls, headers, chembl_target_id, download=None):
+    """Descarga en paralelo las páginas indicadas (con download, por defecto fetch_chembl_page) y genera sus resultados 
+    en el mismo orden de page_urls. Sólo se mantienen en curso (o en memoria, sin consumir) hasta 
+    config.CHEMBL_MAX_CONCURRENT_PAGES páginas a la vez."""
+    if not page_urls:
+        return
+    if download is None:
+        download = fetch_chembl_page
+    window = config.CHEMBL_MAX_CONCURRENT_PAGES
+    with ThreadPoolExecutor(max_workers=window) as executor:
+        pending = deque(executor.submit(download, url, headers, chembl_target_id) for url in page_urls[:window])
+        remaining_urls = iter(page_urls[window:])
+        try:
+            while pending:
+                content = pending.popleft().result()
+                next_url = next(remaining_urls, None)
+                if next_url is not None:
+                    pending.append(executor.submit(download, next_url, headers, chembl_target_id))
+                yield content
+        finally:
+            for future in pending:
+                future.cancel()
+
+def iter_activities_from_page(content, transport, keep_elements=False):
+    """Genera las actividades de una página de ChEMBL en el transporte indicado y devuelve su page_meta. 
+    La página puede ser el contenido descargado o una tupla (registros, page_meta) ya parseada en el pool de procesos."""
+    if isinstance(content, tuple):
+        records, page_meta = content
+        metrics.increment("chembl_activities", len(records))
+        yield from records
+        return page_meta
+    if transport == "json":
+        activities = iter_activities_from_json_page(content)
+    else:
+        activities = iter_activities_from_xml_page(content, keep_elements)
+    # Sólo se mide el tiempo de parseo, no el de quien consume las actividades
+    activities = metrics.TimedIterator(activities, "chembl_parse")
+    page_meta = yield from activities
+    metrics.increment("chembl_activities", activities.count)
+    return page_meta
+
+def build_chembl_activity_query(chembl_target_id, affinity_types, ligands, transport, min_activity_id=None):
+    """Arma la consulta (path y parámetros) y los encabezados para pedir a ChEMBL las actividades de unión de un target 
+    (sólo las de activity_id mayor a min_activity_id, si se indica)."""
+    resource = '/chembl/api/data/activity.json' if transport == "json" else '/chembl/api/data/activity'
+    query = f'{resource}?target_chembl_id={chembl_target_id}&assay_type__exact=B'
+    # Los filtros se ordenan para que consultas equivalentes compartan la caché de respuestas
     if ligands != None:
         query += '&molecule_chembl_id__in='
-        query += ','.join(ligands)
+        query += ','.join(sorted(ligands))
     if affinity_types != None:
         query += '&standard_type__in='
-        query += ','.join(affinity_types)
-    headers = {"Accept": "application/xml"}
-    print(f"📡 Enviando consulta a ChEMBL para obtener ligandos asociados a ChEMBL ID '{chembl_target_id}'...")
+        query += ','.join(sorted(affinity_types))
+    if min_activity_id is not None:
+        query += f'&activity_id__gt={min_activity_id}'
+    if transport == "json":
+        query += '&only=' + ','.join(CHEMBL_ACTIVITY_FIELDS)
+        headers = {"Accept": "application/json"}
+    else:
+        headers = {"Accept": "application/xml"}
+    return query, headers
+
+def iter_activities_from_xml_page(content, keep_elements=False):
+    """Parsea de forma incremental una página XML de actividades de ChEMBL, generando cada Element <activity>. 
+    Si keep_elements es False, cada actividad se vacía y se desprende del árbol después de ser consumida. 
+    Devuelve (como valor de retorno del generador) un diccionario con los datos de <page_meta> (next, total_count, limit, ...)."""
+    page_meta = {}
+    activities_elem = None
+    try:
+        for event, elem in ET.iterparse(io.BytesIO(content), events=("start", "end")):
+            if event == "start":
+                if elem.tag == "activities":
+                    activities_elem = elem
+                continue
+            if elem.tag == "activity":
+                yield elem
+                if not keep_elements:
+                    elem.clear()
+                    if activities_elem is not None:
+                        activities_elem.remove(elem)
+            elif elem.tag == "page_meta":
+                page_meta = {child.tag: child.text for child in elem}
+    except ET.ParseError as e:
+        raise ValueError(f"⚠️ Error al parsear XML de respuesta ChEMBL: {e}")
+    return page_meta
+
+def iter_activities_from_json_page(content):
+    """Parsea una página JSON de actividades de ChEMBL y genera cada actividad (diccionario), liberándolas a medida que se consumen. 
+    Devuelve (como valor de retorno del generador) el diccionario page_meta de la página (next, total_count, limit, ...)."""
+    try:
+        page = json.loads(content)
+    except ValueError as e:
+        raise ValueError(f"⚠️ Error al parsear JSON de respuesta ChEMBL: {e}")
+    activities = page.pop("activities", [])
+    activities.reverse()
+    while activities:
+        yield activities.pop()
+    return page.get("page_meta") or {}
+
+def target_ligands_key(chembl_target_id, affinity_types=None, ligands=None, transport=None):
+    """Clave normalizada de un conjunto de ligandos de un target: los filtros se comparan sin importar su orden."""
+    return (chembl_target_id.upper(), tuple(sorted(affinity_types)) if affinity_types is not None else None,
+            tuple(sorted(ligands)) if ligands is not None else None, transport or config.CHEMBL_TRANSPORT,
+            backends.get_backend().name)
+
+@single_flight.coalesce("chembl_target", key=target_ligands_key)
+def get_ligands_from_chembl_target(chembl_target_id: str, affinity_types=None, ligands=None, transport=None):
+    """Procesa las actividades de un target de ChEMBL para agrupar información sobre los ligandos asociados, como sus afinidades, SMILES y año de publicación.
+    Las etapas descarga -> parseo -> agrupamiento se encadenan como generadores, por lo que las actividades no se acumulan en memoria."""
+    activities = metrics.TimedIterator(iter_target_activities(chembl_target_id, affinity_types, ligands, transport))
+    start = time.perf_counter()
+    ligands = group_ligand_assays(iter_ligand_assays(activities))
+    # El agrupamiento no incluye el tiempo de descarga y parseo de las actividades
+    metrics.record("chembl_grouping", time.perf_counter() - start - activities.seconds)
+    metrics.increment("chembl_ligands", len(ligands))
+    print(f"✅ Ligandos procesados para ChEMBL ID '{chembl_target_id}': {len(ligands)} encontrados")
+    return ligands
 
-    activities = []
-    while query is not None:
-        url_query = url + query
-        should_stop = threading.Event()
-        thread = threading.Thread(target=print_function, args=[should_stop])
-        thread.start()
-        response = requests.get(url_query, headers=headers, timeout=10)
-        should_stop.set()
-        thread.join()
-        if response.status_code != 200:
-            print(f"⚠️ No se pudo obtener datos desde ChEMBL para {chembl_target_id}")
-            return []
-        try:
-            root = ET.fromstring(response.text)
-        except ET.ParseError as e:
-            print(f"⚠️ Error al parsear XML de respuesta ChEMBL: {e}")
-            return []
-        activities += root.findall(".//activity")
-        query = root.find('.//next').text
-    return activities
-
-def get_ligands_from_chembl_target(chembl_target_id: str, affinity_types=None, ligands=None):
-    """Procesa las actividades de un target de ChEMBL para agrupar información sobre los ligandos asociados, como sus afinidades, SMILES y año de publicación."""
-    activities = get_binding_activities_for_target_from_chembl(chembl_target_id, affinity_types, ligands)
-    ligands = []
+def iter_target_activities(chembl_target_id: str, affinity_types=None, ligands=None, transport=None):
+    """Generador de las actividades de unión de un target. Si hay un snapshot sin filtros vigente (ver src/target_store.py), 
+    los filtros de afinidad y ligandos se aplican localmente, en cualquier orden, sin consultar a ChEMBL. Si no lo hay y la 
+    consulta es sin filtros, las actividades se descargan y se guardan como snapshot mientras se generan. 
+    Con el backend local (ver src/backends.py) las actividades se leen directamente de la base local de ChEMBL."""
+    backend = backends.get_backend()
+    if not backend.remote:
+        # Los datos ya son locales: no hace falta guardar ni leer snapshots
+        yield from backend.iter_binding_activities(chembl_target_id, affinity_types, ligands, transport)
+        return
+    if config.REFRESH and config.ENABLE_TARGET_STORE:
+        refresh_target_snapshot(chembl_target_id)
+        yield from filter_activities(iter_snapshot(chembl_target_id), affinity_types, ligands)
+        return
+    if has_fresh_snapshot(chembl_target_id):
+        metrics.increment("target_snapshot_hits")
+        print(f"📂 Usando snapshot local de actividades para ChEMBL ID '{chembl_target_id}'")
+        yield from filter_activities(iter_snapshot(chembl_target_id), affinity_types, ligands)
+        return
+    activities = backend.iter_binding_activities(chembl_target_id, affinity_types, ligands, transport)
+    if affinity_types is None and ligands is None and config.ENABLE_TARGET_STORE:
+        records = (activity_to_record(activity) for activity in activities)
+        yield from iter_and_save_snapshot(chembl_target_id, records)
+    else:
+        yield from activities
+
+# Targets ya actualizados en esta ejecución (con --refresh cada target se actualiza una sola vez)
+_refreshed_targets = set()
+_refreshed_targets_lock = threading.Lock()
+
+def refresh_target_snapshot(chembl_target_id):
+    """Actualiza el snapshot sin filtros de un target (--refresh): si ya hay uno con marca de agua, descarga sólo las 
+    actividades con activity_id mayor y las agrega (ver target_store.append_to_snapshot); si no, descarga todas. 
+    Cada target se actualiza una vez por ejecución, aunque varios workers lo pidan a la vez."""
+    with _refreshed_targets_lock:
+        if chembl_target_id in _refreshed_targets:
+            return
+    single_flight.call("target_refresh", chembl_target_id, update_target_snapshot, chembl_target_id)
+
+def update_target_snapshot(chembl_target_id):
+    """Descarga las actividades nuevas (o todas) de un target y las guarda en su snapshot."""
+    with _refreshed_targets_lock:
+        if chembl_target_id in _refreshed_targets:
+            return
+    backend = backends.get_backend()
+    watermark = read_watermark(chembl_target_id) if has_snapshot(chembl_target_id) else None
+    if watermark is None:
+        activities = backend.iter_binding_activities(chembl_target_id)
+        saved = sum(1 for _ in iter_and_save_snapshot(chembl_target_id, map(activity_to_record, activities)))
+        print(f"🔄 Snapshot de ChEMBL ID '{chembl_target_id}' descargado completo: {saved} actividades")
+    else:
+        activities = backend.iter_binding_activities(chembl_target_id, min_activity_id=watermark)
+        added = append_to_snapshot(chembl_target_id, map(activity_to_record, activities))
+        metrics.increment("target_delta_activities", added)
+        print(f"🔄 Snapshot de ChEMBL ID '{chembl_target_id}' actualizado: {added} actividad(es) nuevas "
+              f"(activity_id > {watermark})")
+    metrics.increment("target_refreshes")
+    with _refreshed_targets_lock:
+        _refreshed_targets.add(chembl_target_id)
+
+def reset_refreshed_targets():
+    """Olvida qué targets ya se actualizaron (para volver a actualizarlos en otra ejecución del mismo proceso)."""
+    with _refreshed_targets_lock:
+        _refreshed_targets.clear()
+
+def activity_to_record(activity):
+    """Convierte una actividad (XML o JSON) en un registro compacto con sólo los campos de CHEMBL_ACTIVITY_FIELDS."""
+    return {field: get_field_from_activity(activity, field) for field in CHEMBL_ACTIVITY_FIELDS}
+
+def iter_ligand_assays(activities):
+    """Genera, para cada actividad con datos completos (id de ligando, id de ensayo, tipo y valor de afinidad), 
+    una tupla (id del ligando, SMILES canónico, datos del ensayo)."""
     for activity in activities:
         ligand_id = get_ligand_id_from_activity(activity)
         canonical_smiles = get_canonical_smiles_from_activity(activity)
@@ -87,22 +407,22 @@ def get_ligands_from_chembl_target(chembl_target_id: str, affinity_types=None, l
 
         if not ligand_id or not assay_id or not type_ or not value:
             continue  # ignoramos datos incompletos
-        """
-        if affinity_types and type_ not in affinity_types:
-            continue"""
 
-        ligand_assay_data = get_ligand_assay_data(assay_id, type_, value, value_unit, year)
+        yield ligand_id, canonical_smiles, get_ligand_assay_data(assay_id, type_, value, value_unit, year)
 
+def group_ligand_assays(ligand_assays):
+    """Agrupa los datos de ensayo por ligando, conservando el orden en que aparece cada ligando por primera vez.
+    Los ligandos se indexan por su id ChEMBL, por lo que el costo es lineal en la cantidad de actividades."""
+    ligands_by_id = {}
+    for ligand_id, canonical_smiles, ligand_assay_data in ligand_assays:
         # Buscamos el ligando
-        ligand = next((lig for lig in ligands if lig["chembl_id"] == ligand_id), None)
+        ligand = ligands_by_id.get(ligand_id)
         if ligand is None:
-            ligand = {"chembl_id": ligand_id,"canonical_smiles": canonical_smiles, "assays": [ligand_assay_data]}
-            ligands.append(ligand)
+            ligands_by_id[ligand_id] = {"chembl_id": ligand_id,"canonical_smiles": canonical_smiles, "assays": [ligand_assay_data]}
         else:
             ligand["assays"].append(ligand_assay_data)
-
-    print(f"✅ Ligandos procesados para ChEMBL ID '{chembl_target_id}': {len(ligands)} encontrados")
-    return ligands
+    # Los diccionarios conservan el orden de inserción
+    return list(ligands_by_id.values())
 
 
 def get_ligand_assay_data(assay_id, type_, value, value_unit, year):
@@ -119,132 +439,208 @@ def get_ligand_assay_data(assay_id, type_, value, value_unit, year):
     return ligand_assay_data
 
 
-def get_ligand_id_from_activity(activity: Element):
-    """Extrae el ID ChEMBL del ligando desde una actividad en formato XML."""
-    chembl_id_elem = activity.find("molecule_chembl_id")
-    ligand_id = chembl_id_elem.text if chembl_id_elem is not None else None
-    return ligand_id
-
-def get_canonical_smiles_from_activity(activity: Element):
-    """Extrae el SMILES canónico del ligando desde una actividad en formato XML."""
-    canonical_smiles_elem = activity.find("canonical_smiles")
-    canonical_smiles = canonical_smiles_elem.text if canonical_smiles_elem is not None else None
-    return canonical_smiles
-
-def get_affinity_value_from_activity(activity: Element):
-    """Extrae el valor de afinidad desde una actividad en formato XML."""
-    value_elem = activity.find("standard_value")
-    value = value_elem.text if value_elem is not None else None
-    return value
-
-def get_affinity_value_type_from_activity(activity: Element):
-    """Extrae la unidad del valor de afinidad desde una actividad en formato XML (ej. nM)."""
-    type_elem = activity.find("standard_type")
-    type_ = type_elem.text if type_elem is not None else None
-    return type_
-
-def get_affinity_value_unit_from_activity(activity: Element):
-    """Extrae la unidad del valor de afinidad desde una actividad en formato XML (ej. nM)."""
-    unit_elem = activity.find("standard_units")
-    unit = unit_elem.text if unit_elem is not None else None
-    return unit
-
-def get_document_year_from_activity(activity: Element):
-    """Extrae el año de publicación del documento asociado a una actividad en formato XML."""
-    year_elem = activity.find("document_year")
-    year = year_elem.text if year_elem is not None else None
-    return (year)
-
-def get_assay_id_from_activity(activity: Element):
-    """Extrae el ID del ensayo (assay) desde una actividad en formato XML."""
-    assay_chembl_id_elem = activity.find("assay_chembl_id")
-    assay_id = assay_chembl_id_elem.text if assay_chembl_id_elem is not None else None
-    return assay_id
-
-def process_pdb(pdb_id, affinity_types, ligands_ids):
-    """Procesa una ID de PDB: obtiene información estructural, mapea a UniProt y ChEMBL, consulta ligandos asociados y guarda el resultado en un archivo JSON."""
-    package_dir = os.path.dirname(os.path.abspath(__file__))
-    output_dir = os.path.join(package_dir, "output")
-    os.makedirs(output_dir, exist_ok=True)
-    output_path = os.path.join(output_dir, f"pdb_{pdb_id}")
+def get_field_from_activity(activity, field):
+    """Extrae un campo de una actividad, ya sea en formato XML (Element) o JSON (diccionario). 
+    Los valores se devuelven como texto, igual que en el XML, para que ambos transportes generen el mismo resultado."""
+    if isinstance(activity, dict):
+        value = activity.get(field)
+        return str(value) if value is not None else None
+    elem = activity.find(field)
+    return elem.text if elem is not None else None
+
+def get_ligand_id_from_activity(activity):
+    """Extrae el ID ChEMBL del ligando desde una actividad en formato XML o JSON."""
+    return get_field_from_activity(activity, "molecule_chembl_id")
+
+def get_canonical_smiles_from_activity(activity):
+    """Extrae el SMILES canónico del ligando desde una actividad en formato XML o JSON."""
+    return get_field_from_activity(activity, "canonical_smiles")
+
+def get_affinity_value_from_activity(activity):
+    """Extrae el valor de afinidad desde una actividad en formato XML o JSON."""
+    return get_field_from_activity(activity, "standard_value")
+
+def get_affinity_value_type_from_activity(activity):
+    """Extrae el tipo del valor de afinidad desde una actividad en formato XML o JSON (ej. Ki)."""
+    return get_field_from_activity(activity, "standard_type")
+
+def get_affinity_value_unit_from_activity(activity):
+    """Extrae la unidad del valor de afinidad desde una actividad en formato XML o JSON (ej. nM)."""
+    return get_field_from_activity(activity, "standard_units")
+
+def get_document_year_from_activity(activity):
+    """Extrae el año de publicación del documento asociado a una actividad en formato XML o JSON."""
+    return get_field_from_activity(activity, "document_year")
+
+def get_assay_id_from_activity(activity):
+    """Extrae el ID del ensayo (assay) desde una actividad en formato XML o JSON."""
+    return get_field_from_activity(activity, "assay_chembl_id")
+
+def get_uniprot_data(uniprot_id, plan=None):
+    """Devuelve la entrada UniProt de un id, tomándola del plan de consultas si ya fue obtenida."""
+    if plan is not None and uniprot_id in plan.uniprot_data:
+        return plan.uniprot_data[uniprot_id]
+    return backends.get_backend().get_data_from_uniprot_id(uniprot_id)
+
+def get_chembl_id_from_uniprot_data(data_from_uniprot):
+    """Extrae el id ChEMBL del target desde las referencias cruzadas de una entrada UniProt."""
+    id_data_from_uniprot = data_from_uniprot.get('uniProtKBCrossReferences')
+    chembl_ids_data = next((id for id in id_data_from_uniprot if id['database'] == "ChEMBL"), None)
+    return chembl_ids_data.get('id')
+
+def build_output_path(prefix, id_, affinity_types, ligands_ids, output_format=None):
+    """Arma la ruta del archivo de salida de un ID (en config.OUTPUT_DIR, por defecto src/output), incluyendo los filtros de afinidad y ligandos 
+    y la extensión del formato de salida (por defecto config.OUTPUT_FORMAT)."""
+    if output_format is None:
+        output_format = config.OUTPUT_FORMAT
+    os.makedirs(config.OUTPUT_DIR, exist_ok=True)
+    output_path = os.path.join(config.OUTPUT_DIR, f"{prefix}_{id_}")
     if affinity_types != None:
         output_path += '_'
         output_path += ','.join(affinity_types)
     if ligands_ids != None:
         output_path += '_'
         output_path += ','.join(ligands_ids)
-    output_path += '.json'
+    output_path += EXTENSIONS[output_format]
+    return output_path
+
+@metrics.timed("output_write")
+def save_result(output_path, result, target_id, output_format=None):
+    """Guarda el resultado de un ID en el formato de salida indicado (por defecto config.OUTPUT_FORMAT): el JSON completo, 
+    o sólo la tabla de ligandos/ensayos en formato columnar. La escritura es atómica (archivo temporal + renombrado): si falla 
+    no queda ningún archivo parcial. Devuelve True si el archivo se guardó."""
+    if output_format is None:
+        output_format = config.OUTPUT_FORMAT
+    try:
+        if output_format == "json":
+            with atomic_open(output_path, "w") as f:
+                json.dump(result, f, indent=4)
+        else:
+            with atomic_open(output_path, "wb") as f:
+                write_columnar(f, ligands_to_columns(target_id, result["ligands"]), output_format)
+        print(f"💾 Resultado guardado en {output_path}")
+        return True
+    except Exception as e:
+        print(f"⚠️ Error al guardar el archivo {output_path}. Archivo eliminado. Detalles: {e}")
+        return False
+
+def save_ligands_for_result(output_path, result, target_id, affinity_types, ligands_ids, plan=None):
+    """Obtiene los ligandos del target ChEMBL de un resultado y lo guarda. Con el formato "jsonl" las actividades se escriben 
+    a medida que llegan (ver stream_result_to_jsonl); con los demás formatos se agrupan por ligando y se guarda el resultado completo. 
+    Con un plan de consultas, los ligandos de un target se descargan una sola vez para todos los IDs del bloque.
+    Devuelve el estado del ID: "done" si se guardó el archivo, "empty" si no hay target ChEMBL o "failed" si hubo un error."""
+    ligands = []
+    if not result.get("chembl_id"):
+        print(f"⚠️ No se generó archivo para {target_id} porque no se obtuvieron datos.")
+        return "empty"
+    try:
+        if config.OUTPUT_FORMAT == "jsonl":
+            stream_result_to_jsonl(output_path, result, affinity_types, ligands_ids)
+            return "done"
+        ligands = get_ligands_for_result(result, affinity_types, ligands_ids, plan)
+    except Exception as e:
+        print(f"⚠️ Error al obtener ligandos desde ChEMBL: {e}")
+        print(f"⚠️ No se generó archivo para {target_id} porque no se obtuvieron datos.")
+        return "failed"
 
-    if config.ENABLE_LOCAL_CACHE and os.path.isfile(output_path):
+    result["ligands"] = ligands
+    return "done" if save_result(output_path, result, target_id) else "failed"
+
+def get_ligands_for_result(result, affinity_types, ligands_ids, plan=None):
+    """Devuelve los ligandos del target ChEMBL de un resultado. Con un plan de consultas, se toman del plan: el target se descarga 
+    una sola vez para todos los IDs del bloque y sus ligandos se liberan al tomarlos el último (ver QueryPlan.take_ligands)."""
+    def fetch(chembl_id):
+        return get_ligands_from_chembl_target(chembl_id, affinity_types=affinity_types, ligands=ligands_ids)
+
+    if plan is not None:
+        return plan.take_ligands(result["chembl_id"], fetch)
+    return fetch(result["chembl_id"])
+
+def is_request_error(error):
+    """Indica si un error corresponde a una falla al consultar una API (red, timeout, respuesta inválida) y no a datos inexistentes."""
+    return isinstance(error, (requests.RequestException, ValueError, TimeoutError))
+
+def stream_result_to_jsonl(output_path, result, affinity_types, ligands_ids):
+    """Escribe el resultado en formato JSON Lines a medida que se procesan las actividades de ChEMBL: la primera línea tiene los datos 
+    del target (sin "ligands") y cada línea siguiente un ensayo ({"chembl_id", "canonical_smiles", "assay"}). Mientras se escribe, el 
+    archivo se llama <salida>.<pid>-<hilo>.part (ver atomic_file.temp_path_for; se informa al empezar y puede leerse en paralelo); al terminar se renombra de forma atómica. Si falla, se elimina."""
+    header = {key: value for key, value in result.items() if key != "ligands"}
+    activities = iter_target_activities(result["chembl_id"], affinity_types, ligands_ids)
+    assays = 0
+    with atomic_open(output_path) as f:
+        print(f"✍️ Escribiendo {output_path} (en curso: {f.name})")
+        f.write(json.dumps(header) + "\n")
+        for ligand_id, canonical_smiles, ligand_assay_data in iter_ligand_assays(activities):
+            f.write(json.dumps({"chembl_id": ligand_id, "canonical_smiles": canonical_smiles, "assay": ligand_assay_data}) + "\n")
+            assays += 1
+    print(f"💾 Resultado guardado en {output_path} ({assays} ensayos)")
+
+@metrics.timed("process_pdb")
+def process_pdb(pdb_id, affinity_types, ligands_ids, plan=None):
+    """Procesa una ID de PDB: obtiene información estructural, mapea a UniProt y ChEMBL, consulta ligandos asociados y guarda el resultado en un archivo (JSON o columnar, según config.OUTPUT_FORMAT).
+    Si se recibe un plan de consultas (ver src/query_plan.py), se reutilizan los datos de RCSB PDB, el mapeo a UniProt, la entrada 
+    UniProt y los ligandos de cada target (descargados una sola vez por bloque), y sólo se consulta individualmente lo que falte.
+    Devuelve el estado del ID: "done", "empty" (sin datos para guardar, incluso si la estructura no existe) o "failed"."""
+    output_path = build_output_path("pdb", pdb_id, affinity_types, ligands_ids)
+
+    if config.ENABLE_LOCAL_CACHE and not config.REFRESH and os.path.isfile(output_path):
         print(f"📂 Resultado ya disponible localmente para PDB ID '{pdb_id}'. Ruta: {output_path}. Se omitirá la consulta.")
+        return "done"
 
-        return
-
-    result = fetch_pdb_info(pdb_id)
+    try:
+        result = get_pdb_result(pdb_id, plan)
+    except LookupError as e:
+        print(f"⚠️ {e}. No se generó archivo para {pdb_id}.")
+        return "empty"
+    if result is None:
+        return "failed"
+    return save_ligands_for_result(output_path, result, pdb_id, affinity_types, ligands_ids, plan)
+
+def get_pdb_result(pdb_id, plan=None):
+    """Arma el resultado (sin ligandos) de una ID de PDB: datos de RCSB PDB y sus IDs UniProt y ChEMBL, sin escribir archivos.
+    Si no se encuentra el target, el resultado queda sin "chembl_id". Devuelve None si falló la consulta a UniProt.
+    Si la estructura no existe en RCSB PDB lanza LookupError."""
+    result = plan.get_pdb_info(pdb_id) if plan is not None else None
+    if result is None:
+        result = backends.get_backend().fetch_pdb_info(pdb_id)
 
     try:
         print(f"🔗 Buscando IDs UniProt y ChEMBL para PDB ID '{pdb_id}'...")
-        uniprot_id = get_uniprot_id_from_pdb_id(pdb_id)
-        data_from_uniprot = get_data_from_uniprot_id(uniprot_id)
-        id_data_from_uniprot = data_from_uniprot.get('uniProtKBCrossReferences')
-        chembl_ids_data = next((id for id in id_data_from_uniprot if id['database'] == "ChEMBL"), None)
-        chembl_id = chembl_ids_data.get('id')
+        uniprot_id = plan.uniprot_ids.get(pdb_id) if plan is not None else None
+        if uniprot_id is None:
+            uniprot_id = backends.get_backend().get_uniprot_id_from_pdb_id(pdb_id)
+        data_from_uniprot = get_uniprot_data(uniprot_id, plan)
+        chembl_id = get_chembl_id_from_uniprot_data(data_from_uniprot)
         result["uniprot_id"] = uniprot_id
         result["chembl_id"] = chembl_id
     except Exception as e:
         print(f"⚠️ No se pudieron obtener los IDs UniProt/ChEMBL: {e}")
+        if is_request_error(e):
+            return None
+    return result
 
-    ligands = []
-    success = False
-    if result.get("chembl_id"):
-        try:
-            ligands = get_ligands_from_chembl_target(result["chembl_id"], affinity_types=affinity_types, ligands = ligands_ids)
-            success = True
-        except Exception as e:
-            print(f"⚠️ Error al obtener ligandos desde ChEMBL: {e}")
 
-    result["ligands"] = ligands
-    
-
-    """
-    # Guardar salida
-    package_dir = os.path.dirname(os.path.abspath(__file__))
-    output_dir = os.path.join(package_dir, "output")
-    os.makedirs(output_dir, exist_ok=True)
-    output_path = os.path.join(output_dir, f"pdb_{pdb_id}.json")
-    """
-    if success or ligands:
-        try:
-            with open(output_path, "w") as f:
-                json.dump(result, f, indent=4)
-            print(f"💾 Resultado guardado en {output_path}")
-        except Exception as e:
-            if os.path.exists(output_path):
-                os.remove(output_path)
-            print(f"⚠️ Error al guardar el archivo {output_path}. Archivo eliminado. Detalles: {e}")
-    else:
-        print(f"⚠️ No se generó archivo para {pdb_id} porque no se obtuvieron datos.")
 
+@metrics.timed("process_uniprot")
+def process_uniprot(uniprot_id, affinity_types, ligands_ids, plan=None):
+    """Procesa una ID de UniProt: obtiene mapeos a PDB y ChEMBL, consulta ligandos asociados y guarda el resultado en un archivo (JSON o columnar, según config.OUTPUT_FORMAT).
+    Si se recibe un plan de consultas (ver src/query_plan.py), se reutilizan la entrada UniProt y los ligandos de cada target (descargados una sola vez por bloque).
+    Devuelve el estado del ID: "done", "empty" (sin datos para guardar) o "failed"."""
+    output_path = build_output_path("uniprot", uniprot_id, affinity_types, ligands_ids)
 
-
-def process_uniprot(uniprot_id, affinity_types, ligands_ids):
-    """Procesa una ID de UniProt: obtiene mapeos a PDB y ChEMBL, consulta ligandos asociados y guarda el resultado en un archivo JSON."""
-    package_dir = os.path.dirname(os.path.abspath(__file__))
-    output_dir = os.path.join(package_dir, "output")
-    os.makedirs(output_dir, exist_ok=True)
-    output_path = os.path.join(output_dir, f"uniprot_{uniprot_id}")
-    if affinity_types != None:
-        output_path += '_'
-        output_path += ','.join(affinity_types)
-    if ligands_ids != None:
-        output_path += '_'
-        output_path += ','.join(ligands_ids)
-    output_path += '.json'
-
-    if config.ENABLE_LOCAL_CACHE and os.path.isfile(output_path):
+    if config.ENABLE_LOCAL_CACHE and not config.REFRESH and os.path.isfile(output_path):
         print(f"📂 Resultado ya disponible localmente para UniProt ID '{uniprot_id}'. Ruta: {output_path}. Se omitirá la consulta.")
-        return
+        return "done"
 
+    result = get_uniprot_result(uniprot_id, plan)
+    if result is None:
+        return "failed"
+    return save_ligands_for_result(output_path, result, uniprot_id, affinity_types, ligands_ids, plan)
+
+def get_uniprot_result(uniprot_id, plan=None):
+    """Arma el resultado (sin ligandos) de una ID de UniProt: sus estructuras PDB, su target ChEMBL y los datos de publicación, 
+    sin escribir archivos. Si no se encuentra la entrada o el target, el resultado queda sin "chembl_id". 
+    Devuelve None si falló la consulta a UniProt."""
     print(f"🔗 Procesando UniProt ID '{uniprot_id}'...")
     result = {
         "pdb_ids": [],
@@ -257,13 +653,12 @@ def process_uniprot(uniprot_id, affinity_types, ligands_ids):
     }
 
     try:
-        data_from_uniprot = get_data_from_uniprot_id(uniprot_id)
+        data_from_uniprot = get_uniprot_data(uniprot_id, plan)
         id_data_from_uniprot = data_from_uniprot.get('uniProtKBCrossReferences')
         if not id_data_from_uniprot:
             print(f"⚠️ UniProt ID '{uniprot_id}' no encontrado.")
-            return
-        chembl_ids_data = next((id for id in id_data_from_uniprot if id['database'] == "ChEMBL"), None)
-        chembl_id = chembl_ids_data.get('id')
+            return result
+        chembl_id = get_chembl_id_from_uniprot_data(data_from_uniprot)
         pdb_ids_data = [id for id in id_data_from_uniprot if id['database'] == "PDB"]
         pdb_ids = []
         for pdb_data in pdb_ids_data:
@@ -282,34 +677,7 @@ def process_uniprot(uniprot_id, affinity_types, ligands_ids):
         result["doi"] = pub_doi_from_uniprot
     except Exception as e:
         print(f"⚠️ No se pudo obtener el ID ChEMBL: {e}")
-
-    ligands = []
-    success = False
-
-    if result.get("chembl_id"):
-        try:
-            ligands = get_ligands_from_chembl_target(result["chembl_id"], affinity_types=affinity_types, ligands=ligands_ids)
-            success = True
-        except Exception as e:
-            print(f"⚠️ Error al obtener ligandos desde ChEMBL: {e}")
-
-    result["ligands"] = ligands
-    """
-    # Guardar salida
-    package_dir = os.path.dirname(os.path.abspath(__file__))
-    output_dir = os.path.join(package_dir, "output")
-    os.makedirs(output_dir, exist_ok=True)
-    output_path = os.path.join(output_dir, f"uniprot_{uniprot_id}.json")
-    """
-    if success or ligands:
-        try:
-            with open(output_path, "w") as f:
-                json.dump(result, f, indent=4)
-            print(f"💾 Resultado guardado en {output_path}")
-        except Exception as e:
-            if os.path.exists(output_path):
-                os.remove(output_path)
-            print(f"⚠️ Error al guardar el archivo {output_path}. Archivo eliminado. Detalles: {e}")
-    else:
-        print(f"⚠️ No se generó archivo para {uniprot_id} porque no se obtuvieron datos.")
+        if is_request_error(e):
+            return None
+    return result
 
@@ -0,0 +1,76 @@
+import threading
+import time
+
+from src import config, metrics
+
+_lock = threading.Lock()
+_stop = threading.Event()
+_thread = None
+_total_ids = 0
+_started = time.perf_counter()
+
+
+def start(interval=None):
+    """
+    Comienza a informar el progreso de la ejecución: un único hilo imprime cada
+    interval segundos (por defecto config.PROGRESS_INTERVAL) una línea de estado.
+    Los datos se toman de los contadores de src/metrics.py, por lo que el
+    procesamiento nunca espera al reporte.
+    """
+    global _thread, _total_ids, _started
+    stop()
+    with _lock:
+        _total_ids = 0
+        _started = time.perf_counter()
+    _stop.clear()
+    _thread = threading.Thread(target=run, args=[interval or config.PROGRESS_INTERVAL], daemon=True)
+    _thread.start()
+
+
+def stop():
+    """Deja de informar el progreso. No espera al próximo reporte: el hilo se despierta apenas se lo detiene."""
+    global _thread
+    _stop.set()
+    if _thread is not None:
+        _thread.join()
+        _thread = None
+
+
+def add_total(count):
+    """Suma count IDs a procesar (los IDs de entrada se leen por bloques, así que el total crece con cada bloque)."""
+    global _total_ids
+    with _lock:
+        _total_ids += count
+
+
+def run(interval):
+    """Imprime el estado cada interval segundos hasta que se llame a stop."""
+    while not _stop.wait(interval):
+        print(format_progress())
+
+
+def format_progress():
+    """Arma la línea de estado: IDs terminados/total, páginas de ChEMBL, actividades por segundo y tiempo restante estimado."""
+    with _lock:
+        total_ids = _total_ids
+        elapsed = time.perf_counter() - _started
+    done = metrics.total("ids")
+    pages = metrics.total("chembl_pages")
+    activities = metrics.total("chembl_activities")
+    rate = activities / elapsed if elapsed > 0 else 0.0
+    return (f"⏳ {done}/{total_ids} ID(s) terminados · {pages} página(s) de ChEMBL · "
+            f"{rate:.0f} actividades/s · ETA {format_eta(done, total_ids, elapsed)}")
+
+
+def format_eta(done, total_ids, elapsed):
+    """Estima el tiempo restante según el ritmo de IDs terminados hasta ahora."""
+    if done <= 0 or total_ids <= done:
+        return "--"
+    seconds = int((total_ids - done) * elapsed / done)
+    minutes, seconds = divmod(seconds, 60)
+    hours, minutes = divmod(minutes, 60)
+    if hours:
+        return f"{hours}h {minutes:02d}m"
+    if minutes:
+        return f"{minutes}m {seconds:02d}s"
+    return f"{seconds}s"
@@ -0,0 +1,159 @@
+import os
+import threading
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor, Future
+
+from src import config, backends, metrics
+from src.pdb_handler import build_output_path, get_chembl_id_from_uniprot_data
+
+
+class QueryPlan:
+    """
+    Datos resueltos de antemano para todos los IDs de una ejecución: datos de 
+    RCSB PDB, mapeos PDB -> UniProt y entradas UniProt. process_pdb / 
+    process_uniprot los reutilizan y sólo consultan las APIs para lo que no 
+    esté en el plan. Los ligandos de cada target ChEMBL se descargan recién 
+    cuando el primer ID los necesita y se conservan sólo hasta que los toma 
+    el último ID del bloque que corresponde a ese target (ver take_ligands), 
+    así la memoria no crece con la cantidad de targets del bloque.
+    """
+
+    def __init__(self):
+        self.pdb_infos = {}  # id PDB -> resultado inicial de RCSB PDB
+        self.uniprot_ids = {}  # id PDB -> id UniProt
+        self.uniprot_data = {}  # id UniProt -> entrada UniProt
+        self.ligand_futures = {}  # id ChEMBL del target -> Future con sus ligandos agrupados (mientras otros IDs los necesiten)
+        self.target_refs = {}  # id ChEMBL del target -> IDs del bloque que todavía no tomaron sus ligandos
+        self.saved_calls = {"UniProt": 0, "ChEMBL": 0}
+        self.lock = threading.Lock()
+
+    def get_pdb_info(self, pdb_id):
+        """Devuelve una copia del resultado inicial de RCSB PDB para pdb_id, o None."""
+        pdb_info = self.pdb_infos.get(pdb_id)
+        return dict(pdb_info) if pdb_info is not None else None
+
+    def take_ligands(self, chembl_id, fetch):
+        """
+        Devuelve los ligandos de un target para uno de los IDs del bloque. El 
+        primer ID que los pide crea (bajo el lock) el Future del target y los 
+        obtiene con fetch(chembl_id); los demás esperan ese mismo Future, así 
+        cada target se descarga una sola vez aunque varios IDs lo pidan a la 
+        vez. Se conservan mientras queden otros IDs del bloque con ese target; 
+        al tomarlos el último, se descartan. Si la descarga falla, el error se 
+        comparte con quienes la esperaban y el próximo ID vuelve a intentarla.
+        """
+        with self.lock:
+            future = self.ligand_futures.get(chembl_id)
+            leader = future is None
+            if leader:
+                future = Future()
+                self.ligand_futures[chembl_id] = future
+        if leader:
+            try:
+                future.set_result(fetch(chembl_id))
+            except BaseException as e:
+                future.set_exception(e)
+                with self.lock:
+                    if self.ligand_futures.get(chembl_id) is future:
+                        del self.ligand_futures[chembl_id]
+        try:
+            return future.result()
+        finally:
+            with self.lock:
+                remaining = self.target_refs.get(chembl_id, 0) - 1
+                if remaining > 0:
+                    self.target_refs[chembl_id] = remaining
+                else:
+                    self.target_refs.pop(chembl_id, None)
+                    self.ligand_futures.pop(chembl_id, None)
+
+
+@metrics.timed("query_plan")
+def build_query_plan(pdb_ids, uniprot_ids, affinity_types, ligands_ids, workers, save_results=True):
+    """
+    Arma el plan de consultas de una ejecución:
+    - Resuelve en lote los datos de RCSB PDB y los mapeos PDB -> UniProt.
+    - Descarga una sola vez cada entrada UniProt distinta y obtiene su target ChEMBL.
+    - Cuenta cuántos IDs usan cada target ChEMBL, para descargar sus actividades 
+      una sola vez y liberarlas cuando ya no hacen falta (ver QueryPlan.take_ligands).
+    Los IDs con resultado ya guardado localmente no se incluyen, salvo que los 
+    resultados no se vayan a guardar (save_results False, ver src/api.py). Si 
+    una etapa falla, los IDs afectados se consultarán individualmente al procesarse.
+    """
+    plan = QueryPlan()
+    if save_results:
+        pdb_ids = [pdb_id for pdb_id in pdb_ids if not has_local_result("pdb", pdb_id, affinity_types, ligands_ids)]
+        uniprot_ids = [uniprot_id for uniprot_id in uniprot_ids
+                       if not has_local_result("uniprot", uniprot_id, affinity_types, ligands_ids)]
+    if not pdb_ids and not uniprot_ids:
+        return plan
+
+    backend = backends.get_backend()
+    if pdb_ids:
+        print(f"🔗 Resolviendo datos de RCSB PDB y mapeos a UniProt de {len(pdb_ids)} ID(s) de PDB en lote...")
+        plan.pdb_infos = run_stage("RCSB PDB", backend.fetch_pdb_info_batch, pdb_ids)
+        plan.uniprot_ids = run_stage("UniProt IdMapping", backend.get_uniprot_ids_from_pdb_ids, pdb_ids)
+
+    # Entradas UniProt: una consulta por accession distinto
+    requested_uniprot_ids = [plan.uniprot_ids[pdb_id] for pdb_id in pdb_ids if pdb_id in plan.uniprot_ids] + uniprot_ids
+    distinct_uniprot_ids = list(dict.fromkeys(requested_uniprot_ids))
+    plan.uniprot_data = fetch_distinct(distinct_uniprot_ids, backend.get_data_from_uniprot_id, workers, "UniProt")
+    plan.saved_calls["UniProt"] = len(requested_uniprot_ids) - len(distinct_uniprot_ids)
+
+    # Actividades ChEMBL: una descarga por target distinto, al procesar el primer ID que lo usa.
+    # Con la salida jsonl los ligandos se escriben a medida que llegan y no pasan por el plan.
+    requested_targets = []
+    for uniprot_id in requested_uniprot_ids:
+        try:
+            requested_targets.append(get_chembl_id_from_uniprot_data(plan.uniprot_data[uniprot_id]))
+        except (KeyError, TypeError, AttributeError):
+            continue  # Sin entrada UniProt o sin target ChEMBL
+    if not save_results or config.OUTPUT_FORMAT != "jsonl":
+        plan.target_refs = dict(Counter(requested_targets))
+        plan.saved_calls["ChEMBL"] = len(requested_targets) - len(plan.target_refs)
+
+    report_saved_calls(plan)
+    return plan
+
+
+def has_local_result(prefix, id_, affinity_types, ligands_ids):
+    """Indica si el resultado de un ID ya está guardado localmente y se va a reutilizar."""
+    if config.REFRESH:
+        return False  # Con --refresh los resultados guardados se actualizan
+    return config.ENABLE_LOCAL_CACHE and os.path.isfile(build_output_path(prefix, id_, affinity_types, ligands_ids))
+
+
+def run_stage(description, function, ids):
+    """Ejecuta una etapa en lote del plan; si falla devuelve un diccionario vacío."""
+    try:
+        return function(ids)
+    except Exception as e:
+        print(f"⚠️ No se pudo resolver en lote la etapa {description}, se consultará cada ID por separado: {e}")
+        return {}
+
+
+def fetch_distinct(keys, function, workers, description):
+    """
+    Aplica function a cada clave distinta usando hasta workers hilos. 
+    Devuelve {clave: resultado}, omitiendo las claves cuya consulta falló.
+    """
+    if not keys:
+        return {}
+    print(f"📡 Consultando {len(keys)} entrada(s) distinta(s) de {description}...")
+    results = {}
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = {key: executor.submit(function, key) for key in keys}
+        for key, future in futures.items():
+            try:
+                results[key] = future.result()
+            except Exception as e:
+                print(f"⚠️ No se pudo consultar {description} para '{key}': {e}")
+    return results
+
+
+def report_saved_calls(plan):
+    """Informa cuántas consultas se evitaron al deduplicar entradas UniProt y targets ChEMBL."""
+    saved_uniprot = plan.saved_calls["UniProt"]
+    saved_chembl = plan.saved_calls["ChEMBL"]
+    print(f"♻️ Deduplicación: se evitaron {saved_uniprot} consulta(s) a UniProt y "
+          f"{saved_chembl} descarga(s) de actividades de ChEMBL para {len(plan.target_refs)} target(s) distinto(s).")
@@ -0,0 +1,112 @@
+import threading
+import time
+from email.utils import parsedate_to_datetime
+
+from src import config
+
+_limiters = {}
+_limiters_lock = threading.Lock()
+
+
+class HostRateLimiter:
+    """
+    Limita los requests a un host con un token bucket (rate requests por
+    segundo, con ráfagas de hasta burst) y un máximo de requests en curso.
+    Ambos límites se adaptan con AIMD: ante un 429 o 503 se reducen a la mitad
+    y se pausa el host hasta que venza su Retry-After; con cada respuesta
+    exitosa vuelven a crecer de a poco hasta sus máximos. Así cada proveedor
+    se consulta lo más rápido posible sin superar su límite.
+    """
+
+    def __init__(self, rate, burst, concurrency):
+        self.max_rate = rate
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.max_concurrency = concurrency
+        self.concurrency = concurrency
+        self.in_flight = 0
+        self.blocked_until = 0.0
+        self.updated = time.monotonic()
+        self.condition = threading.Condition()
+
+    def acquire(self):
+        """Espera hasta que haya un token disponible, el host no esté pausado y haya lugar para otro request en curso."""
+        with self.condition:
+            while True:
+                now = time.monotonic()
+                self.refill(now)
+                if now < self.blocked_until:
+                    self.condition.wait(self.blocked_until - now)
+                elif self.in_flight >= int(self.concurrency):
+                    self.condition.wait()
+                elif self.tokens < 1:
+                    self.condition.wait((1 - self.tokens) / self.rate)
+                else:
+                    self.tokens -= 1
+                    self.in_flight += 1
+                    return
+
+    def release(self, status_code=None, retry_after=None, throttled=0):
+        """
+        Libera el lugar de un request terminado y ajusta los límites según su
+        resultado: status_code None indica un error de conexión; throttled es
+        la cantidad de respuestas 429/503 que ya reintentó urllib3.
+        """
+        with self.condition:
+            self.in_flight -= 1
+            now = time.monotonic()
+            if status_code in config.RATE_LIMIT_STATUS_CODES or throttled:
+                self.decrease(now, retry_after)
+            elif status_code is not None and status_code < 400:
+                self.increase()
+            self.condition.notify_all()
+
+    def decrease(self, now, retry_after):
+        """Reduce los límites a la mitad (decremento multiplicativo) y pausa el host."""
+        self.refill(now)
+        self.rate = max(config.RATE_LIMIT_MIN_RATE, self.rate / 2)
+        self.concurrency = max(1.0, self.concurrency / 2)
+        self.tokens = min(self.tokens, 0.0)
+        pause = retry_after if retry_after is not None else 1 / self.rate
+        self.blocked_until = max(self.blocked_until, now + min(pause, config.RATE_LIMIT_MAX_RETRY_AFTER))
+
+    def increase(self):
+        """Aumenta los límites de a poco (incremento aditivo: alrededor de un request por segundo por segundo)."""
+        self.rate = min(self.max_rate, self.rate + config.RATE_LIMIT_INCREASE / self.rate)
+        self.concurrency = min(self.max_concurrency, self.concurrency + 1 / self.concurrency)
+
+    def refill(self, now):
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+
+def get_limiter(host):
+    """Devuelve el limitador de un host, creándolo con sus límites de config.RATE_LIMITS la primera vez."""
+    with _limiters_lock:
+        limiter = _limiters.get(host)
+        if limiter is None:
+            rate, burst, concurrency = config.RATE_LIMITS.get(host, config.RATE_LIMIT_DEFAULT)
+            limiter = HostRateLimiter(rate, burst, concurrency)
+            _limiters[host] = limiter
+        return limiter
+
+
+def reset():
+    """Descarta los limitadores (y lo que aprendieron de cada host)."""
+    with _limiters_lock:
+        _limiters.clear()
+
+
+def parse_retry_after(value):
+    """Interpreta un encabezado Retry-After (segundos o fecha HTTP) y devuelve los segundos a esperar, o None."""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
@@ -0,0 +1,129 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from urllib.parse import urlsplit, parse_qsl, urlencode, urlunsplit
+
+
+class ResponseCache:
+    """
+    Caché en disco (SQLite) de respuestas HTTP, indexada por request normalizado.
+    Cada entrada vence según el TTL de su fuente (el host consultado) y, si el 
+    tamaño total supera max_bytes, se eliminan las entradas usadas hace más tiempo (LRU).
+    """
+
+    def __init__(self, cache_dir, max_bytes, ttls, default_ttl):
+        os.makedirs(cache_dir, exist_ok=True)
+        self.path = os.path.join(cache_dir, "responses.sqlite")
+        self.max_bytes = max_bytes
+        self.ttls = ttls
+        self.default_ttl = default_ttl
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(self.path, check_same_thread=False)
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            "key TEXT PRIMARY KEY, source TEXT, headers TEXT, body BLOB, "
+            "size INTEGER, created REAL, last_access REAL)"
+        )
+        self._connection.execute("CREATE INDEX IF NOT EXISTS responses_last_access ON responses (last_access)")
+        self._connection.commit()
+        self.total_bytes = self._connection.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+
+    def get(self, key, source, allow_stale=False):
+        """
+        Devuelve (body, headers) si la clave está en caché y no venció; si no, None.
+        Con allow_stale se devuelve aunque haya vencido, para revalidarla con un 
+        request condicional: por eso las entradas vencidas con ETag o 
+        Last-Modified se conservan (hasta que las desaloje el límite de tamaño).
+        """
+        now = time.time()
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT headers, body, size, created FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                if not allow_stale:
+                    self.misses += 1
+                return None
+            headers, body, size, created = row
+            if allow_stale:
+                return body, json.loads(headers)
+            if now - created > self.ttls.get(source, self.default_ttl):
+                if not has_validators(json.loads(headers)):
+                    self._connection.execute("DELETE FROM responses WHERE key = ?", (key,))
+                    self._connection.commit()
+                    self.total_bytes -= size
+                self.misses += 1
+                return None
+            self._connection.execute("UPDATE responses SET last_access = ? WHERE key = ?", (now, key))
+            self._connection.commit()
+            self.hits += 1
+            return body, json.loads(headers)
+
+    def set(self, key, source, body, headers=None):
+        """
+        Guarda una respuesta en caché y aplica la política de desalojo por tamaño.
+        """
+        now = time.time()
+        size = len(body)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            previous = self._connection.execute("SELECT size FROM responses WHERE key = ?", (key,)).fetchone()
+            if previous is not None:
+                self.total_bytes -= previous[0]
+            self._connection.execute(
+                "INSERT OR REPLACE INTO responses (key, source, headers, body, size, created, last_access) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (key, source, json.dumps(headers or {}), body, size, now, now))
+            self.total_bytes += size
+            self._evict()
+            self._connection.commit()
+
+    def _evict(self):
+        """
+        Elimina las entradas menos usadas recientemente hasta respetar max_bytes.
+        """
+        while self.total_bytes > self.max_bytes:
+            row = self._connection.execute(
+                "SELECT key, size FROM responses ORDER BY last_access ASC LIMIT 1").fetchone()
+            if row is None:
+                self.total_bytes = 0
+                break
+            self._connection.execute("DELETE FROM responses WHERE key = ?", (row[0],))
+            self.total_bytes -= row[1]
+
+    def stats(self):
+        """
+        Devuelve un diccionario con los aciertos, fallos y el tamaño actual de la caché.
+        """
+        return {"hits": self.hits, "misses": self.misses, "bytes": self.total_bytes}
+
+    def close(self):
+        with self._lock:
+            self._connection.close()
+
+
+def has_validators(headers):
+    """Indica si una respuesta guardada tiene ETag o Last-Modified (y se puede revalidar con un request condicional)."""
+    return any(name in headers for name in ("ETag", "Last-Modified"))
+
+
+def normalize_request_key(method, url, params=None, data=None, json_body=None):
+    """
+    Construye una clave estable para un request: método, URL con los parámetros 
+    ordenados y el cuerpo (form o JSON) serializado de forma canónica.
+    """
+    parts = urlsplit(url)
+    query = parse_qsl(parts.query, keep_blank_values=True)
+    if params:
+        query += list(params.items()) if isinstance(params, dict) else list(params)
+    normalized_url = urlunsplit((parts.scheme, parts.netloc.lower(), parts.path, urlencode(sorted(query)), ""))
+    key = f"{method.upper()} {normalized_url}"
+    if data:
+        key += " " + urlencode(sorted(data.items()) if isinstance(data, dict) else data)
+    if json_body is not None:
+        key += " " + json.dumps(json_body, sort_keys=True, separators=(",", ":"))
+    return key
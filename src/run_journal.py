@@ -0,0 +1,132 @@
+import json
+import os
+import threading
+import time
+
+PENDING = "pending"
+DONE = "done"
+FAILED = "failed"
+EMPTY = "empty"
+STATES = (PENDING, DONE, FAILED, EMPTY)
+FINISHED_STATES = (DONE, EMPTY)
+SETTINGS_KIND = "settings"  # Línea del diario con los parámetros que definen los archivos de salida
+
+
+class RunJournal:
+    """
+    Diario de una ejecución: guarda el estado de cada ID procesado (pending,
+    done, failed o empty), la cantidad de intentos y el último error. Es un
+    archivo JSON Lines al que sólo se agregan líneas, una por cambio de estado,
+    así que una ejecución interrumpida deja el diario consistente hasta el
+    último ID terminado. Al cargarlo, la última línea de cada ID es la que vale.
+    Si se indican settings (los parámetros que definen los archivos de salida, 
+    ej: filtros y formato), se guardan en el diario y un diario existente sólo 
+    se puede continuar con los mismos: si no, lanza ValueError, porque los IDs 
+    ya terminados no corresponderían a lo pedido.
+    """
+
+    def __init__(self, path, settings=None):
+        self.path = path
+        self.entries = {}
+        self.settings = None
+        self.lock = threading.Lock()
+        if os.path.isfile(path):
+            self.load()
+        if settings is not None and self.settings is not None and self.settings != settings:
+            differences = ", ".join(f"{name}: {self.settings.get(name)} -> {settings.get(name)}"
+                                    for name in sorted(set(self.settings) | set(settings))
+                                    if self.settings.get(name) != settings.get(name))
+            raise ValueError(f"❌ El diario {path} corresponde a otros parámetros ({differences})")
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.file = open(path, "a")
+        if settings is not None and self.settings is None:
+            self.settings = settings
+            self.file.write(json.dumps({"kind": SETTINGS_KIND, "settings": settings}) + "\n")
+            self.file.flush()
+
+    def load(self):
+        """
+        Lee el diario existente. Las líneas incompletas (por un corte a mitad de
+        escritura) se ignoran, y si la última quedó cortada se recorta del
+        archivo, para que la próxima línea agregada no se pegue a ella.
+        """
+        complete_size = 0
+        with open(self.path, "rb") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    entry = None
+                if line.endswith(b"\n") or entry is not None:
+                    complete_size += len(line)
+                if entry is not None and entry["kind"] == SETTINGS_KIND:
+                    self.settings = entry["settings"]
+                elif entry is not None:
+                    self.entries[(entry["kind"], entry["id"])] = entry
+        with open(self.path, "rb+") as f:
+            f.truncate(complete_size)
+            if complete_size:
+                f.seek(complete_size - 1)
+                if f.read(1) != b"\n":
+                    f.write(b"\n")
+
+    def get(self, kind, id_):
+        """Devuelve la entrada de un ID, o None si nunca se registró."""
+        return self.entries.get((kind, id_))
+
+    def is_finished(self, kind, id_):
+        """Indica si el ID ya terminó (con resultado o sin datos) y no hace falta volver a procesarlo."""
+        entry = self.get(kind, id_)
+        return entry is not None and entry["state"] in FINISHED_STATES
+
+    def pending_ids(self, kind, ids):
+        """
+        Filtra los IDs que todavía hay que procesar (nunca registrados, pendientes
+        o fallidos), respetando el orden de entrada, y registra como pendientes
+        los que no estaban en el diario.
+        """
+        remaining = [id_ for id_ in ids if not self.is_finished(kind, id_)]
+        with self.lock:
+            self.write_entries([self.build_entry(kind, id_, PENDING) for id_ in remaining if self.get(kind, id_) is None])
+        return remaining
+
+    def record(self, kind, id_, state, error=None):
+        """Registra el resultado de un intento de procesar un ID."""
+        if state not in STATES:
+            raise ValueError(f"Estado de diario desconocido: {state}")
+        with self.lock:
+            entry = self.build_entry(kind, id_, state, error)
+            if state != PENDING:
+                entry["attempts"] += 1
+            self.write_entries([entry])
+
+    def build_entry(self, kind, id_, state, error=None):
+        previous = self.entries.get((kind, id_))
+        return {
+            "kind": kind,
+            "id": id_,
+            "state": state,
+            "attempts": previous["attempts"] if previous else 0,
+            "error": str(error) if error is not None else None,
+            "time": time.time(),
+        }
+
+    def write_entries(self, entries):
+        if not entries:
+            return
+        for entry in entries:
+            self.entries[(entry["kind"], entry["id"])] = entry
+        self.file.write("".join(json.dumps(entry) + "\n" for entry in entries))
+        self.file.flush()
+
+    def summary(self):
+        """Cantidad de IDs en cada estado."""
+        counts = dict.fromkeys(STATES, 0)
+        for entry in self.entries.values():
+            counts[entry["state"]] += 1
+        return counts
+
+    def close(self):
+        self.file.close()
@@ -0,0 +1,135 @@
+import argparse
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, parse_qs
+
+from src import config, http_client, backends, metrics
+from src.api import annotate
+
+
+class AnnotationHandler(BaseHTTPRequestHandler):
+    """
+    Endpoints del servicio:
+    - GET /pdb/<ids>?aff=Ki,Kd&lig=CHEMBL1,CHEMBL2 y GET /uniprot/<ids>?...: IDs separados por coma.
+    - POST /annotate con {"pdb_ids": [...], "uniprot_ids": [...], "affinity_types": [...], "ligands": [...]}.
+    - GET /health y GET /metrics (mediciones de src/metrics.py en formato Prometheus).
+    Las anotaciones se responden en JSON Lines (una línea por ID, ver Annotation.to_dict),
+    cada una apenas está lista. Las conexiones se mantienen abiertas (keep-alive).
+    """
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        parts = urlsplit(self.path)
+        kind, _, ids = parts.path.strip("/").partition("/")
+        query = parse_qs(parts.query)
+        if kind == "health":
+            return self.send(200, "application/json", b'{"status": "ok"}')
+        if kind == "metrics":
+            return self.send(200, "text/plain; version=0.0.4", metrics.format_prometheus().encode())
+        if kind not in ("pdb", "uniprot") or not ids:
+            return self.send(404, "text/plain", b"Use /pdb/<ids>, /uniprot/<ids>, POST /annotate, /health o /metrics")
+        ids = [id_ for id_ in ids.split(",") if id_]
+        affinity_types = query["aff"][0].split(",") if "aff" in query else None
+        ligands = query["lig"][0].split(",") if "lig" in query else None
+        pdb_ids, uniprot_ids = (ids, []) if kind == "pdb" else ([], ids)
+        self.stream_annotations(pdb_ids, uniprot_ids, affinity_types, ligands)
+
+    def do_POST(self):
+        if urlsplit(self.path).path.rstrip("/") != "/annotate":
+            return self.send(404, "text/plain", b"Use POST /annotate")
+        try:
+            length = int(self.headers.get("Content-Length") or 0)
+            body = json.loads(self.rfile.read(length) or b"{}")
+            pdb_ids = list(body.get("pdb_ids") or [])
+            uniprot_ids = list(body.get("uniprot_ids") or [])
+        except (ValueError, AttributeError, TypeError) as e:
+            return self.send(400, "text/plain", f"Cuerpo inválido: {e}".encode())
+        for field in ("pdb_ids", "uniprot_ids", "affinity_types", "ligands"):
+            if not is_string_list(body.get(field)):
+                return self.send(400, "text/plain", f"Cuerpo inválido: {field} debe ser una lista de textos".encode())
+        self.stream_annotations(pdb_ids, uniprot_ids, body.get("affinity_types"), body.get("ligands"))
+
+    def stream_annotations(self, pdb_ids, uniprot_ids, affinity_types, ligands):
+        """Envía cada anotación apenas está lista, con codificación chunked."""
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        for annotation in annotate(pdb_ids, uniprot_ids, affinity_types, ligands, self.server.workers):
+            line = (json.dumps(annotation.to_dict()) + "\n").encode()
+            self.wfile.write(f"{len(line):x}\r\n".encode() + line + b"\r\n")
+        self.wfile.write(b"0\r\n\r\n")
+
+    def send(self, status, content_type, content):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def is_string_list(value):
+    """Indica si un campo del cuerpo de POST /annotate es válido: ausente (None) o una lista de textos."""
+    return value is None or (isinstance(value, list) and all(isinstance(item, str) for item in value))
+
+
+class AnnotationServer(ThreadingHTTPServer):
+    """
+    Servicio HTTP local de anotación: un proceso de larga duración que mantiene
+    abiertos los pools de conexiones a las APIs y las cachés en memoria entre
+    requests, para no pagar en cada lote el arranque del programa.
+    """
+    daemon_threads = True
+
+    def __init__(self, address, workers):
+        super().__init__(address, AnnotationHandler)
+        self.workers = workers
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+
+def start_service(host=None, port=None, workers=None):
+    """
+    Inicia el servicio en un hilo de fondo y lo devuelve (server.url es su dirección;
+    con port 0 se elige un puerto libre). Para detenerlo: server.shutdown().
+    """
+    server = AnnotationServer((host or config.SERVICE_HOST, config.SERVICE_PORT if port is None else port),
+                              workers or config.DEFAULT_WORKERS)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Servicio HTTP local de anotación de IDs de PDB y UniProt")
+    parser.add_argument("--host", default=config.SERVICE_HOST)
+    parser.add_argument("--port", type=int, default=config.SERVICE_PORT)
+    parser.add_argument("--workers", type=int, default=4, help="IDs procesados en simultáneo por request")
+    parser.add_argument("--backend", choices=["rest", "local"], default=config.BACKEND)
+    parser.add_argument("--data-dir", help="Carpeta con la copia local de las bases (para --backend local)")
+    parser.add_argument("--cache-dir", help="Carpeta de la caché de respuestas de las APIs")
+    parser.add_argument("--no-cache", action="store_true", help="No usar la caché de respuestas en disco")
+    args = parser.parse_args()
+    if args.backend == "local" and not args.data_dir:
+        parser.error("--backend local requiere --data-dir")
+
+    workers = max(1, min(args.workers, config.MAX_WORKERS))
+    http_client.configure(workers, cache_dir=args.cache_dir, use_cache=not args.no_cache)
+    backends.configure(args.backend, args.data_dir)
+    config.ENABLE_TARGET_STORE = not args.no_cache
+    server = AnnotationServer((args.host, args.port), workers)
+    print(f"🛰️ Servicio de anotación escuchando en {server.url} (ej: {server.url}/pdb/1MQ8,3E0P?aff=Ki)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+import functools
+import threading
+from concurrent.futures import Future
+
+from src import metrics
+
+_lock = threading.Lock()
+_in_flight = {}  # (grupo, clave) -> Future de la llamada en curso
+
+
+def call(group, key, function, *args, **kwargs):
+    """
+    Ejecuta function(*args, **kwargs) salvo que ya haya una llamada en curso con
+    la misma clave: en ese caso espera a que termine y comparte su resultado (o
+    su excepción). Así, varios workers que piden a la vez la misma entrada
+    generan una sola consulta. Las llamadas que empiezan después de que la
+    anterior terminó vuelven a ejecutar function (no es una caché).
+    """
+    flight_key = (group, key)
+    with _lock:
+        future = _in_flight.get(flight_key)
+        leader = future is None
+        if leader:
+            future = Future()
+            _in_flight[flight_key] = future
+    if not leader:
+        metrics.increment("coalesced_calls", group=group)
+        return future.result()
+    try:
+        result = function(*args, **kwargs)
+    except BaseException as e:
+        future.set_exception(e)
+        raise
+    else:
+        future.set_result(result)
+        return result
+    finally:
+        with _lock:
+            del _in_flight[flight_key]
+
+
+def coalesce(group, key=None):
+    """
+    Decorador que agrupa las llamadas simultáneas a la función con la misma
+    clave (ver call). key recibe los mismos argumentos que la función y
+    devuelve la clave normalizada; por defecto, los argumentos mismos.
+    """
+    def decorator(function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            flight_key = key(*args, **kwargs) if key is not None else (args, tuple(sorted(kwargs.items())))
+            return call(group, flight_key, function, *args, **kwargs)
+        return wrapper
+    return decorator
@@ -0,0 +1,131 @@
+import json
+import os
+import time
+
+from src import config
+from src.atomic_file import atomic_open
+
+
+def get_snapshot_path(chembl_target_id):
+    """Ruta del snapshot sin filtros de las actividades de un target ChEMBL."""
+    return os.path.join(config.TARGET_STORE_DIR, f"{chembl_target_id}.jsonl")
+
+
+def has_fresh_snapshot(chembl_target_id):
+    """
+    Indica si hay un snapshot sin filtros del target guardado hace menos de 
+    config.TARGET_SNAPSHOT_TTL segundos.
+    """
+    if not config.ENABLE_TARGET_STORE:
+        return False
+    path = get_snapshot_path(chembl_target_id)
+    return os.path.isfile(path) and time.time() - os.path.getmtime(path) < config.TARGET_SNAPSHOT_TTL
+
+
+def get_watermark_path(chembl_target_id):
+    """Ruta del archivo con la marca de agua del snapshot de un target (el mayor activity_id guardado)."""
+    return os.path.join(config.TARGET_STORE_DIR, f"{chembl_target_id}.watermark.json")
+
+
+def has_snapshot(chembl_target_id):
+    """Indica si hay un snapshot sin filtros del target, vigente o no."""
+    return config.ENABLE_TARGET_STORE and os.path.isfile(get_snapshot_path(chembl_target_id))
+
+
+def read_watermark(chembl_target_id):
+    """Devuelve el mayor activity_id guardado en el snapshot de un target, o None si no se conoce."""
+    try:
+        with open(get_watermark_path(chembl_target_id), "r") as f:
+            return int(json.load(f)["max_activity_id"])
+    except (OSError, ValueError, KeyError, TypeError):
+        return None
+
+
+def save_watermark(chembl_target_id, max_activity_id):
+    """Guarda la marca de agua del snapshot de un target."""
+    if max_activity_id is None:
+        return
+    with atomic_open(get_watermark_path(chembl_target_id)) as f:
+        json.dump({"max_activity_id": max_activity_id, "updated": time.time()}, f)
+
+
+def get_activity_id(record):
+    """Devuelve el activity_id (entero) de un registro, o None si no lo tiene."""
+    try:
+        return int(record.get("activity_id"))
+    except (TypeError, ValueError):
+        return None
+
+
+def iter_snapshot(chembl_target_id):
+    """Genera las actividades (registros compactos) del snapshot de un target, leyéndolo línea por línea."""
+    with open(get_snapshot_path(chembl_target_id), "r") as f:
+        for line in f:
+            yield json.loads(line)
+
+
+def iter_and_save_snapshot(chembl_target_id, records):
+    """
+    Genera los registros recibidos y, a la vez, los guarda como snapshot sin 
+    filtros del target. El snapshot sólo se publica (de forma atómica) si los 
+    registros se consumen completos; si la descarga falla o se interrumpe, se descarta.
+    Junto con el snapshot se guarda su marca de agua (ver append_to_snapshot).
+    """
+    os.makedirs(config.TARGET_STORE_DIR, exist_ok=True)
+    max_activity_id = None
+    with atomic_open(get_snapshot_path(chembl_target_id)) as f:
+        for record in records:
+            f.write(json.dumps(record) + "\n")
+            max_activity_id = max_id(max_activity_id, get_activity_id(record))
+            yield record
+    save_watermark(chembl_target_id, max_activity_id)
+
+
+def append_to_snapshot(chembl_target_id, records):
+    """
+    Agrega al snapshot de un target las actividades nuevas (las de activity_id 
+    mayor al último guardado) y actualiza su marca de agua. El snapshot se 
+    reescribe de forma atómica, por lo que nunca queda a medio actualizar, y 
+    vuelve a estar vigente. Los registros ya guardados no se duplican aunque la 
+    marca de agua esté desactualizada. Devuelve la cantidad de actividades agregadas.
+    """
+    added = 0
+    max_activity_id = None
+    path = get_snapshot_path(chembl_target_id)
+    with atomic_open(path) as f:
+        with open(path, "r") as saved:
+            for line in saved:
+                f.write(line)
+                max_activity_id = max_id(max_activity_id, get_activity_id(json.loads(line)))
+        saved_max_activity_id = max_activity_id
+        for record in records:
+            activity_id = get_activity_id(record)
+            if activity_id is not None and saved_max_activity_id is not None and activity_id <= saved_max_activity_id:
+                continue
+            f.write(json.dumps(record) + "\n")
+            max_activity_id = max_id(max_activity_id, activity_id)
+            added += 1
+    save_watermark(chembl_target_id, max_activity_id)
+    return added
+
+
+def max_id(current, activity_id):
+    """Devuelve el mayor entre la marca de agua actual y un activity_id (cualquiera de los dos puede ser None)."""
+    if activity_id is None:
+        return current
+    return activity_id if current is None else max(current, activity_id)
+
+
+def filter_activities(records, affinity_types=None, ligands=None):
+    """
+    Aplica localmente los mismos filtros que la API de ChEMBL (standard_type__in 
+    y molecule_chembl_id__in), sin importar el orden en que se indicaron.
+    """
+    affinity_types = set(affinity_types) if affinity_types is not None else None
+    ligands = set(ligands) if ligands is not None else None
+    for record in records:
+        if affinity_types is not None and record.get("standard_type") not in affinity_types:
+            continue
+        if ligands is not None and record.get("molecule_chembl_id") not in ligands:
+            continue
+        yield record
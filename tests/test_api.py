@@ -0,0 +1,82 @@
+import json
+import os
+import tempfile
+import unittest
+from unittest import mock
+from urllib.error import HTTPError
+from urllib.request import Request, urlopen
+
+from benchmarks.mock_api_server import start_server
+from src import config, http_client, rate_limiter, api
+from src.service import start_service
+
+
+class TestsApi(unittest.TestCase):
+
+    def setUp(self):
+        self.server = start_server(targets=3, activities=30)
+        self.output_dir = tempfile.TemporaryDirectory()
+        self.patches = [
+            mock.patch.object(config, "API_MIRROR_URL", self.server.url),
+            mock.patch.object(config, "OUTPUT_DIR", self.output_dir.name),
+            mock.patch.object(config, "ENABLE_TARGET_STORE", False),
+            mock.patch.object(config, "CHEMBL_PAGE_SIZE", 10),
+        ]
+        for patch in self.patches:
+            patch.start()
+        http_client.configure(2, use_cache=False)
+        rate_limiter.reset()
+        api.clear_cache()
+
+    def tearDown(self):
+        for patch in reversed(self.patches):
+            patch.stop()
+        http_client.configure(config.DEFAULT_WORKERS, use_cache=config.ENABLE_RESPONSE_CACHE)
+        api.clear_cache()
+        self.server.shutdown()
+        self.output_dir.cleanup()
+
+    """Testea que annotate_pdb genere un resultado por ID, en orden y sin escribir archivos, y que al repetir
+    la consulta las anotaciones se tomen de la caché en memoria sin consultar las APIs."""
+    def test_annotate_pdb_yields_results_without_writing_files(self):
+        annotations = list(api.annotate_pdb(["1mq8", "2TMN", "XX"], workers=2))
+        self.assertEqual(["1MQ8", "2TMN", "XX"], [annotation.id for annotation in annotations])
+        self.assertEqual(["done", "done", "failed"], [annotation.state for annotation in annotations])
+        self.assertEqual(30, sum(len(ligand["assays"]) for ligand in annotations[0].result["ligands"]))
+        self.assertEqual([], os.listdir(self.output_dir.name))
+
+        requests_before = dict(self.server.requests_by_host)
+        cached = next(api.annotate_pdb(["1MQ8"]))
+        self.assertEqual(annotations[0].result, cached.result)
+        self.assertEqual(requests_before, self.server.requests_by_host)
+
+    """Testea que el servicio responda una línea JSON por ID."""
+    def test_service_streams_one_json_line_per_id(self):
+        service = start_service(port=0, workers=2)
+        try:
+            with urlopen(f"{service.url}/uniprot/P00001,P00002?aff=Ki") as response:
+                lines = [json.loads(line) for line in response.read().decode().splitlines()]
+        finally:
+            service.shutdown()
+        self.assertEqual(["P00001", "P00002"], [line["id"] for line in lines])
+        self.assertTrue(all(line["state"] == "done" for line in lines))
+
+
+    """Testea que POST /annotate rechace con 400 los filtros que no son listas de textos, sin anotar ni cachear nada."""
+    def test_service_rejects_filters_that_are_not_lists(self):
+        service = start_service(port=0, workers=2)
+        try:
+            for body in ({"pdb_ids": ["1MQ8"], "affinity_types": "Ki"}, {"uniprot_ids": ["P00001"], "ligands": [1]},
+                         {"pdb_ids": "1MQ8"}):
+                request = Request(f"{service.url}/annotate", data=json.dumps(body).encode(), method="POST")
+                with self.assertRaises(HTTPError) as error:
+                    urlopen(request)
+                self.assertEqual(400, error.exception.code)
+        finally:
+            service.shutdown()
+        self.assertIsNone(api._cache.get(api.cache_key("PDB", "1MQ8", ["K", "i"], None)))
+        self.assertEqual({}, dict(self.server.requests_by_host))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,55 @@
+import os
+import tempfile
+import threading
+import unittest
+
+from src.atomic_file import atomic_open, temp_path_for
+
+
+class TestsAtomicFile(unittest.TestCase):
+
+    def test_file_is_renamed_only_after_a_complete_write(self):
+        with tempfile.TemporaryDirectory() as output_dir:
+            path = os.path.join(output_dir, "result.json")
+            with atomic_open(path) as f:
+                f.write("{}")
+                self.assertFalse(os.path.exists(path))
+                self.assertEqual(temp_path_for(path), f.name)
+                self.assertTrue(os.path.exists(temp_path_for(path)))
+            with open(path) as f:
+                self.assertEqual("{}", f.read())
+
+    def test_failed_write_leaves_no_files(self):
+        with tempfile.TemporaryDirectory() as output_dir:
+            path = os.path.join(output_dir, "result.json")
+            with self.assertRaises(ValueError):
+                with atomic_open(path) as f:
+                    f.write("{")
+                    raise ValueError("falla simulada")
+            self.assertEqual([], os.listdir(output_dir))
+
+    """Testea que dos escrituras simultáneas del mismo archivo (desde hilos distintos) usen temporales distintos y ambas terminen bien."""
+    def test_concurrent_writers_do_not_share_the_temporary_file(self):
+        with tempfile.TemporaryDirectory() as output_dir:
+            path = os.path.join(output_dir, "result.json")
+            both_open = threading.Barrier(2)
+            temp_paths = []
+
+            def write(text):
+                with atomic_open(path) as f:
+                    f.write(text)
+                    temp_paths.append(f.name)
+                    both_open.wait()
+
+            threads = [threading.Thread(target=write, args=(text,)) for text in ("primero", "segundo")]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            self.assertEqual(2, len(set(temp_paths)))
+            with open(path) as f:
+                self.assertIn(f.read(), ("primero", "segundo"))
+            self.assertEqual(["result.json"], os.listdir(output_dir))
+
+if __name__ == '__main__':
+    unittest.main()
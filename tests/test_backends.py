@@ -0,0 +1,94 @@
+import gzip
+import json
+import os
+import sqlite3
+import tempfile
+import unittest
+from unittest import mock
+
+from src import backends, config
+from src.pdb_handler import get_ligands_from_chembl_target
+
+# Actividades de un target tal como las devuelve la API JSON de ChEMBL
+REST_ACTIVITIES = [
+    {"molecule_chembl_id": "CHEMBL1", "canonical_smiles": "CCO", "standard_value": "1.5", "standard_type": "Ki",
+     "standard_units": "nM", "document_year": 2001, "assay_chembl_id": "CHEMBL10"},
+    {"molecule_chembl_id": "CHEMBL2", "canonical_smiles": "CCN", "standard_value": "20.0", "standard_type": "IC50",
+     "standard_units": "nM", "document_year": None, "assay_chembl_id": "CHEMBL11"},
+    {"molecule_chembl_id": "CHEMBL1", "canonical_smiles": "CCO", "standard_value": "3.0", "standard_type": "Kd",
+     "standard_units": "nM", "document_year": 2005, "assay_chembl_id": "CHEMBL12"},
+]
+PDB_ENTRY = {"rcsb_id": "3E0P", "rcsb_entry_info": {"resolution_combined": [2.1]},
+             "rcsb_accession_info": {"initial_release_date": "2008-10-14T00:00:00Z"},
+             "rcsb_primary_citation": {"pdbx_database_id_doi": "10.1000/xyz"}}
+UNIPROT_ENTRY = {"primaryAccession": "Q16651", "uniProtKBCrossReferences": [{"database": "ChEMBL", "id": "CHEMBL5610"}]}
+
+
+def create_chembl_db(path):
+    """Crea una base con el subconjunto del esquema de ChEMBL que usa el backend local."""
+    connection = sqlite3.connect(path)
+    connection.executescript("""
+        CREATE TABLE target_dictionary (tid INTEGER PRIMARY KEY, chembl_id TEXT);
+        CREATE TABLE assays (assay_id INTEGER PRIMARY KEY, tid INTEGER, chembl_id TEXT, assay_type TEXT);
+        CREATE TABLE molecule_dictionary (molregno INTEGER PRIMARY KEY, chembl_id TEXT);
+        CREATE TABLE compound_structures (molregno INTEGER PRIMARY KEY, canonical_smiles TEXT);
+        CREATE TABLE docs (doc_id INTEGER PRIMARY KEY, year INTEGER);
+        CREATE TABLE activities (activity_id INTEGER PRIMARY KEY, assay_id INTEGER, molregno INTEGER, doc_id INTEGER,
+                                 standard_value NUMERIC, standard_type TEXT, standard_units TEXT);
+        INSERT INTO target_dictionary VALUES (1, 'CHEMBL5610'), (2, 'CHEMBL999');
+        INSERT INTO assays VALUES (10, 1, 'CHEMBL10', 'B'), (11, 1, 'CHEMBL11', 'B'), (12, 1, 'CHEMBL12', 'B'),
+                                  (13, 1, 'CHEMBL13', 'F'), (14, 2, 'CHEMBL14', 'B');
+        INSERT INTO molecule_dictionary VALUES (1, 'CHEMBL1'), (2, 'CHEMBL2');
+        INSERT INTO compound_structures VALUES (1, 'CCO'), (2, 'CCN');
+        INSERT INTO docs VALUES (1, 2001), (2, 2005), (3, NULL);
+        INSERT INTO activities VALUES (100, 10, 1, 1, 1.5, 'Ki', 'nM'), (101, 11, 2, 3, 20, 'IC50', 'nM'),
+                                      (102, 12, 1, 2, 3, 'Kd', 'nM'), (103, 13, 2, 1, 7, 'Ki', 'nM'),
+                                      (104, 14, 1, 1, 9, 'Ki', 'nM');
+    """)
+    connection.commit()
+    connection.close()
+
+
+class TestsBackends(unittest.TestCase):
+
+    def setUp(self):
+        self.data_dir = tempfile.TemporaryDirectory()
+        create_chembl_db(os.path.join(self.data_dir.name, "chembl_34.db"))
+        with gzip.open(os.path.join(self.data_dir.name, config.LOCAL_SIFTS_FILE), "wt") as f:
+            f.write("# 2024/01/01 - 12:00 | PDB: 01.24 | UniProt: 2024.01\n")
+            f.write("PDB\tCHAIN\tSP_PRIMARY\tRES_BEG\n3e0p\tA\tQ16651\t1\n3e0p\tB\tP00001\t1\n1mq8\tA\tP12345\t1\n")
+        with open(os.path.join(self.data_dir.name, config.LOCAL_PDB_FILE), "w") as f:
+            f.write(json.dumps(PDB_ENTRY) + "\n")
+        with open(os.path.join(self.data_dir.name, config.LOCAL_UNIPROT_FILE), "w") as f:
+            f.write(json.dumps(UNIPROT_ENTRY) + "\n")
+        self.backend = backends.LocalBackend(self.data_dir.name)
+
+    def tearDown(self):
+        self.data_dir.cleanup()
+        backends.configure("rest")
+
+    def test_local_pdb_metadata_and_id_mapping(self):
+        self.assertEqual("2008", self.backend.fetch_pdb_info("3e0p")["publication_year"])
+        self.assertEqual({"3e0p": "Q16651", "1MQ8": "P12345"}, self.backend.get_uniprot_ids_from_pdb_ids(["3e0p", "1MQ8", "2TMN"]))
+        self.assertEqual(UNIPROT_ENTRY, self.backend.get_data_from_uniprot_id("Q16651"))
+        self.assertEqual({}, self.backend.get_data_from_uniprot_id("P99999"))
+        with self.assertRaises(LookupError):
+            self.backend.fetch_pdb_info("2TMN")
+
+    """Testea que los ligandos de un target sean los mismos con el backend REST y con el local, con y sin filtros."""
+    def test_local_and_rest_backends_return_the_same_ligands(self):
+        with mock.patch.object(config, "ENABLE_TARGET_STORE", False):
+            for affinity_types in (None, ["Ki", "Kd"]):
+                # La API aplica los filtros: la página sólo tiene las actividades pedidas
+                activities = [activity for activity in REST_ACTIVITIES
+                              if affinity_types is None or activity["standard_type"] in affinity_types]
+                page = json.dumps({"activities": activities, "page_meta": {"total_count": len(activities), "limit": 1000}})
+                backends.configure("rest")
+                with mock.patch("src.pdb_handler.fetch_chembl_page", return_value=page.encode()):
+                    rest_ligands = get_ligands_from_chembl_target("CHEMBL5610", affinity_types=affinity_types, transport="json")
+                backends.configure("local", self.data_dir.name)
+                local_ligands = get_ligands_from_chembl_target("CHEMBL5610", affinity_types=affinity_types)
+                self.assertEqual(rest_ligands, local_ligands)
+
+if __name__ == '__main__':
+    unittest.main()
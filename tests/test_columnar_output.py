@@ -0,0 +1,54 @@
+import importlib.util
+import os
+import tempfile
+import unittest
+
+from src.columnar_output import ligands_to_columns, split_affinity_key, write_columnar, read_targets
+
+LIGANDS = [
+    {"chembl_id": "CHEMBL1", "canonical_smiles": "CCO", "assays": [
+        {"assay id": "CHEMBL10", "publication_year": "2001", "IC50 (nM)": 12.5},
+        {"assay id": "CHEMBL11", "publication_year": None, "Kd": ">10"}]},
+    {"chembl_id": "CHEMBL2", "canonical_smiles": None, "assays": [
+        {"assay id": "CHEMBL12", "publication_year": "2015", "Ki (uM)": 0.3}]},
+]
+
+
+class TestsColumnarOutput(unittest.TestCase):
+
+    def test_split_affinity_key_in_type_and_unit(self):
+        self.assertEqual(("IC50", "nM"), split_affinity_key("IC50 (nM)"))
+        self.assertEqual(("Kd", None), split_affinity_key("Kd"))
+
+    def test_ligands_to_columns_has_one_row_per_assay(self):
+        columns = ligands_to_columns("1MQ8", LIGANDS)
+        self.assertEqual(["1MQ8"] * 3, columns["target"])
+        self.assertEqual(["CHEMBL1", "CHEMBL1", "CHEMBL2"], columns["ligand_id"])
+        self.assertEqual(["IC50", "Kd", "Ki"], columns["type"])
+        self.assertEqual([12.5, None, 0.3], columns["value"])
+        self.assertEqual(["nM", None, "uM"], columns["unit"])
+        self.assertEqual([2001, None, 2015], columns["year"])
+
+    @unittest.skipUnless(importlib.util.find_spec("numpy"), "requiere numpy")
+    def test_write_and_read_many_npz_targets(self):
+        with tempfile.TemporaryDirectory() as output_dir:
+            for target in ("1MQ8", "3E0P"):
+                write_columnar(os.path.join(output_dir, f"pdb_{target}.npz"), ligands_to_columns(target, LIGANDS), "npz")
+            table = read_targets(output_dir)
+        self.assertEqual(6, len(table["target"]))
+        self.assertEqual(["1MQ8", "3E0P"], sorted(set(table["target"])))
+
+    @unittest.skipUnless(importlib.util.find_spec("pyarrow"), "requiere pyarrow")
+    def test_write_and_read_many_parquet_targets(self):
+        with tempfile.TemporaryDirectory() as output_dir:
+            paths = []
+            for target in ("1MQ8", "3E0P"):
+                paths.append(os.path.join(output_dir, f"pdb_{target}.parquet"))
+                write_columnar(paths[-1], ligands_to_columns(target, LIGANDS), "parquet")
+            table = read_targets(paths)
+        self.assertEqual(6, table.num_rows)
+        self.assertEqual([12.5, None, 0.3], table.column("value").to_pylist()[:3])
+
+
+if __name__ == '__main__':
+    unittest.main()
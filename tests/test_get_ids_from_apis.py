@@ -1,6 +1,7 @@
 import src.get_ids_from_apis
 import src.main
 import unittest
+from unittest import mock
 
 
 class TestsGetIdsFromApis(unittest.TestCase):
@@ -10,6 +11,12 @@ class TestsGetIdsFromApis(unittest.TestCase):
         uniprot_id = src.get_ids_from_apis.get_uniprot_id_from_pdb_id(pdb_id)
         self.assertEqual("E7D102", uniprot_id)
 
+    def test_get_uniprot_ids_from_multiple_pdb_ids_in_batch(self):
+        pdb_ids = ["6IK4", "3e0p"]
+        uniprot_ids = src.get_ids_from_apis.get_uniprot_ids_from_pdb_ids(pdb_ids)
+        self.assertEqual("E7D102", uniprot_ids["6IK4"])
+        self.assertEqual("Q16651", uniprot_ids["3e0p"])
+
     def test_get_id_data_from_uniprot_id(self):
         uniprot_id = "P61812"
         ids_data = src.get_ids_from_apis.get_data_from_uniprot_id(uniprot_id)
@@ -17,6 +24,15 @@ class TestsGetIdsFromApis(unittest.TestCase):
         self.assertTrue('references' in ids_data.keys())
         self.assertTrue('uniProtKBCrossReferences' in ids_data.keys())
 
+    """Testea que la espera de varios jobs de mapeo distinga los jobs terminados, 
+    fallidos y los que no terminan dentro del plazo, sin interrumpir la ejecución."""
+    def test_wait_for_multiple_idmapping_jobs_with_deadline(self):
+        statuses = {"job-1": "FINISHED", "job-2": "ERROR", "job-3": "RUNNING"}
+        with mock.patch("src.get_ids_from_apis.get_uniprot_idmapping_job_status", side_effect=statuses.get), \
+                mock.patch("src.get_ids_from_apis.time.sleep"):
+            result = src.get_ids_from_apis.wait_for_uniprot_idmapping_jobs(list(statuses), timeout=0)
+        self.assertEqual({"job-1": "FINISHED", "job-2": "ERROR", "job-3": "TIMEOUT"}, result)
+
 
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
@@ -1,5 +1,6 @@
 import src.create_parser
-from src.get_ids_from_input import cargar_ids_desde_archivo, validar_pdb_ids, validar_uniprot_ids
+from src.get_ids_from_input import cargar_ids_desde_archivo, validar_pdb_ids, validar_uniprot_ids, chunked, \
+    iter_ids_desde_archivo
 import src.main
 import unittest
 
@@ -40,6 +41,22 @@ class TestsGetIdsFromInput(unittest.TestCase):
         self.assertEqual(1, len(validated_pdb_ids))
         self.assertIn('7GCH', validated_pdb_ids)
 
+    def test_validate_pdb_ids_removes_duplicates_preserving_order(self):
+        pdb_ids = ['7gch', '3AT1', '7GCH', '2tmn', '3at1']
+        self.assertEqual(['7GCH', '3AT1', '2TMN'], validar_pdb_ids(pdb_ids))
+
+    def test_load_ids_from_unexisting_file_fails_before_reading(self):
+        with self.assertRaises(FileNotFoundError):
+            iter_ids_desde_archivo("test_pdb.txt", "PDB ids")
+
+    def test_chunked_splits_ids_lazily(self):
+        def ids():
+            for number in range(5):
+                yield f"ID{number}"
+        chunks = chunked(ids(), 2)
+        self.assertEqual(['ID0', 'ID1'], next(chunks))
+        self.assertEqual([['ID2', 'ID3'], ['ID4']], list(chunks))
+
     def test_validate_correct_uniprot_ids_and_ignores_incorrect_ones(self):
         uniprot_ids = ['P155', 'Q9Y2*6', 'A0A010RRV2DD', 'P15529']
         validated_uniprot_ids = validar_uniprot_ids(uniprot_ids)
@@ -0,0 +1,37 @@
+import unittest
+from unittest import mock
+
+import requests
+
+from src import config, http_client
+from src.get_ids_from_apis import post_request_in_uniprot_idmapping
+
+
+class TestsHttpClient(unittest.TestCase):
+
+    def test_session_is_shared_between_requests(self):
+        http_client.configure(4)
+        self.assertIs(http_client.get_session(), http_client.get_session())
+
+    def test_configure_resizes_connection_pools(self):
+        http_client.configure(8)
+        adapter = http_client.get_session().get_adapter("https://rest.uniprot.org")
+        self.assertEqual(8, adapter._pool_maxsize)
+        self.assertEqual(config.HTTP_MAX_RETRIES, adapter.max_retries.total)
+        self.assertIn(503, adapter.max_retries.status_forcelist)
+        self.assertNotIn("POST", adapter.max_retries.allowed_methods)
+
+
+    """Testea que el envío de un job de UniProt IdMapping no se reenvíe ante un error 5xx ni un timeout, para no duplicar el job."""
+    def test_idmapping_submit_is_not_resent(self):
+        params = {"from": "PDB", "to": "UniProtKB", "ids": "3E0P"}
+        response = requests.Response()
+        response.status_code = 503
+        for side_effect in ([response], requests.Timeout("timeout")):
+            with mock.patch("src.get_ids_from_apis.http_client.post", side_effect=side_effect) as post:
+                with self.assertRaises(ValueError):
+                    post_request_in_uniprot_idmapping(params)
+            self.assertEqual(1, post.call_count)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,8 +1,10 @@
 import unittest
+from unittest import mock
 
 import src.create_parser
 import src.main
-from src.main import validate_input
+import src.config
+from src.main import validate_input, process_ids, validate_workers
 
 
 class TestsMain(unittest.TestCase):
@@ -39,6 +41,36 @@ class TestsMain(unittest.TestCase):
         with self.assertRaises(Exception):
             validate_input(parser)
 
+    """Testea que si falta la dependencia del formato de salida el programa termine antes de descargar nada."""
+    def test_validate_input_fails_without_the_output_format_dependency(self):
+        parser = src.create_parser.create_parser()
+        with mock.patch("sys.argv", ["main", "--pdb", "1MQ7", "--format", "parquet"]), \
+                mock.patch("src.columnar_output.import_optional", side_effect=ImportError("pip install pyarrow")), \
+                mock.patch.object(parser, "error", side_effect=SystemExit(2)) as error:
+            with self.assertRaises(SystemExit):
+                validate_input(parser)
+        error.assert_called_once_with("pip install pyarrow")
+
+    def test_process_ids_isolates_errors_of_each_id(self):
+        processed_ids = []
+        def process_function(id_, affinity_types, ligands_ids):
+            if id_ == '2TMN':
+                raise ValueError('falla simulada')
+            processed_ids.append(id_)
+        processed = process_ids(['1MQ8', '2TMN', '3AT1'], process_function, "PDB", None, None, 2, 0)
+        self.assertEqual(3, processed)
+        self.assertEqual(['1MQ8', '3AT1'], sorted(processed_ids))
+
+    def test_validate_workers_is_bounded(self):
+        self.assertEqual(1, validate_workers(0))
+        self.assertEqual(4, validate_workers(4))
+        self.assertEqual(src.config.MAX_WORKERS, validate_workers(src.config.MAX_WORKERS + 1))
+
+    def test_parse_workers_argument(self):
+        parser = src.create_parser.create_parser()
+        args = parser.parse_args(['--pdb', '1MQ7', '--workers', '8'])
+        self.assertEqual(8, args.workers)
+
 
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
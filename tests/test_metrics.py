@@ -0,0 +1,46 @@
+import os
+import tempfile
+import time
+import unittest
+
+from src import metrics
+
+
+class TestsMetrics(unittest.TestCase):
+
+    def setUp(self):
+        metrics.reset()
+
+    """Testea que TimedIterator mida sólo el tiempo de producir los elementos y conserve el valor de retorno del generador."""
+    def test_timed_iterator_excludes_consumer_time_and_keeps_return_value(self):
+        def page():
+            yield 1
+            yield 2
+            return {"total_count": 2}
+
+        def consume():
+            page_meta = yield from metrics.TimedIterator(page(), "parse")
+            self.assertEqual({"total_count": 2}, page_meta)
+
+        for _ in consume():
+            time.sleep(0.05)
+        stage = metrics.summary()["stages"]["parse"]
+        self.assertEqual(1, stage["calls"])
+        self.assertLess(stage["seconds"], 0.05)
+
+    def test_prometheus_text_includes_stages_and_counters(self):
+        with metrics.timer("rcsb_pdb"):
+            pass
+        metrics.increment("http_bytes", 100, host="data.rcsb.org")
+        metrics.increment("http_bytes", 50, host="data.rcsb.org")
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "metrics.prom")
+            metrics.write_prometheus(path)
+            with open(path) as f:
+                text = f.read()
+        self.assertIn('pdbindpred_stage_calls_total{stage="rcsb_pdb"} 1', text)
+        self.assertIn('pdbindpred_http_bytes_total{host="data.rcsb.org"} 150', text)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,108 @@
+import json
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from benchmarks.mock_api_server import start_server
+from src import config, http_client, rate_limiter, metrics
+from src.main import process_chunk
+from src.pdb_handler import reset_refreshed_targets
+from src.run_journal import RunJournal
+
+
+class TestsMockApiServer(unittest.TestCase):
+
+    def setUp(self):
+        self.server = start_server(targets=3, activities=30)
+        self.output_dir = tempfile.TemporaryDirectory()
+        self.patches = [
+            mock.patch.object(config, "API_MIRROR_URL", self.server.url),
+            mock.patch.object(config, "OUTPUT_DIR", self.output_dir.name),
+            mock.patch.object(config, "ENABLE_TARGET_STORE", False),
+            mock.patch.object(config, "CHEMBL_PAGE_SIZE", 10),
+        ]
+        for patch in self.patches:
+            patch.start()
+        http_client.configure(2, use_cache=False)
+        rate_limiter.reset()
+
+    def tearDown(self):
+        for patch in reversed(self.patches):
+            patch.stop()
+        http_client.configure(config.DEFAULT_WORKERS, use_cache=config.ENABLE_RESPONSE_CACHE)
+        self.server.shutdown()
+        self.output_dir.cleanup()
+
+    """Testea el programa completo (planificación, mapeos, UniProt y páginas de ChEMBL) contra el servidor de prueba."""
+    def test_process_pdb_and_uniprot_ids_end_to_end(self):
+        journal = RunJournal(os.path.join(self.output_dir.name, "journal.jsonl"))
+        processed = process_chunk(["1MQ8", "2TMN"], [], None, None, 2, journal)
+        processed += process_chunk([], ["P00001"], ["Ki"], None, 2, journal)
+        journal.close()
+
+        self.assertEqual(3, processed)
+        self.assertEqual({"pending": 0, "done": 3, "failed": 0, "empty": 0}, journal.summary())
+        with open(os.path.join(self.output_dir.name, "pdb_1MQ8.json")) as f:
+            result = json.load(f)
+        self.assertTrue(result["chembl_id"].startswith("CHEMBL"))
+        self.assertEqual(30, sum(len(ligand["assays"]) for ligand in result["ligands"]))
+        self.assertGreater(self.server.requests_by_host["www.ebi.ac.uk"], 1)
+
+    """Testea que las respuestas 429 se reintenten respetando el limitador de cada host, sin que fallen IDs."""
+    def test_throttled_responses_are_retried(self):
+        self.server.rate_429 = 0.3
+        self.server.retry_after = 0
+        journal = RunJournal(os.path.join(self.output_dir.name, "journal.jsonl"))
+        with mock.patch.object(config, "RATE_LIMIT_MAX_RETRIES", 20):
+            process_chunk(["1MQ8", "2TMN", "3AT1"], [], None, None, 3, journal)
+        journal.close()
+        self.assertEqual({"pending": 0, "done": 3, "failed": 0, "empty": 0}, journal.summary())
+
+    """Testea que --refresh descargue sólo las actividades nuevas de cada target, las agregue al resultado ya 
+    guardado y revalide las entradas UniProt con requests condicionales."""
+    def test_refresh_downloads_only_new_activities(self):
+        cache_dir = os.path.join(self.output_dir.name, "cache")
+        http_client.configure(2, cache_dir=cache_dir, use_cache=True)
+        with mock.patch.multiple(config, ENABLE_TARGET_STORE=True, TARGET_STORE_DIR=os.path.join(cache_dir, "targets")):
+            for run, refresh in enumerate((False, True)):
+                if refresh:
+                    self.server.synthetic.activities = 35
+                    metrics.reset()
+                    reset_refreshed_targets()
+                journal = RunJournal(os.path.join(self.output_dir.name, f"journal_{run}.jsonl"))
+                with mock.patch.object(config, "REFRESH", refresh):
+                    process_chunk([], ["P00001"], None, None, 2, journal)
+                journal.close()
+
+        with open(os.path.join(self.output_dir.name, "uniprot_P00001.json")) as f:
+            result = json.load(f)
+        self.assertEqual(35, sum(len(ligand["assays"]) for ligand in result["ligands"]))
+        counters = metrics.summary()["counters"]
+        self.assertEqual(5, counters["target_delta_activities"][0]["value"])
+        self.assertEqual(1, counters["cache_revalidations"][0]["value"])
+
+
+    """Testea que una ejecución con --refresh vea las actividades agregadas después de otra ejecución con --refresh
+    del mismo día, aunque la consulta de actividades nuevas repita la URL (misma marca de agua)."""
+    def test_refresh_does_not_reuse_cached_delta_pages(self):
+        cache_dir = os.path.join(self.output_dir.name, "cache")
+        http_client.configure(2, cache_dir=cache_dir, use_cache=True)
+        with mock.patch.multiple(config, ENABLE_TARGET_STORE=True, TARGET_STORE_DIR=os.path.join(cache_dir, "targets")):
+            for run, (activities, refresh) in enumerate(((30, False), (30, True), (40, True))):
+                self.server.synthetic.activities = activities
+                metrics.reset()
+                reset_refreshed_targets()
+                journal = RunJournal(os.path.join(self.output_dir.name, f"journal_{run}.jsonl"))
+                with mock.patch.object(config, "REFRESH", refresh):
+                    process_chunk([], ["P00001"], None, None, 2, journal)
+                journal.close()
+
+        with open(os.path.join(self.output_dir.name, "uniprot_P00001.json")) as f:
+            result = json.load(f)
+        self.assertEqual(40, sum(len(ligand["assays"]) for ligand in result["ligands"]))
+        self.assertEqual(10, metrics.summary()["counters"]["target_delta_activities"][0]["value"])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,9 +1,17 @@
 import json
 import os
+import random
+import tempfile
+import time
 import unittest
 from pathlib import Path
-from src.pdb_handler import fetch_pdb_info, get_binding_activities_for_target_from_chembl, \
-    get_ligands_from_chembl_target, process_pdb
+from unittest import mock
+import xml.etree.ElementTree as ET
+from src.pdb_handler import fetch_pdb_info, fetch_pdb_info_batch, get_binding_activities_for_target_from_chembl, \
+    get_ligands_from_chembl_target, process_pdb, get_field_from_activity, iter_activities_from_xml_page, \
+    iter_ligand_assays, group_ligand_assays, iter_chembl_pages_concurrently, stream_result_to_jsonl, \
+    iter_binding_activities_for_target_from_chembl, activity_to_record, shutdown_parse_pool
+from src import config
 
 
 class TestsPdbHandler(unittest.TestCase):
@@ -16,6 +24,15 @@ class TestsPdbHandler(unittest.TestCase):
         self.assertEqual('10.1016/S0092-8674(02)01257-6', pdb_id_data['doi'])
         self.assertEqual([], pdb_id_data['ligands'])
 
+    """Testea que la consulta en lote a RCSB PDB devuelva los mismos datos que 
+    la consulta individual, omitiendo las PDB ids inexistentes."""
+    def test_fetch_pdb_info_batch_matches_individual_fetch(self):
+        pdb_ids = ['1MQ8', '3e0p', 'F6HI']
+        pdb_infos = fetch_pdb_info_batch(pdb_ids)
+        self.assertEqual(fetch_pdb_info('1MQ8'), pdb_infos['1MQ8'])
+        self.assertEqual(fetch_pdb_info('3e0p'), pdb_infos['3e0p'])
+        self.assertNotIn('F6HI', pdb_infos)
+
     "Testea que la aplicación lanza una excepción si se ingresa una PDB id inexistente."
     def test_fetch_pdb_info_with_unexisting_pdb_id(self):
         pdb_id = 'F6HI'
@@ -69,6 +86,123 @@ class TestsPdbHandler(unittest.TestCase):
         ligands = get_ligands_from_chembl_target(chembl_id, None, None)
         self.assertEqual(3, len(ligands))
 
+    """Testea que los transportes XML y JSON de ChEMBL generen exactamente los mismos ligandos."""
+    def test_get_ligands_from_chembl_target_is_identical_with_json_transport(self):
+        chembl_id = 'CHEMBL2365'
+        ligands_xml = get_ligands_from_chembl_target(chembl_id, None, None, transport="xml")
+        ligands_json = get_ligands_from_chembl_target(chembl_id, None, None, transport="json")
+        self.assertEqual(ligands_xml, ligands_json)
+
+    """Testea que los campos de una actividad se lean igual en formato XML y JSON."""
+    def test_get_field_from_xml_and_json_activity(self):
+        xml_activity = ET.fromstring("<activity><document_year>2003</document_year><standard_units/></activity>")
+        json_activity = {"document_year": 2003, "standard_units": None}
+        self.assertEqual("2003", get_field_from_activity(xml_activity, "document_year"))
+        self.assertEqual("2003", get_field_from_activity(json_activity, "document_year"))
+        self.assertIsNone(get_field_from_activity(xml_activity, "standard_units"))
+        self.assertIsNone(get_field_from_activity(json_activity, "standard_units"))
+        self.assertIsNone(get_field_from_activity(json_activity, "canonical_smiles"))
+
+    """Testea que una página XML de ChEMBL se procese de forma incremental, liberando cada 
+    actividad una vez consumida, y que se devuelvan los datos de paginación de la página."""
+    def test_iter_activities_from_xml_page_releases_consumed_activities(self):
+        page = (b"<response><activities>"
+                b"<activity><molecule_chembl_id>CHEMBL1</molecule_chembl_id><standard_value>1.5</standard_value>"
+                b"<standard_type>Ki</standard_type><standard_units>nM</standard_units>"
+                b"<assay_chembl_id>CHEMBL10</assay_chembl_id><document_year>2001</document_year></activity>"
+                b"<activity><molecule_chembl_id>CHEMBL1</molecule_chembl_id><standard_value>2</standard_value>"
+                b"<standard_type>Kd</standard_type><assay_chembl_id>CHEMBL11</assay_chembl_id></activity>"
+                b"</activities><page_meta><limit>2</limit><next>/chembl/api/data/activity?offset=2</next>"
+                b"<total_count>3</total_count></page_meta></response>")
+        consumed = []
+        def activities():
+            page_meta = yield from iter_activities_from_xml_page(page)
+            self.assertEqual("/chembl/api/data/activity?offset=2", page_meta["next"])
+            self.assertEqual("3", page_meta["total_count"])
+        for activity in activities():
+            self.assertEqual("CHEMBL1", get_field_from_activity(activity, "molecule_chembl_id"))
+            consumed.append(activity)
+        self.assertEqual(2, len(consumed))
+        self.assertTrue(all(len(activity) == 0 for activity in consumed))
+
+    """Testea que las páginas de ChEMBL descargadas en paralelo se generen en orden de offset."""
+    def test_iter_chembl_pages_concurrently_keeps_offset_order(self):
+        def fetch_page(url, headers, chembl_target_id):
+            time.sleep(random.uniform(0, 0.01))
+            return url
+        page_urls = [f"/chembl/api/data/activity?offset={offset}" for offset in range(0, 20000, 1000)]
+        with mock.patch("src.pdb_handler.fetch_chembl_page", side_effect=fetch_page):
+            pages = list(iter_chembl_pages_concurrently(page_urls, {}, "CHEMBL1"))
+        self.assertEqual(page_urls, pages)
+
+    """Testea que las páginas parseadas en el pool de procesos generen los mismos registros, en el mismo orden, 
+    que el parseo en el mismo hilo."""
+    def test_pages_parsed_in_process_pool_match_inline_parsing(self):
+        def fetch_page(url, headers, chembl_target_id):
+            offset = int(url.split("offset=")[1]) if "offset=" in url else 0
+            activities = "".join(f"<activity><molecule_chembl_id>CHEMBL{index}</molecule_chembl_id>"
+                                 f"<standard_type>Ki</standard_type><standard_value>{index}</standard_value>"
+                                 f"<assay_chembl_id>CHEMBL9</assay_chembl_id></activity>" for index in range(offset, offset + 2))
+            return (f"<response><activities>{activities}</activities><page_meta><limit>2</limit>"
+                    f"<total_count>7</total_count></page_meta></response>").encode()
+        results = []
+        for processes in (0, 2):
+            with mock.patch.object(config, "CHEMBL_PARSE_PROCESSES", processes), \
+                    mock.patch("src.pdb_handler.fetch_chembl_page", side_effect=fetch_page):
+                activities = iter_binding_activities_for_target_from_chembl("CHEMBL1", transport="xml")
+                results.append([activity_to_record(activity) for activity in activities])
+            shutdown_parse_pool()
+        self.assertEqual(8, len(results[0]))
+        self.assertEqual(results[0], results[1])
+        self.assertEqual("CHEMBL7", results[1][-1]["molecule_chembl_id"])
+
+    """Testea que una PDB id que RCSB PDB no encuentra (404) quede como "empty", para no reintentarla al reanudar, 
+    y que un error del servidor se siga propagando como falla."""
+    def test_process_pdb_with_unexisting_pdb_id_is_empty(self):
+        with tempfile.TemporaryDirectory() as output_dir, mock.patch.object(config, "OUTPUT_DIR", output_dir):
+            with mock.patch("src.pdb_handler.http_client.get", return_value=mock.Mock(status_code=404)):
+                self.assertEqual("empty", process_pdb('0XXX', None, None))
+            with mock.patch("src.pdb_handler.http_client.get", return_value=mock.Mock(status_code=503)):
+                with self.assertRaises(ValueError):
+                    process_pdb('0XXX', None, None)
+            self.assertEqual([], os.listdir(output_dir))
+
+    """Testea que el formato JSON Lines escriba una línea con los datos del target y 
+    una línea por ensayo, renombrando el archivo temporal al terminar."""
+    def test_stream_result_to_jsonl_writes_one_line_per_assay(self):
+        activities = [
+            {"molecule_chembl_id": "CHEMBL1", "standard_value": "1.5", "standard_type": "Ki", "standard_units": "nM",
+             "assay_chembl_id": "CHEMBL10", "document_year": 2001, "canonical_smiles": "CCO"},
+            {"molecule_chembl_id": "CHEMBL1", "standard_value": "2", "standard_type": "Kd",
+             "assay_chembl_id": "CHEMBL11", "canonical_smiles": "CCO"},
+        ]
+        result = {"pdb_ids": [], "uniprot_id": "Q16651", "chembl_id": "CHEMBL5610", "ligands": []}
+        with tempfile.TemporaryDirectory() as output_dir:
+            output_path = os.path.join(output_dir, "pdb_3e0p.jsonl")
+            with mock.patch("src.pdb_handler.iter_target_activities", return_value=iter(activities)):
+                stream_result_to_jsonl(output_path, result, None, None)
+            self.assertEqual(["pdb_3e0p.jsonl"], os.listdir(output_dir))
+            with open(output_path) as file:
+                lines = [json.loads(line) for line in file]
+        self.assertEqual({"pdb_ids": [], "uniprot_id": "Q16651", "chembl_id": "CHEMBL5610"}, lines[0])
+        self.assertEqual(3, len(lines))
+        self.assertEqual({"assay id": "CHEMBL11", "publication_year": None, "Kd": 2.0}, lines[2]["assay"])
+
+    """Testea que los datos de ensayo de un mismo ligando se agrupen juntos, ignorando 
+    las actividades incompletas."""
+    def test_group_ligand_assays_from_activities(self):
+        activities = [
+            {"molecule_chembl_id": "CHEMBL1", "standard_value": "1.5", "standard_type": "Ki", "standard_units": "nM",
+             "assay_chembl_id": "CHEMBL10", "document_year": 2001, "canonical_smiles": "CCO"},
+            {"molecule_chembl_id": "CHEMBL2", "standard_value": None, "standard_type": "Ki", "assay_chembl_id": "CHEMBL10"},
+            {"molecule_chembl_id": "CHEMBL1", "standard_value": "2", "standard_type": "Kd", "standard_units": None,
+             "assay_chembl_id": "CHEMBL11", "document_year": None, "canonical_smiles": "CCO"},
+        ]
+        ligands = group_ligand_assays(iter_ligand_assays(activities))
+        self.assertEqual([{"chembl_id": "CHEMBL1", "canonical_smiles": "CCO", "assays": [
+            {"assay id": "CHEMBL10", "publication_year": "2001", "Ki (nM)": 1.5},
+            {"assay id": "CHEMBL11", "publication_year": None, "Kd": 2.0}]}], ligands)
+
     """Dada una ChEMBL ID y los ChEMBL IDs de dos ligandos testea que se obtengan 
     las afinidades correspondientes a la misma"""
     def test_get_specific_ligands_for_chembl_target(self):
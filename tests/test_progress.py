@@ -0,0 +1,38 @@
+import time
+import unittest
+
+from src import metrics, progress
+
+
+class TestsProgress(unittest.TestCase):
+
+    def setUp(self):
+        metrics.reset()
+
+    def tearDown(self):
+        progress.stop()
+
+    """Testea que la línea de estado informe IDs terminados/total, páginas de ChEMBL y el tiempo restante estimado."""
+    def test_format_progress_reports_ids_pages_and_eta(self):
+        progress.start(interval=60)
+        progress.add_total(4)
+        metrics.increment("ids", kind="PDB", state="done")
+        metrics.increment("chembl_pages", 3)
+        metrics.increment("chembl_activities", 3000)
+        line = progress.format_progress()
+        self.assertIn("1/4 ID(s)", line)
+        self.assertIn("3 página(s)", line)
+        self.assertEqual("30s", progress.format_eta(1, 4, 10))
+        self.assertEqual("1h 00m", progress.format_eta(1, 2, 3600))
+        self.assertEqual("--", progress.format_eta(0, 4, 10))
+
+    """Testea que detener el reporte no espere a que venza el intervalo entre reportes."""
+    def test_stop_does_not_wait_for_the_interval(self):
+        progress.start(interval=60)
+        start = time.perf_counter()
+        progress.stop()
+        self.assertLess(time.perf_counter() - start, 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
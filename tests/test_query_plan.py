@@ -0,0 +1,63 @@
+import threading
+import time
+import unittest
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
+
+from src.pdb_handler import get_ligands_for_result
+from src.query_plan import build_query_plan, QueryPlan
+
+UNIPROT_ENTRY = {"uniProtKBCrossReferences": [{"database": "ChEMBL", "id": "CHEMBL5610"}]}
+
+
+class TestsQueryPlan(unittest.TestCase):
+
+    """Testea que si varias PDB ids y una UniProt id corresponden al mismo target, 
+    la entrada UniProt y las actividades de ChEMBL se descarguen una sola vez, y que 
+    los ligandos del target se liberen del plan al tomarlos el último ID que los usa."""
+    def test_distinct_targets_are_fetched_only_once(self):
+        pdb_ids = ["3E0P", "3E0Q", "3E0R"]
+        uniprot_map = {pdb_id: "Q16651" for pdb_id in pdb_ids}
+        with mock.patch("src.query_plan.has_local_result", return_value=False), \
+                mock.patch("src.pdb_handler.fetch_pdb_info_batch", return_value={}), \
+                mock.patch("src.get_ids_from_apis.get_uniprot_ids_from_pdb_ids", return_value=uniprot_map), \
+                mock.patch("src.get_ids_from_apis.get_data_from_uniprot_id", return_value=UNIPROT_ENTRY) as get_data, \
+                mock.patch("src.pdb_handler.get_ligands_from_chembl_target", return_value=[]) as get_ligands:
+            plan = build_query_plan(pdb_ids, ["Q16651"], None, None, 2)
+            get_ligands.assert_not_called()
+            self.assertEqual({"CHEMBL5610": 4}, plan.target_refs)
+            for _ in range(3):
+                self.assertEqual([], get_ligands_for_result({"chembl_id": "CHEMBL5610"}, None, None, plan))
+            self.assertEqual(["CHEMBL5610"], list(plan.ligand_futures))
+            get_ligands_for_result({"chembl_id": "CHEMBL5610"}, None, None, plan)
+        get_data.assert_called_once_with("Q16651")
+        get_ligands.assert_called_once()
+        self.assertEqual({}, plan.ligand_futures)
+        self.assertEqual({}, plan.target_refs)
+        self.assertEqual({"UniProt": 3, "ChEMBL": 3}, plan.saved_calls)
+
+    """Testea que, con muchos IDs pidiendo a la vez los ligandos de los mismos targets, 
+    cada target se descargue una sola vez y se libere al tomarlo el último ID."""
+    def test_concurrent_ids_download_each_target_once(self):
+        plan = QueryPlan()
+        plan.target_refs = {"CHEMBL1": 20, "CHEMBL2": 20}
+        requests_per_target = Counter()
+        lock = threading.Lock()
+
+        def fetch(chembl_id):
+            with lock:
+                requests_per_target[chembl_id] += 1
+            time.sleep(0.01)
+            return [chembl_id]
+
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            results = list(executor.map(lambda chembl_id: plan.take_ligands(chembl_id, fetch), ["CHEMBL1", "CHEMBL2"] * 20))
+        self.assertEqual({"CHEMBL1": 1, "CHEMBL2": 1}, requests_per_target)
+        self.assertEqual([["CHEMBL1"], ["CHEMBL2"]] * 20, results)
+        self.assertEqual({}, plan.ligand_futures)
+        self.assertEqual({}, plan.target_refs)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,52 @@
+import time
+import unittest
+from unittest import mock
+
+from src import config
+from src.rate_limiter import HostRateLimiter, parse_retry_after
+
+
+class TestsRateLimiter(unittest.TestCase):
+
+    def test_token_bucket_spaces_requests_after_burst(self):
+        limiter = HostRateLimiter(rate=20, burst=2, concurrency=4)
+        start = time.monotonic()
+        for _ in range(4):
+            limiter.acquire()
+            limiter.release(200)
+        # Dos requests salen en ráfaga y los otros dos esperan un token cada uno (~0.05 s)
+        self.assertGreaterEqual(time.monotonic() - start, 0.08)
+
+    """Testea que un 429 reduzca los límites a la mitad y pause el host durante su Retry-After, 
+    y que las respuestas exitosas los vuelvan a aumentar."""
+    def test_429_halves_limits_and_success_ramps_them_up(self):
+        limiter = HostRateLimiter(rate=10, burst=10, concurrency=8)
+        limiter.acquire()
+        limiter.release(429, retry_after=0.2)
+        self.assertEqual(5, limiter.rate)
+        self.assertEqual(4, limiter.concurrency)
+
+        start = time.monotonic()
+        limiter.acquire()
+        self.assertGreaterEqual(time.monotonic() - start, 0.15)
+        limiter.release(200)
+        self.assertGreater(limiter.rate, 5)
+        self.assertGreater(limiter.concurrency, 4)
+
+    def test_rate_never_goes_below_minimum(self):
+        limiter = HostRateLimiter(rate=1, burst=1, concurrency=1)
+        with mock.patch.object(config, "RATE_LIMIT_MAX_RETRY_AFTER", 0):
+            for _ in range(10):
+                limiter.in_flight += 1
+                limiter.release(503)
+        self.assertEqual(config.RATE_LIMIT_MIN_RATE, limiter.rate)
+        self.assertEqual(1, limiter.concurrency)
+
+    def test_parse_retry_after(self):
+        self.assertEqual(2.0, parse_retry_after("2"))
+        self.assertIsNone(parse_retry_after(None))
+        self.assertEqual(0.0, parse_retry_after("Wed, 21 Oct 2015 07:28:00 GMT"))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,49 @@
+import tempfile
+import unittest
+
+from src.response_cache import ResponseCache, normalize_request_key
+
+
+class TestsResponseCache(unittest.TestCase):
+
+    def setUp(self):
+        self.cache_dir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.cache_dir.cleanup()
+
+    def test_normalized_key_ignores_parameter_order(self):
+        key_1 = normalize_request_key("get", "https://www.ebi.ac.uk/chembl/api/data/activity?b=2&a=1")
+        key_2 = normalize_request_key("GET", "https://www.ebi.ac.uk/chembl/api/data/activity", params={"a": "1", "b": "2"})
+        self.assertEqual(key_1, key_2)
+
+    def test_stores_and_retrieves_response_counting_hits_and_misses(self):
+        cache = ResponseCache(self.cache_dir.name, 1024, {}, 60)
+        self.assertIsNone(cache.get("key", "rest.uniprot.org"))
+        cache.set("key", "rest.uniprot.org", b"{}", {"Content-Type": "application/json"})
+        body, headers = cache.get("key", "rest.uniprot.org")
+        self.assertEqual(b"{}", body)
+        self.assertEqual("application/json", headers["Content-Type"])
+        self.assertEqual({"hits": 1, "misses": 1, "bytes": 2}, cache.stats())
+        cache.close()
+
+    def test_expired_entries_are_not_returned(self):
+        cache = ResponseCache(self.cache_dir.name, 1024, {"data.rcsb.org": -1}, 60)
+        cache.set("key", "data.rcsb.org", b"data")
+        self.assertIsNone(cache.get("key", "data.rcsb.org"))
+        cache.close()
+
+    def test_least_recently_used_entries_are_evicted_when_full(self):
+        cache = ResponseCache(self.cache_dir.name, 10, {}, 60)
+        cache.set("first", "host", b"12345")
+        cache.set("second", "host", b"12345")
+        cache.get("first", "host")
+        cache.set("third", "host", b"12345")
+        self.assertIsNone(cache.get("second", "host"))
+        self.assertIsNotNone(cache.get("first", "host"))
+        self.assertIsNotNone(cache.get("third", "host"))
+        cache.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
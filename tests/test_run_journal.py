@@ -0,0 +1,93 @@
+import os
+import tempfile
+import unittest
+
+from src.main import process_ids, journal_settings
+from src.run_journal import RunJournal
+
+
+class TestsRunJournal(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "journal.jsonl")
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_resume_skips_finished_ids_and_retries_failed_ones(self):
+        journal = RunJournal(self.path)
+        self.assertEqual(['1MQ8', '2TMN', '3AT1'], journal.pending_ids("PDB", ['1MQ8', '2TMN', '3AT1']))
+        journal.record("PDB", '1MQ8', "done")
+        journal.record("PDB", '2TMN', "failed", ValueError("falla simulada"))
+        journal.record("PDB", '3AT1', "empty")
+        journal.close()
+
+        resumed = RunJournal(self.path)
+        self.assertEqual(['2TMN', '4XYZ'], resumed.pending_ids("PDB", ['1MQ8', '2TMN', '3AT1', '4XYZ']))
+        entry = resumed.get("PDB", '2TMN')
+        self.assertEqual(1, entry["attempts"])
+        self.assertEqual("falla simulada", entry["error"])
+        self.assertEqual({"pending": 1, "done": 1, "failed": 1, "empty": 1}, resumed.summary())
+        resumed.close()
+
+    def test_ignores_truncated_last_line(self):
+        journal = RunJournal(self.path)
+        journal.record("UniProt", 'P12345', "done")
+        journal.close()
+        with open(self.path, "a") as f:
+            f.write('{"kind": "UniProt", "id": "Q8N1')
+
+        resumed = RunJournal(self.path)
+        self.assertTrue(resumed.is_finished("UniProt", 'P12345'))
+        resumed.close()
+
+    """Testea que lo registrado después de reanudar un diario con la última línea cortada no se pierda al volver a cargarlo."""
+    def test_record_after_truncated_line_survives_reload(self):
+        journal = RunJournal(self.path)
+        journal.record("UniProt", 'P12345', "done")
+        journal.close()
+        with open(self.path, "a") as f:
+            f.write('{"kind": "UniProt", "id": "Q8N1')
+
+        resumed = RunJournal(self.path)
+        resumed.record("UniProt", 'Q8N1D0', "done")
+        resumed.close()
+
+        reloaded = RunJournal(self.path)
+        self.assertTrue(reloaded.is_finished("UniProt", 'P12345'))
+        self.assertTrue(reloaded.is_finished("UniProt", 'Q8N1D0'))
+        reloaded.close()
+
+    """Testea que un diario sólo se pueda retomar con los mismos filtros y formato de salida con los que se creó."""
+    def test_resume_with_different_settings_is_refused(self):
+        settings = journal_settings(["Ki", "Kd"], None, "json")
+        journal = RunJournal(self.path, settings)
+        journal.record("PDB", '1MQ8', "done")
+        journal.close()
+
+        resumed = RunJournal(self.path, journal_settings(["Kd", "Ki"], None, "json"))
+        self.assertEqual([], resumed.pending_ids("PDB", ['1MQ8']))
+        self.assertEqual({"pending": 0, "done": 1, "failed": 0, "empty": 0}, resumed.summary())
+        resumed.close()
+        for other_settings in (journal_settings(["Ki"], None, "json"), journal_settings(["Ki", "Kd"], ["CHEMBL1"], "json"),
+                               journal_settings(["Ki", "Kd"], None, "parquet")):
+            with self.assertRaises(ValueError):
+                RunJournal(self.path, other_settings)
+
+    def test_process_ids_records_state_of_each_id(self):
+        def process_function(id_, affinity_types, ligands_ids):
+            if id_ == '2TMN':
+                raise ValueError('falla simulada')
+            return "empty" if id_ == '3AT1' else "done"
+
+        journal = RunJournal(self.path)
+        process_ids(['1MQ8', '2TMN', '3AT1'], process_function, "PDB", None, None, 2, 0, journal)
+        self.assertEqual("done", journal.get("PDB", '1MQ8')["state"])
+        self.assertEqual("failed", journal.get("PDB", '2TMN')["state"])
+        self.assertEqual("empty", journal.get("PDB", '3AT1')["state"])
+        journal.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
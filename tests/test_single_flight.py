@@ -0,0 +1,50 @@
+import threading
+import time
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+
+from src import single_flight
+
+
+class TestsSingleFlight(unittest.TestCase):
+
+    """Testea que las llamadas simultáneas con la misma clave ejecuten la función una sola vez y compartan su resultado."""
+    def test_concurrent_calls_with_the_same_key_share_one_call(self):
+        calls = []
+        lock = threading.Lock()
+
+        @single_flight.coalesce("test_entry", key=lambda id_: id_.upper())
+        def fetch(id_):
+            with lock:
+                calls.append(id_)
+            time.sleep(0.2)
+            return {"id": id_.upper()}
+
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            results = list(executor.map(fetch, ["p12345", "P12345"] * 4 + ["Q99999"]))
+
+        self.assertEqual(2, len(calls))
+        self.assertEqual(8, sum(1 for result in results if result == {"id": "P12345"}))
+        self.assertIs(results[0], results[1])
+
+    """Testea que la excepción de la llamada en curso se propague a todas las que la esperaban, y que luego se pueda reintentar."""
+    def test_errors_are_shared_and_not_cached(self):
+        attempts = []
+
+        def fetch():
+            attempts.append(1)
+            time.sleep(0.1)
+            if len(attempts) == 1:
+                raise ValueError("falló")
+            return "ok"
+
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            futures = [executor.submit(single_flight.call, "test_error", "key", fetch) for _ in range(4)]
+            errors = [future.exception() for future in futures]
+        self.assertEqual(1, len(attempts))
+        self.assertTrue(all(isinstance(error, ValueError) for error in errors))
+        self.assertEqual("ok", single_flight.call("test_error", "key", fetch))
+
+
+if __name__ == '__main__':
+    unittest.main()
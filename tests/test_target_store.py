@@ -0,0 +1,93 @@
+import os
+import tempfile
+import threading
+import unittest
+from unittest import mock
+
+from src import config
+from src.pdb_handler import iter_target_activities
+from src.target_store import filter_activities, has_fresh_snapshot, iter_and_save_snapshot, get_snapshot_path, \
+    append_to_snapshot, iter_snapshot, read_watermark
+
+RECORDS = [
+    {"molecule_chembl_id": "CHEMBL1", "standard_type": "Ki", "standard_value": "1.0", "assay_chembl_id": "CHEMBL10"},
+    {"molecule_chembl_id": "CHEMBL2", "standard_type": "Kd", "standard_value": "2.0", "assay_chembl_id": "CHEMBL11"},
+    {"molecule_chembl_id": "CHEMBL3", "standard_type": "IC50", "standard_value": "3.0", "assay_chembl_id": "CHEMBL12"},
+]
+
+
+class TestsTargetStore(unittest.TestCase):
+
+    def setUp(self):
+        self.store_dir = tempfile.TemporaryDirectory()
+        self.patch = mock.patch.multiple(config, TARGET_STORE_DIR=self.store_dir.name, ENABLE_TARGET_STORE=True)
+        self.patch.start()
+
+    def tearDown(self):
+        self.patch.stop()
+        self.store_dir.cleanup()
+
+    def test_filters_do_not_depend_on_order(self):
+        ki_kd = list(filter_activities(RECORDS, ["Ki", "Kd"]))
+        kd_ki = list(filter_activities(RECORDS, ["Kd", "Ki"]))
+        self.assertEqual(ki_kd, kd_ki)
+        self.assertEqual(2, len(ki_kd))
+        self.assertEqual([RECORDS[2]], list(filter_activities(RECORDS, None, ["CHEMBL3"])))
+
+    def test_interrupted_download_does_not_leave_a_snapshot(self):
+        records = iter_and_save_snapshot("CHEMBL5610", iter(RECORDS))
+        next(records)
+        records.close()
+        self.assertFalse(has_fresh_snapshot("CHEMBL5610"))
+        self.assertEqual([], os.listdir(self.store_dir.name))
+
+    """Testea que dos descargas simultáneas sin filtros del mismo target (ej: dos IDs del mismo target 
+    con --format jsonl) terminen ambas y dejen un snapshot completo."""
+    def test_concurrent_downloads_of_the_same_target_both_save_the_snapshot(self):
+        both_downloading = threading.Barrier(2)
+        results = []
+
+        def download():
+            def records():
+                yield RECORDS[0]
+                both_downloading.wait()  # Ambos snapshots quedan a medio escribir a la vez
+                yield from RECORDS[1:]
+            results.append(list(iter_and_save_snapshot("CHEMBL5610", records())))
+
+        threads = [threading.Thread(target=download) for _ in range(2)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual([RECORDS, RECORDS], results)
+        self.assertEqual(RECORDS, list(iter_snapshot("CHEMBL5610")))
+        self.assertEqual(["CHEMBL5610.jsonl"], [name for name in os.listdir(self.store_dir.name) if name.endswith(".jsonl") or name.endswith(".part")])
+
+    """Testea que una consulta sin filtros guarde el snapshot del target y que las 
+    consultas filtradas siguientes se respondan localmente, sin consultar a ChEMBL."""
+    def test_filtered_queries_are_served_from_unfiltered_snapshot(self):
+        with mock.patch("src.pdb_handler.iter_binding_activities_for_target_from_chembl", return_value=iter(RECORDS)):
+            unfiltered = list(iter_target_activities("CHEMBL5610"))
+        self.assertEqual(3, len(unfiltered))
+        self.assertTrue(os.path.isfile(get_snapshot_path("CHEMBL5610")))
+        with mock.patch("src.pdb_handler.iter_binding_activities_for_target_from_chembl",
+                        side_effect=AssertionError("no se debería consultar a ChEMBL")):
+            filtered = list(iter_target_activities("CHEMBL5610", ["Kd", "Ki"], None))
+        self.assertEqual(["CHEMBL1", "CHEMBL2"], [record["molecule_chembl_id"] for record in filtered])
+
+    """Testea que las actividades nuevas se agreguen al snapshot actualizando su marca de agua, 
+    sin duplicar las ya guardadas aunque vuelvan a recibirse."""
+    def test_append_to_snapshot_merges_new_activities_and_updates_watermark(self):
+        records = [dict(record, activity_id=index + 1) for index, record in enumerate(RECORDS)]
+        list(iter_and_save_snapshot("CHEMBL5610", iter(records[:2])))
+        self.assertEqual(2, read_watermark("CHEMBL5610"))
+
+        added = append_to_snapshot("CHEMBL5610", iter(records[1:]))
+        self.assertEqual(1, added)
+        self.assertEqual(3, read_watermark("CHEMBL5610"))
+        self.assertEqual(records, list(iter_snapshot("CHEMBL5610")))
+        self.assertTrue(has_fresh_snapshot("CHEMBL5610"))
+
+
+if __name__ == '__main__':
+    unittest.main()